@@ -1,24 +1,166 @@
 import os
+import threading
+import time
+
 from sqlalchemy import create_engine
+from sqlalchemy.pool import QueuePool
 from dotenv import load_dotenv
 
 # Load environment variables from config/.env
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), ".env"))
 
-def get_engine():
+PROJECT_ROOT = os.path.dirname(os.path.dirname(__file__))
+
+# "postgres" (default) or "duckdb", an embedded single-file database that
+# needs no server; both hold the same bronze/silver/gold/audit schemas
+BACKENDS = ("postgres", "duckdb")
+
+DUCKDB_PATH = os.getenv("DUCKDB_PATH") or os.path.join(PROJECT_ROOT, "data", "warehouse.duckdb")
+
+
+class TimedQueuePool(QueuePool):
     """
-    Creates and returns a SQLAlchemy engine for PostgreSQL
+    QueuePool that records how long each checkout waited for a connection
+    (including opening a new one when the pool is not full yet)
     """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            waited = time.perf_counter() - started
+            with self._stats_lock:
+                self.checkouts += 1
+                self.wait_total += waited
+                self.wait_max = max(self.wait_max, waited)
+
+
+# One engine (and so one connection pool) per process
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+def get_backend():
+    backend = os.getenv("DB_BACKEND", "postgres").lower()
+    if backend not in BACKENDS:
+        raise ValueError(f"Invalid DB_BACKEND: {backend} (expected postgres | duckdb)")
+    return backend
+
+
+def get_connection_string():
+    if get_backend() == "duckdb":
+        return f"duckdb:///{DUCKDB_PATH}"
+
     db_host = os.getenv("DB_HOST")
     db_port = os.getenv("DB_PORT")
     db_name = os.getenv("DB_NAME")
     db_user = os.getenv("DB_USER")
     db_password = os.getenv("DB_PASSWORD")
 
-    connection_string = (
+    return (
         f"postgresql+psycopg2://{db_user}:{db_password}"
         f"@{db_host}:{db_port}/{db_name}"
     )
 
-    engine = create_engine(connection_string)
+
+def _create_duckdb_engine():
+    try:
+        import duckdb_engine  # noqa: F401  (registers the duckdb:// dialect)
+    except ImportError:
+        raise ImportError("DB_BACKEND=duckdb needs duckdb and duckdb-engine: pip install duckdb duckdb-engine")
+
+    os.makedirs(os.path.dirname(DUCKDB_PATH), exist_ok=True)
+
+    # Every pooled connection opens the same in-process database
+    return create_engine(
+        get_connection_string(),
+        poolclass=TimedQueuePool,
+        pool_size=int(os.getenv("DB_POOL_SIZE", "5")),
+        max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "10")),
+        pool_timeout=float(os.getenv("DB_POOL_TIMEOUT", "30")),
+    )
+
+
+def _create_engine():
+    if get_backend() == "duckdb":
+        return _create_duckdb_engine()
+
+    options = []
+    statement_timeout_ms = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+    if statement_timeout_ms > 0:
+        options.append(f"-c statement_timeout={statement_timeout_ms}")
+
+    connect_args = {
+        "application_name": os.getenv("DB_APPLICATION_NAME", "saas-analytics-pipeline"),
+    }
+    if options:
+        connect_args["options"] = " ".join(options)
+
+    return create_engine(
+        get_connection_string(),
+        poolclass=TimedQueuePool,
+        pool_size=int(os.getenv("DB_POOL_SIZE", "5")),
+        max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "10")),
+        pool_timeout=float(os.getenv("DB_POOL_TIMEOUT", "30")),
+        pool_recycle=int(os.getenv("DB_POOL_RECYCLE", "1800")),
+        pool_pre_ping=os.getenv("DB_POOL_PRE_PING", "true").lower() == "true",
+        connect_args=connect_args,
+    )
+
+
+def get_engine():
+    """
+    Returns the process-wide SQLAlchemy engine for PostgreSQL, or for the
+    DuckDB file at DUCKDB_PATH when DB_BACKEND=duckdb.
+
+    The engine is created on first use and then shared, so every builder in
+    a run reuses one connection pool. A forked child process gets its own
+    engine instead of reusing the parent's connections.
+    """
+    pid = os.getpid()
+
+    engine = _engines.get(pid)
+    if engine is None:
+        with _engines_lock:
+            engine = _engines.get(pid)
+            if engine is None:
+                engine = _engines[pid] = _create_engine()
+
     return engine
+
+
+def pool_stats():
+    """
+    Connection pool usage of this process's engine
+    """
+    engine = _engines.get(os.getpid())
+    if engine is None:
+        return {}
+
+    pool = engine.pool
+    return {
+        "pool_size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+        "checkouts": pool.checkouts,
+        "wait_total_s": round(pool.wait_total, 4),
+        "wait_avg_s": round(pool.wait_total / pool.checkouts, 4) if pool.checkouts else 0.0,
+        "wait_max_s": round(pool.wait_max, 4),
+    }
+
+
+def dispose_engine():
+    """
+    Closes every pooled connection of this process's engine
+    """
+    engine = _engines.pop(os.getpid(), None)
+    if engine is not None:
+        engine.dispose()
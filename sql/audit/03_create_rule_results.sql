@@ -0,0 +1,8 @@
+CREATE TABLE IF NOT EXISTS audit.rule_results (
+    table_name      TEXT,
+    rule_name       TEXT,
+    rejected_reason TEXT,
+    rejected_count  BIGINT,   -- exact number of rows that failed the rule
+    stored_count    BIGINT,   -- example rows kept in audit.rejected_rows
+    checked_at      TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
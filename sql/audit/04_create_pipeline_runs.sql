@@ -0,0 +1,19 @@
+CREATE TABLE IF NOT EXISTS audit.pipeline_runs (
+    run_id          TEXT,
+    stage           TEXT,
+    started_at      TIMESTAMP,
+    ended_at        TIMESTAMP,
+    status          TEXT,               -- success | failed
+    duration_s      DOUBLE PRECISION,
+    rows_in         BIGINT,             -- rows read by the stage
+    rows_out        BIGINT,             -- rows written by the stage
+    rows_rejected   BIGINT,             -- rows sent to audit.rejected_rows
+    db_statements   BIGINT,
+    db_read_s       DOUBLE PRECISION,   -- time spent in queries and fetches
+    db_write_s      DOUBLE PRECISION,   -- time spent in DDL, inserts and COPY
+    peak_rss_mb     DOUBLE PRECISION,   -- process high-water mark when the stage ended
+    error           TEXT
+);
+
+CREATE INDEX IF NOT EXISTS pipeline_runs_run_id_idx ON audit.pipeline_runs (run_id);
+CREATE INDEX IF NOT EXISTS pipeline_runs_stage_idx ON audit.pipeline_runs (stage, started_at);
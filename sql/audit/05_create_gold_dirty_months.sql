@@ -0,0 +1,15 @@
+-- Months of a gold table whose rows are stale because an input changed.
+-- Written in the transaction that changes the input and cleared when the
+-- gold table is rebuilt; a NULL month means every month.
+CREATE TABLE IF NOT EXISTS audit.gold_dirty_months (
+    table_name  TEXT NOT NULL,
+    month       TIMESTAMP,
+    marked_at   TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS audit.gold_builds (
+    table_name         TEXT PRIMARY KEY,
+    months_rebuilt     BIGINT,      -- months replaced by the latest run (NULL: all)
+    last_full_build_at TIMESTAMP,
+    updated_at         TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
@@ -0,0 +1,10 @@
+-- Content fingerprints of the bronze input files and of every table built
+-- by src.etl (see src/manifest.py)
+CREATE TABLE IF NOT EXISTS audit.fingerprints (
+    name         TEXT PRIMARY KEY,   -- file path, or bronze/silver/gold table
+    fingerprint  TEXT,               -- files: sha256 of the content
+    size_bytes   BIGINT,             -- files only
+    mtime        DOUBLE PRECISION,   -- files only
+    inputs       TEXT,               -- tables: JSON {input: fingerprint} it was built from
+    updated_at   TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
@@ -0,0 +1,11 @@
+-- One HyperLogLog sketch of active users per day and dimension value.
+-- Weekly, monthly and other rollups are computed by merging sketches.
+CREATE TABLE IF NOT EXISTS gold.usage_sketches (
+    day             DATE     NOT NULL,
+    dimension       TEXT     NOT NULL,   -- all | event_type | customer_id | plan_type
+    dimension_value TEXT     NOT NULL,
+    precision       SMALLINT NOT NULL,   -- 2^precision registers per sketch
+    registers       BYTEA    NOT NULL,   -- zlib-compressed uint8 registers
+    built_at        TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (precision, dimension, day, dimension_value)
+);
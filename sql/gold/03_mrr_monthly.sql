@@ -0,0 +1,8 @@
+DROP TABLE IF EXISTS gold.mrr_monthly;
+
+CREATE TABLE gold.mrr_monthly (
+    month                TIMESTAMP NOT NULL,
+    mrr                  DOUBLE PRECISION,
+    active_subscriptions BIGINT,
+    PRIMARY KEY (month)
+);
@@ -0,0 +1,9 @@
+DROP TABLE IF EXISTS gold.customer_churn_monthly;
+
+CREATE TABLE gold.customer_churn_monthly (
+    month             TIMESTAMP NOT NULL,
+    active_customers  BIGINT,
+    churned_customers BIGINT,
+    churn_rate        DOUBLE PRECISION,
+    PRIMARY KEY (month)
+);
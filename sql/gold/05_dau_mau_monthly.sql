@@ -0,0 +1,17 @@
+DROP TABLE IF EXISTS gold.dau_mau_monthly;
+
+-- The *_std_error, *_lower and *_upper columns are only filled when the
+-- table is built from usage sketches (approximate counts)
+CREATE TABLE gold.dau_mau_monthly (
+    month         TIMESTAMP NOT NULL,
+    dau           DOUBLE PRECISION,
+    mau           BIGINT,
+    dau_mau_ratio DOUBLE PRECISION,
+    dau_std_error DOUBLE PRECISION,
+    dau_lower     DOUBLE PRECISION,
+    dau_upper     DOUBLE PRECISION,
+    mau_std_error DOUBLE PRECISION,
+    mau_lower     DOUBLE PRECISION,
+    mau_upper     DOUBLE PRECISION,
+    PRIMARY KEY (month)
+);
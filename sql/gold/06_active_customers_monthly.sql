@@ -0,0 +1,9 @@
+DROP TABLE IF EXISTS gold.active_customers_monthly;
+
+CREATE TABLE gold.active_customers_monthly (
+    month             TIMESTAMP NOT NULL,
+    active_customers  BIGINT,
+    new_customers     BIGINT,
+    churned_customers BIGINT,
+    PRIMARY KEY (month)
+);
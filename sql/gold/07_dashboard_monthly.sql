@@ -0,0 +1,10 @@
+DROP TABLE IF EXISTS gold.dashboard_monthly;
+
+CREATE TABLE gold.dashboard_monthly (
+    month            TIMESTAMP NOT NULL,
+    mrr              DOUBLE PRECISION,
+    active_customers BIGINT,
+    churn_rate       DOUBLE PRECISION,
+    dau_mau_ratio    DOUBLE PRECISION,
+    PRIMARY KEY (month)
+);
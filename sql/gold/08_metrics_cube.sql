@@ -0,0 +1,21 @@
+DROP TABLE IF EXISTS gold.metrics_cube;
+
+-- Rolled-up dimensions hold 'All' and missing values 'unknown', so the
+-- primary key also serves the dashboard's single-slice lookups
+CREATE TABLE gold.metrics_cube (
+    month                TIMESTAMP NOT NULL,
+    plan_type            TEXT      NOT NULL,
+    country              TEXT      NOT NULL,
+    industry             TEXT      NOT NULL,
+    plan_name            TEXT      NOT NULL,
+    mrr                  DOUBLE PRECISION,
+    active_subscriptions BIGINT,
+    active_customers     BIGINT,
+    new_customers        BIGINT,
+    churned_customers    BIGINT,
+    churn_rate           DOUBLE PRECISION,
+    dau                  DOUBLE PRECISION,
+    mau                  BIGINT,
+    dau_mau_ratio        DOUBLE PRECISION,
+    PRIMARY KEY (plan_type, country, industry, plan_name, month)
+);
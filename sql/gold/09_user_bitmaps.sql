@@ -0,0 +1,19 @@
+DROP TABLE IF EXISTS gold.active_user_bitmaps;
+DROP TABLE IF EXISTS gold.user_index;
+
+-- Dense integer id of every active user, the bit position in the bitmaps
+-- below. Ids are only ever appended, so stored bitmaps stay valid.
+CREATE TABLE gold.user_index (
+    user_id    TEXT    NOT NULL,
+    user_index INTEGER NOT NULL UNIQUE,
+    PRIMARY KEY (user_id)
+);
+
+-- Users active on each day, as a bitmap over user_index
+CREATE TABLE gold.active_user_bitmaps (
+    day          DATE    NOT NULL,
+    active_users INTEGER NOT NULL,
+    users        BYTEA   NOT NULL,   -- zlib-compressed packed bits, bit i = user_index i
+    built_at     TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (day)
+);
@@ -0,0 +1,12 @@
+DROP TABLE IF EXISTS gold.active_users_daily;
+
+-- Exact distinct active users per day, from gold.active_user_bitmaps
+CREATE TABLE gold.active_users_daily (
+    day        DATE NOT NULL,
+    dau        BIGINT,
+    wau        BIGINT,             -- calendar week (Monday) to date
+    active_7d  BIGINT,             -- the 7 days ending on day
+    active_28d BIGINT,             -- the 28 days ending on day
+    stickiness DOUBLE PRECISION,   -- dau / active_28d
+    PRIMARY KEY (day)
+);
@@ -0,0 +1,17 @@
+DROP TABLE IF EXISTS silver.customers;
+
+-- customer_id is not unique in the raw data (duplicates are reported to
+-- audit.rejected_rows), so rows are keyed by their bronze fingerprint
+CREATE TABLE silver.customers (
+    customer_id   TEXT,
+    customer_name TEXT,
+    industry      TEXT,
+    country       TEXT,
+    signup_date   TIMESTAMP,
+    plan_type     TEXT,
+    row_hash      TEXT NOT NULL,   -- md5 of the raw bronze row
+    signup_year   SMALLINT,
+    PRIMARY KEY (row_hash)
+);
+
+CREATE INDEX customers_customer_id_idx ON silver.customers (customer_id);
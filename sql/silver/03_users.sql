@@ -0,0 +1,16 @@
+DROP TABLE IF EXISTS silver.users;
+
+CREATE TABLE silver.users (
+    user_id      TEXT,
+    customer_id  TEXT,
+    user_role    TEXT,
+    email        TEXT,
+    created_at   TIMESTAMP,
+    is_active    BOOLEAN,
+    row_hash     TEXT NOT NULL,   -- md5 of the raw bronze row
+    created_year SMALLINT,
+    PRIMARY KEY (row_hash)
+);
+
+CREATE INDEX users_user_id_idx ON silver.users (user_id);
+CREATE INDEX users_customer_id_idx ON silver.users (customer_id);
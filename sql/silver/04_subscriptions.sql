@@ -0,0 +1,18 @@
+DROP TABLE IF EXISTS silver.subscriptions;
+
+CREATE TABLE silver.subscriptions (
+    subscription_id     TEXT,
+    customer_id         TEXT,
+    plan_name           TEXT,
+    start_date          TIMESTAMP,
+    end_date            TIMESTAMP,
+    monthly_amount      DOUBLE PRECISION,
+    subscription_status TEXT,
+    row_hash            TEXT NOT NULL,   -- md5 of the raw bronze row
+    is_active           BOOLEAN,
+    start_year          SMALLINT,
+    PRIMARY KEY (row_hash)
+);
+
+CREATE INDEX subscriptions_subscription_id_idx ON silver.subscriptions (subscription_id);
+CREATE INDEX subscriptions_customer_id_idx ON silver.subscriptions (customer_id);
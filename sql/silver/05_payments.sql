@@ -0,0 +1,18 @@
+DROP TABLE IF EXISTS silver.payments;
+
+CREATE TABLE silver.payments (
+    payment_id      TEXT,
+    customer_id     TEXT,
+    subscription_id TEXT,
+    payment_date    TIMESTAMP,
+    payment_amount  DOUBLE PRECISION,
+    payment_method  TEXT,
+    payment_status  TEXT,
+    row_hash        TEXT NOT NULL,   -- md5 of the raw bronze row
+    payment_year    SMALLINT,
+    PRIMARY KEY (row_hash)
+);
+
+CREATE INDEX payments_payment_id_idx ON silver.payments (payment_id);
+CREATE INDEX payments_customer_id_idx ON silver.payments (customer_id);
+CREATE INDEX payments_payment_date_idx ON silver.payments (payment_date);
@@ -0,0 +1,21 @@
+DROP TABLE IF EXISTS silver.usage_events;
+
+-- Range-partitioned by month: src/incremental.py adds the partition of each
+-- new month before writing to it. A primary key would have to include
+-- event_date, which is NULL for unparseable dates, so rows are only indexed.
+CREATE TABLE silver.usage_events (
+    event_id    TEXT,
+    user_id     TEXT,
+    event_type  TEXT,
+    event_date  TIMESTAMP,
+    event_count INTEGER,
+    row_hash    TEXT NOT NULL,   -- md5 of the raw bronze row
+    event_year  SMALLINT
+) PARTITION BY RANGE (event_date);
+
+-- Rows without an event_date
+CREATE TABLE silver.usage_events_default PARTITION OF silver.usage_events DEFAULT;
+
+CREATE INDEX usage_events_row_hash_idx ON silver.usage_events (row_hash);
+CREATE INDEX usage_events_event_id_idx ON silver.usage_events (event_id);
+CREATE INDEX usage_events_user_id_idx ON silver.usage_events (user_id);
@@ -0,0 +1,311 @@
+import argparse
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+from config.db import get_engine
+from src import bitmaps
+from src.dialect import insert_method
+from src.dirty_months import pending_months, record_build
+from src.publish import create_staging, publish_table
+from src.schemas import DATETIME
+from src.telemetry import record
+
+
+# Daily active users and rolling windows, exact, from one bitmap of active
+# users per day (gold.active_user_bitmaps): the users active over any range
+# of days are the union of that range's bitmaps, so windows never rescan
+# usage events. Only days of months whose events changed are re-read from
+# silver (see src/dirty_months.py).
+
+TABLE = "gold.active_users_daily"
+
+# Rolling windows, in days ending on each day
+WINDOWS = {"active_7d": 7, "active_28d": 28}
+
+# Earlier days whose bitmaps the windows of a day read
+LOOKBACK = pd.Timedelta(days=max(WINDOWS.values()) - 1)
+
+
+def _read_active_days(engine, months=None):
+    """
+    (user_id, day) for every day a user had events, in the given months
+    (default: all)
+    """
+    query = """
+        SELECT DISTINCT user_id, CAST(event_date AS DATE) AS day
+        FROM silver.usage_events
+        WHERE event_count > 0
+          AND event_date IS NOT NULL
+          AND user_id IS NOT NULL
+    """
+    params = {}
+    if months is not None:
+        query += " AND event_date >= :first_month AND event_date < :end_month"
+        params = {
+            "first_month": min(months).to_pydatetime(),
+            "end_month": (max(months) + pd.offsets.MonthBegin()).to_pydatetime(),
+        }
+
+    df = pd.read_sql(text(query), engine, params=params)
+    df["day"] = pd.to_datetime(df["day"]).astype(DATETIME)
+
+    if months is not None:
+        df = df[df["day"].dt.to_period("M").dt.to_timestamp().isin(months)]
+
+    record(rows_in=len(df))
+    return df
+
+
+def index_users(conn, user_ids):
+    """
+    Dense integer index of every user in gold.user_index, as a Series by
+    user_id; users of user_ids seen for the first time get the next ids
+    """
+    index = pd.read_sql(
+        text("SELECT user_id, user_index FROM gold.user_index"), conn, index_col="user_id"
+    )["user_index"]
+
+    new = pd.Index(user_ids.unique()).difference(index.index)
+    if len(new):
+        first = int(index.max()) + 1 if len(index) else 0
+        added = pd.Series(np.arange(first, first + len(new)), index=new, name="user_index")
+
+        added.rename_axis("user_id").reset_index().to_sql(
+            name="user_index",
+            schema="gold",
+            con=conn,
+            index=False,
+            if_exists="append",
+            method=insert_method(),
+        )
+        index = pd.concat([index, added])
+
+    return index
+
+
+def store_bitmaps(conn, df, index, months=None):
+    """
+    Replaces the bitmaps of the given months (default: all) by those of the
+    active days in df
+    """
+    if months is None:
+        conn.execute(text("DELETE FROM gold.active_user_bitmaps"))
+    for month in months or []:
+        conn.execute(
+            text("DELETE FROM gold.active_user_bitmaps WHERE day >= :start AND day < :end"),
+            {
+                "start": month.to_pydatetime(),
+                "end": (month + pd.offsets.MonthBegin()).to_pydatetime(),
+            },
+        )
+
+    days, groups = np.unique(df["day"].to_numpy(), return_inverse=True)
+    size = int(index.max()) + 1 if len(index) else 0
+    users = bitmaps.build(groups, df["user_id"].map(index).to_numpy(), len(days), size)
+
+    pd.DataFrame(
+        {
+            "day": days,
+            "active_users": bitmaps.count(users),
+            "users": [bitmaps.to_bytes(bitmap) for bitmap in users],
+        }
+    ).to_sql(
+        name="active_user_bitmaps",
+        schema="gold",
+        con=conn,
+        index=False,
+        if_exists="append",
+        method=insert_method(),
+    )
+
+
+def load_bitmaps(engine, start=None, end=None):
+    """
+    Bitmaps of every calendar day from start (default: the first stored
+    day) to end (default: the last), as (days, (n_days, width) array);
+    days without a stored bitmap had no active user
+    """
+    query = "SELECT day, users FROM gold.active_user_bitmaps WHERE 1 = 1"
+    params = {}
+    if start is not None:
+        query += " AND day >= :start"
+        params["start"] = start.to_pydatetime()
+    if end is not None:
+        query += " AND day <= :end"
+        params["end"] = end.to_pydatetime()
+
+    stored = pd.read_sql(text(query), engine, params=params)
+    if stored.empty and (start is None or end is None):
+        return pd.DatetimeIndex([]), np.zeros((0, 0), dtype=np.uint8)
+
+    stored["day"] = pd.to_datetime(stored["day"]).astype(DATETIME)
+    # Bitmaps stored before later users got an id are shorter
+    users = [bitmaps.from_bytes(bytes(b)) for b in stored["users"]]
+
+    days = pd.date_range(
+        start if start is not None else stored["day"].min(),
+        end if end is not None else stored["day"].max(),
+        freq="D",
+    )
+    matrix = np.zeros((len(days), max((len(bitmap) for bitmap in users), default=0)), dtype=np.uint8)
+    for row, bitmap in zip(days.get_indexer(stored["day"]), users):
+        matrix[row, :len(bitmap)] = bitmap
+    return days, matrix
+
+
+def compute_active_users_daily(days, matrix):
+    """
+    DAU, week-to-date, rolling 7 and 28 day active users and stickiness for
+    consecutive calendar days, from their bitmaps (one row per day)
+    """
+    result = pd.DataFrame(
+        {
+            "day": days,
+            "dau": bitmaps.count(matrix),
+            "wau": bitmaps.count(bitmaps.cumulative_union(matrix, days.weekday == 0)),
+        }
+    )
+    for column, window in WINDOWS.items():
+        result[column] = bitmaps.count(bitmaps.rolling_union(matrix, window))
+
+    result["stickiness"] = (result["dau"] / result["active_28d"]).where(result["active_28d"] > 0)
+    return result
+
+
+def _stored_days(engine):
+    """
+    First and last day with a stored bitmap, or (None, None)
+    """
+    with engine.connect() as conn:
+        first_day, last_day = conn.execute(
+            text("SELECT MIN(day), MAX(day) FROM gold.active_user_bitmaps")
+        ).one()
+    return tuple(None if day is None else pd.Timestamp(day) for day in (first_day, last_day))
+
+
+def _rows_range(months, first_day=None, previous=(None, None)):
+    """
+    First and last day whose rows change with the bitmaps of months (None:
+    all days). Rows run from the first active day (first_day) to the last,
+    so when either end moves out past the previous first and last days,
+    the days in between get rows too, even outside the changed months.
+    """
+    if months is None:
+        return None, None
+
+    previous_first_day, previous_last_day = previous
+    start = min(months)
+    end = max(months) + pd.offsets.MonthBegin() - pd.Timedelta(days=1) + LOOKBACK
+
+    if previous_last_day is not None:
+        start = min(start, previous_last_day + pd.Timedelta(days=1))
+    if previous_first_day is not None:
+        end = max(end, previous_first_day - pd.Timedelta(days=1))
+    if first_day is not None:
+        start = max(start, first_day)
+    return start, end
+
+
+def build_gold_active_users_daily(full_refresh=False):
+    """
+    Updates the active-user bitmaps of the days in changed months, then
+    rewrites the rows of gold.active_users_daily that those days' windows
+    reach (every row on a full build).
+    """
+    engine = get_engine()
+
+    months, marked_until = pending_months(engine, TABLE, full_refresh)
+    if months is not None and not months:
+        print(f"✅ {TABLE} is up to date")
+        return
+
+    previous = _stored_days(engine)
+
+    df = _read_active_days(engine, months)
+    with engine.begin() as conn:
+        store_bitmaps(conn, df, index_users(conn, df["user_id"]), months)
+
+    # Rows run from the first active day to the last
+    first_day, last_day = _stored_days(engine)
+    start, end = _rows_range(months, first_day, previous)
+
+    if last_day is None or (start is not None and start > last_day):
+        days, matrix = pd.DatetimeIndex([]), np.zeros((0, 0), dtype=np.uint8)
+    else:
+        days, matrix = load_bitmaps(
+            engine,
+            None if start is None else start - LOOKBACK,
+            last_day if end is None else min(end, last_day),
+        )
+
+    result = compute_active_users_daily(days, matrix)
+    if start is not None:
+        result = result[result["day"] >= start]
+
+    with engine.begin() as conn:
+        if months is None:
+            # Filled copy swapped in, as for the other gold tables
+            name = create_staging(conn, TABLE)
+        else:
+            name = "active_users_daily"
+            if last_day is None:
+                conn.execute(text(f"DELETE FROM {TABLE}"))
+            else:
+                # Also drops rows outside the active days, if their ends moved in
+                conn.execute(
+                    text(
+                        f"DELETE FROM {TABLE} WHERE (day >= :start AND day <= :end) "
+                        "OR day < :first_day OR day > :last_day"
+                    ),
+                    {
+                        "start": start.to_pydatetime(),
+                        "end": end.to_pydatetime(),
+                        "first_day": first_day.to_pydatetime(),
+                        "last_day": last_day.to_pydatetime(),
+                    },
+                )
+
+        result.to_sql(
+            name=name,
+            schema="gold",
+            con=conn,
+            index=False,
+            if_exists="append",
+            method=insert_method(),
+        )
+
+        if months is None:
+            publish_table(conn, TABLE)
+
+    record(rows_out=len(result))
+
+    with engine.begin() as conn:
+        record_build(conn, TABLE, months, marked_until)
+
+    rebuilt = "all months" if months is None else f"{len(months)} months"
+    print(f"✅ {TABLE} built successfully ({rebuilt})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Daily and rolling active users from per-day user bitmaps")
+    parser.add_argument("--build", action="store_true", help="Update the bitmaps and gold.active_users_daily first")
+    parser.add_argument("--full-refresh", action="store_true", help="Rebuild every day's bitmap")
+    parser.add_argument("--start", help="First day (YYYY-MM-DD)")
+    parser.add_argument("--end", help="Last day (YYYY-MM-DD)")
+    args = parser.parse_args()
+
+    if args.build or args.full_refresh:
+        build_gold_active_users_daily(args.full_refresh)
+
+    query = "SELECT * FROM gold.active_users_daily WHERE 1 = 1"
+    params = {}
+    if args.start:
+        query += " AND day >= :start"
+        params["start"] = args.start
+    if args.end:
+        query += " AND day <= :end"
+        params["end"] = args.end
+
+    print(pd.read_sql(text(query + " ORDER BY day"), get_engine(), params=params).to_string(index=False))
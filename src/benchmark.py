@@ -0,0 +1,182 @@
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import pandas as pd
+from sqlalchemy import text
+
+from config.db import dispose_engine, get_engine
+from src.dq_utils import flush_rejected_rows
+from src.etl import gold_stages, silver_stages
+from src.load_bronze import FILE_TABLE_MAP, PROJECT_ROOT, load_csv_to_bronze
+from src.manifest import clear_fingerprints
+from src.scheduler import Stage, topological_levels
+from src.synthetic import default_output_dir, generate_bronze, parse_count
+from src.telemetry import peak_rss_mb
+
+
+BENCHMARKS_DIR = os.path.join(PROJECT_ROOT, "benchmarks")
+BASELINES_PATH = os.path.join(BENCHMARKS_DIR, "baselines.json")
+
+# A stage regresses when its throughput drops, or its peak memory grows,
+# by more than this fraction of the baseline
+TOLERANCE = float(os.getenv("BENCHMARK_TOLERANCE", "0.25"))
+
+
+def benchmark_stages(inputs_dir=None, backend="pandas"):
+    """
+    Every pipeline stage, from the bronze load to the dashboard table, keyed
+    by name. Silver stages run as full refreshes so timings are comparable.
+    """
+    bronze = Stage(
+        "bronze",
+        lambda: load_csv_to_bronze(inputs_dir=inputs_dir, force=True),
+        outputs=list(FILE_TABLE_MAP.values()),
+    )
+    stages = [bronze] + silver_stages(full_refresh=True) + gold_stages(backends={"*": backend})
+    return {stage.name: stage for stage in stages}
+
+
+def _run_stage(name, inputs_dir, backend):
+    # Runs in a fresh process, so the peak RSS belongs to this stage alone
+    stage = benchmark_stages(inputs_dir, backend)[name]
+
+    start = time.perf_counter()
+    stage.func()
+    flush_rejected_rows()
+    seconds = time.perf_counter() - start
+
+    return seconds, peak_rss_mb()
+
+
+def count_rows(engine, tables):
+    with engine.connect() as conn:
+        return sum(
+            conn.execute(text(f"SELECT COUNT(*) FROM {table}")).scalar()
+            for table in tables
+        )
+
+
+def run_benchmark(inputs_dir=None, stages=None, backend="pandas"):
+    """
+    Runs the selected stages (default: all) in dependency order, each in its
+    own process, and returns one row per stage with its duration, the rows it
+    read (rows written for the bronze load), rows/sec and peak RSS.
+
+    Gold stages do not share a context here, so each one pays for reading
+    its own silver inputs.
+
+    This overwrites the bronze, silver and gold tables of the configured
+    database.
+    """
+    plan = benchmark_stages(inputs_dir, backend)
+    selected = stages or list(plan)
+    rank = {name: i for i, name in enumerate(plan)}
+    order = [
+        name
+        for level in topological_levels(list(plan.values()))
+        for name in sorted(level, key=rank.get)
+        if name in selected
+    ]
+
+    # Tables rebuilt here are not fingerprinted, so src.etl must rebuild them
+    clear_fingerprints(get_engine(), ["silver", "gold"])
+
+    results = []
+    for name in order:
+        stage = plan[name]
+        rows = count_rows(get_engine(), stage.inputs) if stage.inputs else None
+
+        # Release this process's connections: an embedded DuckDB file can
+        # only be opened by one process at a time
+        dispose_engine()
+
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+            seconds, peak_mb = pool.submit(_run_stage, name, inputs_dir, backend).result()
+
+        if rows is None:
+            rows = count_rows(get_engine(), stage.outputs)
+
+        results.append(
+            {
+                "stage": name,
+                "seconds": round(seconds, 3),
+                "rows": rows,
+                "rows_per_sec": round(rows / seconds, 1) if seconds else None,
+                "peak_rss_mb": round(peak_mb, 1),
+            }
+        )
+        print(f"⏱ {name}: {seconds:.2f}s, {rows} rows, {peak_mb:.0f} MB peak")
+
+    return pd.DataFrame(results)
+
+
+def load_baselines(path=BASELINES_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baseline(results, scale, path=BASELINES_PATH):
+    baselines = load_baselines(path)
+    baselines[scale] = {row["stage"]: row for row in results.to_dict("records")}
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(baselines, f, indent=2, sort_keys=True)
+
+
+def compare_to_baseline(results, baseline, tolerance=TOLERANCE):
+    """
+    Adds the baseline figures and a regression flag to each stage's results
+    """
+    baseline = pd.DataFrame(list(baseline.values()))
+    if baseline.empty:
+        return results.assign(regression=False)
+
+    baseline = baseline[["stage", "rows_per_sec", "peak_rss_mb"]].add_prefix("baseline_")
+    compared = results.merge(baseline, left_on="stage", right_on="baseline_stage", how="left")
+    compared = compared.drop(columns="baseline_stage")
+
+    slower = compared["rows_per_sec"] < compared["baseline_rows_per_sec"] * (1 - tolerance)
+    bigger = compared["peak_rss_mb"] > compared["baseline_peak_rss_mb"] * (1 + tolerance)
+    compared["regression"] = slower | bigger
+    return compared
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Time every pipeline stage on synthetic data and compare with stored baselines. "
+        "Overwrites the bronze, silver and gold tables of the configured database."
+    )
+    parser.add_argument("--events", default="1e5", help="Scale, as a number of usage events (default: 1e5)")
+    parser.add_argument("--generate", action="store_true", help="Generate the synthetic CSVs for this scale first")
+    parser.add_argument("--inputs-dir", default=None, help="CSV directory (default: benchmarks/data/events_<events>)")
+    parser.add_argument("--stage", action="append", dest="stages", help="Only run this stage; repeatable")
+    parser.add_argument("--engine", choices=["pandas", "sql"], default="pandas", help="Gold backend")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the baseline for this scale")
+    args = parser.parse_args()
+
+    events = parse_count(args.events)
+    scale = str(events)
+    inputs_dir = args.inputs_dir or default_output_dir(events)
+
+    if args.generate:
+        generate_bronze(events, inputs_dir)
+
+    results = run_benchmark(inputs_dir, args.stages, args.engine)
+    compared = compare_to_baseline(results, load_baselines().get(scale, {}), args.tolerance)
+    print(compared.to_string(index=False))
+
+    if args.save_baseline:
+        save_baseline(results, scale)
+        print(f"Baseline for {scale} events saved to {BASELINES_PATH}")
+    elif compared["regression"].any():
+        print(f"❌ Regressions: {', '.join(compared.loc[compared['regression'], 'stage'])}")
+        sys.exit(1)
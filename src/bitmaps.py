@@ -0,0 +1,85 @@
+import zlib
+
+import numpy as np
+
+
+# Bitmaps of sets of dense integer ids (e.g. the users active on a day):
+# bit i is set when id i is in the set, 8 ids per byte (np.packbits order).
+# A (n, width) uint8 array holds one bitmap per row.
+
+# Set bits in every byte value
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def width(size):
+    """
+    Bytes per bitmap for ids 0 .. size - 1
+    """
+    return (size + 7) // 8
+
+
+def build(groups, ids, n_groups, size):
+    """
+    Builds one bitmap per group in a single pass: a (n_groups, width(size))
+    uint8 array whose row g has the bits of the ids of group g set
+    """
+    groups = np.asarray(groups, dtype=np.int64)
+    ids = np.asarray(ids, dtype=np.int64)
+
+    bitmaps = np.zeros((n_groups, width(size)), dtype=np.uint8)
+    np.bitwise_or.at(bitmaps, (groups, ids >> 3), (0x80 >> (ids & 7)).astype(np.uint8))
+    return bitmaps
+
+
+def count(bitmaps):
+    """
+    Number of ids in each bitmap (the last axis)
+    """
+    return _POPCOUNT[bitmaps].sum(axis=-1, dtype=np.int64)
+
+
+def cumulative_union(bitmaps, resets):
+    """
+    Union of each row with the rows before it, back to the last row where
+    resets is True (e.g. users active so far in the week)
+    """
+    result = bitmaps.copy()
+    for i in range(1, len(result)):
+        if not resets[i]:
+            result[i] |= result[i - 1]
+    return result
+
+
+def rolling_union(bitmaps, window):
+    """
+    Union of every window consecutive rows ending at each row (rows before
+    the first count as empty).
+
+    Uses the van Herk/Gil-Werman scheme: rows are cut into blocks of window
+    rows, unions are accumulated forwards and backwards within each block,
+    and every window is then the union of one backward and one forward
+    accumulation, so each row costs three ORs whatever the window.
+    """
+    n, nbytes = bitmaps.shape
+    padded = np.vstack([np.zeros((window - 1, nbytes), dtype=np.uint8), bitmaps])
+
+    forward = padded.copy()
+    backward = padded.copy()
+    for i in range(1, len(padded)):
+        if i % window:
+            forward[i] |= forward[i - 1]
+    for i in range(len(padded) - 2, -1, -1):
+        if (i + 1) % window:
+            backward[i] |= backward[i + 1]
+
+    # Window of row i: padded rows i .. i + window - 1
+    return backward[:n] | forward[window - 1:window - 1 + n]
+
+
+def to_bytes(bitmap):
+    # Days only a few users were active on are mostly zeros and compress well
+    return zlib.compress(np.asarray(bitmap, dtype=np.uint8).tobytes())
+
+
+def from_bytes(data):
+    return np.frombuffer(zlib.decompress(data), dtype=np.uint8)
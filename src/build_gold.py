@@ -1,134 +1,33 @@
 import pandas as pd
 from sqlalchemy import text
-from config.db import get_engine
-
-
-def build_gold_mrr_monthly():
-    engine = get_engine()
-
-    query = """
-        SELECT
-            subscription_id,
-            start_date,
-            end_date,
-            monthly_amount
-        FROM silver.subscriptions
-        WHERE is_active = true
-    """
-
-    df = pd.read_sql(query, engine)
-
-    # Ensure datetime
-    df["start_date"] = pd.to_datetime(df["start_date"])
-    df["end_date"] = pd.to_datetime(df["end_date"])
-
-    rows = []
-
-    for _, row in df.iterrows():
-        start = row["start_date"].replace(day=1)
-        end = (
-            row["end_date"].replace(day=1)
-            if pd.notnull(row["end_date"])
-            else start
-        )
-
-        for month in pd.date_range(start, end, freq="MS"):
-            rows.append(
-                {
-                    "month": month,
-                    "subscription_id": row["subscription_id"],
-                    "monthly_amount": row["monthly_amount"],
-                }
-            )
-
-    expanded = pd.DataFrame(rows)
-
-    result = (
-        expanded
-        .groupby("month")
-        .agg(
-            mrr=("monthly_amount", "sum"),
-            active_subscriptions=("subscription_id", "nunique"),
-        )
-        .reset_index()
+from src.dialect import insert_method
+from src.dirty_months import delete_months, pending_months, record_build
+from src.gold_context import GoldContext
+from src.gold_sql import build_gold_table_in_sql, build_metrics_cube_in_sql
+from src.publish import create_staging, publish_table
+from src.intervals import coalesce_spans, distinct_active, sweep
+from src.partitioned import map_partitions, sum_counts, use_processes
+from src.sketches import compute_dau_mau_from_sketches
+from src.telemetry import add_metrics, collect_metrics, record
+
+
+def compute_mrr_monthly(ctx):
+    # MRR only counts active subscriptions
+    spans = ctx.active_subscription_spans
+
+    mrr = sweep(spans, weights="monthly_amount", name="mrr")
+    active_subscriptions = distinct_active(
+        coalesce_spans(spans, "subscription_id"),
+        "subscription_id",
+        name="active_subscriptions",
     )
 
-    with engine.begin() as conn:
-        conn.execute(text("DROP TABLE IF EXISTS gold.mrr_monthly"))
-
-        result.to_sql(
-            name="mrr_monthly",
-            schema="gold",
-            con=conn,
-            index=False,
-            if_exists="replace",
-        )
-
-    print("✅ gold.mrr_monthly built successfully")
-
-
-def build_gold_customer_churn():
-    engine = get_engine()
+    return pd.concat([mrr, active_subscriptions], axis=1).reset_index()
 
-    query = """
-        SELECT
-            customer_id,
-            start_date,
-            end_date
-        FROM silver.subscriptions
-    """
-
-    df = pd.read_sql(query, engine)
 
-    df["start_date"] = pd.to_datetime(df["start_date"])
-    df["end_date"] = pd.to_datetime(df["end_date"])
-
-    rows = []
-
-    for _, row in df.iterrows():
-        start = row["start_date"].replace(day=1)
-        end = (
-            row["end_date"].replace(day=1)
-            if pd.notnull(row["end_date"])
-            else start
-        )
-
-        for month in pd.date_range(start, end, freq="MS"):
-            rows.append(
-                {
-                    "customer_id": row["customer_id"],
-                    "month": month,
-                }
-            )
-
-    activity = pd.DataFrame(rows)
-
-    # Active customers per month
-    monthly_active = (
-        activity.groupby("month")["customer_id"]
-        .nunique()
-        .reset_index(name="active_customers")
-    )
-
-    # Detect churn
-    activity["prev_month"] = activity["month"] + pd.offsets.MonthBegin(1)
-
-    churn = (
-        activity.merge(
-            activity,
-            left_on=["customer_id", "prev_month"],
-            right_on=["customer_id", "month"],
-            how="left",
-            suffixes=("", "_next"),
-        )
-        .query("month_next.isna()")
-    )
-
-    churned = (
-        churn.groupby("month")["customer_id"]
-        .nunique()
-        .reset_index(name="churned_customers")
-    )
+def compute_customer_churn_monthly(ctx):
+    monthly_active = ctx.active_customers
+    churned = ctx.churned_customers
 
     result = monthly_active.merge(churned, on="month", how="left")
     result["churned_customers"] = result["churned_customers"].fillna(0)
@@ -136,42 +35,44 @@ def build_gold_customer_churn():
         result["churned_customers"] / result["active_customers"]
     )
 
-    with engine.begin() as conn:
-        conn.execute(text("DROP TABLE IF EXISTS gold.customer_churn_monthly"))
-
-        result.to_sql(
-            name="customer_churn_monthly",
-            schema="gold",
-            con=conn,
-            index=False,
-            if_exists="replace",
-        )
+    return result
 
-    print("✅ gold.customer_churn_monthly built successfully")
 
+def _active_users(df):
+    # Distinct users per day and per month
+    df = df.assign(month=df["event_date"].dt.to_period("M").dt.to_timestamp())
+    return (
+        df.groupby("event_date")["user_id"].nunique(),
+        df.groupby("month")["user_id"].nunique(),
+    )
 
-def build_gold_dau_mau():
-    engine = get_engine()
 
-    query = """
-        SELECT
-            user_id,
-            event_date
-        FROM silver.usage_events
-        WHERE event_count > 0
+def _active_users_partition(partition, partitions, months):
     """
+    Map step of compute_dau_mau_monthly, run in a worker process: distinct
+    users per day and per month among one user_id hash partition
+    """
+    with collect_metrics() as metrics:
+        daily, monthly = _active_users(
+            GoldContext(months=months).read_usage_events(partition, partitions)
+        )
+    return daily, monthly, metrics
 
-    df = pd.read_sql(query, engine)
 
-    df["event_date"] = pd.to_datetime(df["event_date"])
-    df["month"] = df["event_date"].dt.to_period("M").dt.to_timestamp()
+def compute_dau_mau_monthly(ctx):
+    if use_processes(ctx.processes):
+        # Partitions share no user, so their distinct counts add up exactly
+        partials = map_partitions(_active_users_partition, ctx.processes, ctx.months)
+        for _, _, metrics in partials:
+            add_metrics(metrics)
+
+        dau = sum_counts([daily for daily, _, _ in partials])
+        mau = sum_counts([monthly for _, monthly, _ in partials])
+    else:
+        dau, mau = _active_users(ctx.usage_events)
 
     # DAU: distinct users per day
-    daily_active = (
-        df.groupby("event_date")["user_id"]
-        .nunique()
-        .reset_index(name="dau")
-    )
+    daily_active = dau.rename_axis("event_date").reset_index(name="dau")
 
     daily_active["month"] = daily_active["event_date"].dt.to_period("M").dt.to_timestamp()
 
@@ -182,129 +83,31 @@ def build_gold_dau_mau():
     )
 
     # MAU: distinct users per month
-    mau = (
-        df.groupby("month")["user_id"]
-        .nunique()
-        .reset_index(name="mau")
-    )
+    mau = mau.rename_axis("month").reset_index(name="mau")
 
     result = avg_dau.merge(mau, on="month")
     result["dau_mau_ratio"] = result["dau"] / result["mau"]
 
-    with engine.begin() as conn:
-        conn.execute(text("DROP TABLE IF EXISTS gold.dau_mau_monthly"))
-
-        result.to_sql(
-            name="dau_mau_monthly",
-            schema="gold",
-            con=conn,
-            index=False,
-            if_exists="replace",
-        )
+    return result
 
-    print("✅ gold.dau_mau_monthly built successfully")
 
-def build_gold_active_customers():
-    engine = get_engine()
-
-    query = """
-        SELECT
-            customer_id,
-            start_date,
-            end_date
-        FROM silver.subscriptions
-    """
-
-    df = pd.read_sql(query, engine)
-
-    df["start_date"] = pd.to_datetime(df["start_date"])
-    df["end_date"] = pd.to_datetime(df["end_date"])
-
-    rows = []
-
-    for _, row in df.iterrows():
-        start = row["start_date"].replace(day=1)
-        end = (
-            row["end_date"].replace(day=1)
-            if pd.notnull(row["end_date"])
-            else start
-        )
-
-        for month in pd.date_range(start, end, freq="MS"):
-            rows.append(
-                {
-                    "customer_id": row["customer_id"],
-                    "month": month,
-                }
-            )
-
-    activity = pd.DataFrame(rows)
-
-    # Active customers per month
-    monthly_active = (
-        activity.groupby("month")["customer_id"]
-        .nunique()
-        .reset_index(name="active_customers")
-    )
-
-    # First appearance (new customers)
-    first_seen = (
-        activity.groupby("customer_id")["month"]
-        .min()
-        .reset_index(name="first_month")
-    )
-
-    new_customers = (
-        first_seen.groupby("first_month")["customer_id"]
-        .nunique()
-        .reset_index(name="new_customers")
-        .rename(columns={"first_month": "month"})
-    )
-
-    # Churned customers (reuse churn logic)
-    activity["prev_month"] = activity["month"] + pd.offsets.MonthBegin(1)
-
-    churn = (
-        activity.merge(
-            activity,
-            left_on=["customer_id", "prev_month"],
-            right_on=["customer_id", "month"],
-            how="left",
-            suffixes=("", "_next"),
-        )
-        .query("month_next.isna()")
-    )
-
-    churned = (
-        churn.groupby("month")["customer_id"]
-        .nunique()
-        .reset_index(name="churned_customers")
-    )
+def compute_active_customers_monthly(ctx):
+    # Activity, first-seen months and churn flags are shared with
+    # build_gold_customer_churn through the context
+    monthly_active = ctx.active_customers
+    new_customers = ctx.new_customers
+    churned = ctx.churned_customers
 
     # Combine
-    result = (
+    return (
         monthly_active
         .merge(new_customers, on="month", how="left")
         .merge(churned, on="month", how="left")
         .fillna(0)
     )
 
-    with engine.begin() as conn:
-        conn.execute(text("DROP TABLE IF EXISTS gold.active_customers_monthly"))
-
-        result.to_sql(
-            name="active_customers_monthly",
-            schema="gold",
-            con=conn,
-            index=False,
-            if_exists="replace",
-        )
-
-    print("✅ gold.active_customers_monthly built successfully")
-
-def build_gold_dashboard_monthly():
-    engine = get_engine()
 
+def compute_dashboard_monthly(ctx):
     query = """
         SELECT
             m.month,
@@ -318,27 +121,141 @@ def build_gold_dashboard_monthly():
         LEFT JOIN gold.dau_mau_monthly d USING (month)
     """
 
-    df = pd.read_sql(query, engine)
+    df = pd.read_sql(query, ctx.engine)
+    record(rows_in=len(df))
+    return df
+
+
+# Pandas implementation of every gold table; the in-warehouse SQL
+# equivalents live in src/gold_sql.py
+GOLD_COMPUTE = {
+    "mrr_monthly": compute_mrr_monthly,
+    "customer_churn_monthly": compute_customer_churn_monthly,
+    "dau_mau_monthly": compute_dau_mau_monthly,
+    "active_customers_monthly": compute_active_customers_monthly,
+    "dashboard_monthly": compute_dashboard_monthly,
+}
+
+# Tables that can also be computed from the HyperLogLog sketches in
+# gold.usage_sketches (approximate, with error columns)
+SKETCH_COMPUTE = {
+    "dau_mau_monthly": compute_dau_mau_from_sketches,
+}
+
+BACKENDS = ("pandas", "sql", "sketch")
+
+
+def _compute(table, ctx, backend):
+    if backend == "sketch":
+        return SKETCH_COMPUTE[table](ctx.engine)
+    return GOLD_COMPUTE[table](ctx)
+
+
+def build_gold_table(table, ctx=None, backend="pandas", full_refresh=False):
+    """
+    Builds gold.<table> either in pandas (reading silver through the shared
+    context), entirely inside Postgres, or from usage sketches.
+
+    Only the months whose inputs changed since the last build are recomputed
+    and replaced (see src/dirty_months.py), unless the table is due for a
+    full rebuild or full_refresh is set.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Invalid gold backend: {backend} (expected pandas | sql | sketch)")
+    if backend == "sketch" and table not in SKETCH_COMPUTE:
+        raise ValueError(f"gold.{table} cannot be built from sketches")
+
+    ctx = ctx if ctx is not None else GoldContext()
+    engine = ctx.engine
+
+    months, marked_until = pending_months(engine, f"gold.{table}", full_refresh)
+    if months is not None and not months:
+        print(f"✅ gold.{table} is up to date")
+        return
+
+    if backend == "sql":
+        build_gold_table_in_sql(engine, table, months)
+    elif months is None:
+        result = _compute(table, ctx, backend)
+
+        with engine.begin() as conn:
+            # Fill a copy of the managed table (see sql/gold) and swap it in
+            staging = create_staging(conn, f"gold.{table}")
+
+            result.to_sql(
+                name=staging,
+                schema="gold",
+                con=conn,
+                index=False,
+                if_exists="append",
+                method=insert_method(),
+            )
+
+            publish_table(conn, f"gold.{table}")
 
+        record(rows_out=len(result))
+    else:
+        # Silver is only read as far as these months need it
+        result = _compute(table, GoldContext(engine, months, ctx.processes), backend)
+        result = result[result["month"].isin(months)]
+
+        with engine.begin() as conn:
+            delete_months(conn, f"gold.{table}", months)
+
+            result.to_sql(
+                name=table,
+                schema="gold",
+                con=conn,
+                index=False,
+                if_exists="append",
+                method=insert_method(),
+            )
+
+        record(rows_out=len(result))
+
+    # Separate from the write: if this fails, the months are rebuilt again
     with engine.begin() as conn:
-        conn.execute(text("DROP TABLE IF EXISTS gold.dashboard_monthly"))
-
-        df.to_sql(
-            name="dashboard_monthly",
-            schema="gold",
-            con=conn,
-            index=False,
-            if_exists="replace"
-        )
+        record_build(conn, f"gold.{table}", months, marked_until)
+
+    rebuilt = "all months" if months is None else f"{len(months)} months"
+    print(f"✅ gold.{table} built successfully ({rebuilt})")
+
+
+def build_gold_mrr_monthly(ctx=None, backend="pandas", full_refresh=False):
+    build_gold_table("mrr_monthly", ctx, backend, full_refresh)
+
+
+def build_gold_customer_churn(ctx=None, backend="pandas", full_refresh=False):
+    build_gold_table("customer_churn_monthly", ctx, backend, full_refresh)
+
+
+def build_gold_dau_mau(ctx=None, backend="pandas", full_refresh=False):
+    build_gold_table("dau_mau_monthly", ctx, backend, full_refresh)
+
+
+def build_gold_active_customers(ctx=None, backend="pandas", full_refresh=False):
+    build_gold_table("active_customers_monthly", ctx, backend, full_refresh)
+
 
-    print("✅ gold.dashboard_monthly built successfully")
+def build_gold_dashboard_monthly(ctx=None, backend="pandas", full_refresh=False):
+    build_gold_table("dashboard_monthly", ctx, backend, full_refresh)
 
 
+def build_gold_metrics_cube(ctx=None):
+    # Built in the warehouse on purpose, whatever the backend: every rollup
+    # of the joined subscription and usage rows is aggregated where they
+    # live, and only the cube rows are written, none pass through pandas
+    engine = ctx.engine if ctx is not None else GoldContext().engine
+    build_metrics_cube_in_sql(engine)
+    print("✅ gold.metrics_cube built successfully")
 
 
 if __name__ == "__main__":
-    build_gold_mrr_monthly()
-    build_gold_customer_churn()
-    build_gold_dau_mau()
-    build_gold_active_customers()
-    build_gold_dashboard_monthly()
+    ctx = GoldContext()
+
+    build_gold_mrr_monthly(ctx)
+    build_gold_customer_churn(ctx)
+    build_gold_dau_mau(ctx)
+    build_gold_active_customers(ctx)
+    build_gold_dashboard_monthly(ctx)
+    build_gold_metrics_cube(ctx)
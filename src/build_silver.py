@@ -1,75 +1,92 @@
+import os
+
 import pandas as pd
-from sqlalchemy import text
 
 from config.db import get_engine
-from src.dq_utils import write_rejected_rows
+from src.dates import parse_date_columns
+from src.dialect import hash_bucket
+from src.dq_rules import RuleChecker, check_rule
+from src.dq_utils import add_rule_results, flush_rejected_rows, take_rule_results
+from src.partitioned import PROCESSES, map_partitions, use_processes
+from src.publish import create_staging
+from src.schemas import apply_silver_schema, silver_dtypes
+from src.telemetry import add_metrics, collect_metrics
+from src.incremental import (
+    ROW_HASH,
+    append_silver,
+    append_staged_concurrently,
+    create_delta,
+    merge_delta,
+    needs_full_refresh,
+    publish_silver,
+    read_bronze_delta,
+    replace_silver,
+    stage_delta,
+    stream_bronze_delta,
+    write_silver,
+)
+
+
+# Rows of bronze.usage_events held in memory at a time
+USAGE_EVENTS_CHUNK_ROWS = int(os.getenv("SILVER_USAGE_EVENTS_CHUNK_ROWS", "250000"))
 
 
 
-def build_silver_customers():
+def build_silver_customers(full_refresh=False):
     engine = get_engine()
+    full_refresh = full_refresh or needs_full_refresh(engine, "customers")
 
     # Read from bronze
-    query = """
+    query = f"""
         SELECT
             customer_id,
             customer_name,
             industry,
             country,
             signup_date,
-            plan_type
-        FROM bronze.customers
+            plan_type,
+            {ROW_HASH} AS row_hash
+        FROM bronze.customers b
     """
 
-    df = pd.read_sql(query, engine)
+    df = read_bronze_delta(engine, query, "customers", full_refresh)
 
     # Convert signup_date to proper date
-    df["signup_date"] = pd.to_datetime(df["signup_date"], errors="coerce")
+    parse_date_columns(df, "customers")
 
     # Derived column useful for analytics
     df["signup_year"] = df["signup_date"].dt.year
 
-    with engine.begin() as conn:
-        # Recreate table (idempotent)
-        conn.execute(text("DROP TABLE IF EXISTS silver.customers"))
-
-        df.to_sql(
-            name="customers",
-            schema="silver",
-            con=conn,
-            index=False,
-            if_exists="replace"
-        )
-    duplicates = df[df.duplicated("customer_id", keep=False)]
-
-    write_rejected_rows(
-        table_name="silver.customers",
-        rule_name="PK_UNIQUENESS",
-        reason="Duplicate customer_id found",
-        df=duplicates
-    )
+    df = apply_silver_schema(df, "customers")
+
+    write_silver(engine, df, "customers", full_refresh)
+
+    RuleChecker("customers", engine).check(df)
+
     print("✅ silver.customers built successfully")
 
 
 
-def build_silver_users():
+def build_silver_users(full_refresh=False):
     engine = get_engine()
+    full_refresh = full_refresh or needs_full_refresh(engine, "users")
 
-    query = """
+    query = f"""
         SELECT
             user_id,
             customer_id,
             user_role,
             email,
             created_at,
-            is_active
-        FROM bronze.users
+            is_active,
+            {ROW_HASH} AS row_hash
+        FROM bronze.users b
     """
 
-    df = pd.read_sql(query, engine)
+    df = read_bronze_delta(engine, query, "users", full_refresh)
 
     # Parse created_at date
-    df["created_at"] = pd.to_datetime(df["created_at"], errors="coerce")
+    parse_date_columns(df, "users")
 
     # Normalize boolean
     df["is_active"] = (
@@ -82,34 +99,20 @@ def build_silver_users():
     # Derived column
     df["created_year"] = df["created_at"].dt.year
 
-    with engine.begin() as conn:
-        conn.execute(text("DROP TABLE IF EXISTS silver.users"))
-
-        df.to_sql(
-            name="users",
-            schema="silver",
-            con=conn,
-            index=False,
-            if_exists="replace"
-        )
-    
-    valid_customers = pd.read_sql("SELECT customer_id FROM silver.customers", engine)
-    invalid_users = df[~df["customer_id"].isin(valid_customers["customer_id"])]
-
-    write_rejected_rows(
-        table_name="silver.users",
-        rule_name="FK_CUSTOMER_EXISTS",
-        reason="Invalid customer_id",
-        df=invalid_users
-    )
+    df = apply_silver_schema(df, "users")
+
+    write_silver(engine, df, "users", full_refresh)
+
+    RuleChecker("users", engine).check(df)
 
     print("✅ silver.users built successfully")
 
 
-def build_silver_subscriptions():
+def build_silver_subscriptions(full_refresh=False):
     engine = get_engine()
+    full_refresh = full_refresh or needs_full_refresh(engine, "subscriptions")
 
-    query = """
+    query = f"""
         SELECT
             subscription_id,
             customer_id,
@@ -117,15 +120,15 @@ def build_silver_subscriptions():
             start_date,
             end_date,
             monthly_amount,
-            subscription_status
-        FROM bronze.subscriptions
+            subscription_status,
+            {ROW_HASH} AS row_hash
+        FROM bronze.subscriptions b
     """
 
-    df = pd.read_sql(query, engine)
+    df = read_bronze_delta(engine, query, "subscriptions", full_refresh)
 
-    # Parse dates
-    df["start_date"] = pd.to_datetime(df["start_date"], errors="coerce")
-    df["end_date"] = pd.to_datetime(df["end_date"], errors="coerce")
+    # Parse start_date and end_date
+    parse_date_columns(df, "subscriptions")
 
     # Cast monthly_amount to numeric
     df["monthly_amount"] = pd.to_numeric(df["monthly_amount"], errors="coerce")
@@ -136,33 +139,21 @@ def build_silver_subscriptions():
     # Derived column
     df["start_year"] = df["start_date"].dt.year
 
-    with engine.begin() as conn:
-        conn.execute(text("DROP TABLE IF EXISTS silver.subscriptions"))
-
-        df.to_sql(
-            name="subscriptions",
-            schema="silver",
-            con=conn,
-            index=False,
-            if_exists="replace"
-        )
-    invalid_amounts = df[df["monthly_amount"] < 0]
-
-    write_rejected_rows(
-        table_name="silver.subscriptions",
-        rule_name="AMOUNT_POSITIVE",
-        reason="monthly_amount is negative",
-        df=invalid_amounts
-    )
+    df = apply_silver_schema(df, "subscriptions")
+
+    write_silver(engine, df, "subscriptions", full_refresh)
+
+    RuleChecker("subscriptions", engine).check(df)
 
     print("✅ silver.subscriptions built successfully")
 
 
 
-def build_silver_payments():
+def build_silver_payments(full_refresh=False):
     engine = get_engine()
+    full_refresh = full_refresh or needs_full_refresh(engine, "payments")
 
-    query = """
+    query = f"""
     SELECT
         payment_id,
         customer_id,
@@ -170,15 +161,16 @@ def build_silver_payments():
         payment_date,
         amount AS payment_amount,
         payment_method,
-        payment_status
-    FROM bronze.payments
+        payment_status,
+        {ROW_HASH} AS row_hash
+    FROM bronze.payments b
 """
 
 
-    df = pd.read_sql(query, engine)
+    df = read_bronze_delta(engine, query, "payments", full_refresh)
 
     # Parse payment_date
-    df["payment_date"] = pd.to_datetime(df["payment_date"], errors="coerce")
+    parse_date_columns(df, "payments")
 
     # Cast payment_amount
     df["payment_amount"] = pd.to_numeric(df["payment_amount"], errors="coerce")
@@ -186,77 +178,156 @@ def build_silver_payments():
     # Derived column
     df["payment_year"] = df["payment_date"].dt.year
 
-    with engine.begin() as conn:
-        conn.execute(text("DROP TABLE IF EXISTS silver.payments"))
-
-        df.to_sql(
-            name="payments",
-            schema="silver",
-            con=conn,
-            index=False,
-            if_exists="replace"
-        )
+    df = apply_silver_schema(df, "payments")
 
-    invalid_payments = df[df["payment_amount"] <= 0]
+    write_silver(engine, df, "payments", full_refresh)
 
-    write_rejected_rows(
-        table_name="silver.payments",
-        rule_name="PAYMENT_AMOUNT_POSITIVE",
-        reason="payment_amount is zero or negative",
-        df=invalid_payments
-    )
+    RuleChecker("payments", engine).check(df)
 
     print("✅ silver.payments built successfully")
 
-def build_silver_usage_events():
+
+def transform_usage_events(df, date_parsers=None):
+    # Parse event_date (kept as datetime64, not Python date objects); pass
+    # the same date_parsers for every chunk so each date is parsed once
+    parse_date_columns(df, "usage_events", date_parsers)
+
+    # Cast event_count to integer; counts failing EVENT_COUNT_INTEGER
+    # (fractional or out of range) would abort the Int32 cast, so that rule
+    # is checked first and they are stored as missing
+    df["event_count"] = pd.to_numeric(df["event_count"], errors="coerce")
+    df["event_count"] = df["event_count"].mask(check_rule(df, "usage_events", "EVENT_COUNT_INTEGER"))
+
+    # Derived column
+    df["event_year"] = df["event_date"].dt.year
+
+    return apply_silver_schema(df, "usage_events")
+
+
+# Raw usage events; "b" is the bronze row, for ROW_HASH and partition filters
+USAGE_EVENTS_QUERY = f"""
+    SELECT
+        event_id,
+        user_id,
+        event_type,
+        event_date,
+        event_count,
+        {ROW_HASH} AS row_hash
+    FROM bronze.usage_events b
+"""
+
+
+def build_silver_usage_events(
+    full_refresh=False, chunksize=USAGE_EVENTS_CHUNK_ROWS, processes=PROCESSES
+):
+    """
+    Streams bronze.usage_events through a server-side cursor in chunks of
+    chunksize rows; each chunk is transformed, checked and written before the
+    next one is read, so peak memory depends on chunksize, not table size.
+
+    With processes > 1 (Postgres only), the rows are split by a hash of
+    user_id and each partition is streamed, transformed, checked and staged
+    by its own worker process (see src/partitioned.py).
+    """
     engine = get_engine()
+    full_refresh = full_refresh or needs_full_refresh(engine, "usage_events")
 
-    query = """
-        SELECT
-            event_id,
-            user_id,
-            event_type,
-            event_date,
-            event_count
-        FROM bronze.usage_events
+    if use_processes(processes):
+        _build_usage_events_partitioned(engine, full_refresh, chunksize, processes)
+        return
+
+    checker = RuleChecker("usage_events", engine)
+    date_parsers = {}
+
+    # All chunks are written in one transaction, as with the other tables
+    with engine.begin() as conn:
+        chunks = stream_bronze_delta(engine, USAGE_EVENTS_QUERY, "usage_events", full_refresh, chunksize)
+
+        for i, df in enumerate(chunks):
+            df = transform_usage_events(df, date_parsers)
+
+            if not full_refresh:
+                # Merged once the delta query (which reads silver) is done
+                stage_delta(conn, df, "usage_events", replace=i == 0)
+            elif i == 0:
+                replace_silver(conn, df, "usage_events", publish=False)
+            else:
+                append_silver(conn, df, "usage_events", staged=True)
+
+            checker.check(df)
+
+        if full_refresh:
+            publish_silver(conn, "usage_events")
+        else:
+            merge_delta(conn, "usage_events", df.columns)
+
+    print("✅ silver.usage_events built successfully")
+
+
+def _usage_events_partition(partition, partitions, full_refresh, chunksize):
+    """
+    Map step of the partitioned build, run in a worker process: streams,
+    transforms and checks the bronze rows of one user_id hash partition and
+    appends them to the staging copy (full refresh) or the delta table.
+    Returns (rule results, metrics).
     """
+    engine = get_engine()
+    query = f"{USAGE_EVENTS_QUERY} WHERE {hash_bucket('b.user_id', partitions)} = {int(partition)}"
 
-    df = pd.read_sql(query, engine)
+    checker = RuleChecker("usage_events", engine)
+    date_parsers = {}
 
-    # Parse event_date
-    df["event_date"] = pd.to_datetime(df["event_date"], errors="coerce").dt.date
+    with collect_metrics() as metrics:
+        for df in stream_bronze_delta(engine, query, "usage_events", full_refresh, chunksize):
+            df = transform_usage_events(df, date_parsers)
 
-    # Cast event_count to integer
-    df["event_count"] = pd.to_numeric(df["event_count"], errors="coerce")
+            if full_refresh:
+                append_staged_concurrently(engine, df, "usage_events")
+            else:
+                with engine.begin() as conn:
+                    stage_delta(conn, df, "usage_events", replace=False)
 
-    # Derived column
-    df["event_year"] = pd.DatetimeIndex(df["event_date"]).year
+            checker.check(df)
+
+        results = take_rule_results()
 
+    return results, metrics
+
+
+def _build_usage_events_partitioned(engine, full_refresh, chunksize, processes):
+    # Workers write to a staging or delta table that readers never see;
+    # it is swapped in or merged in one transaction once all of them finished
     with engine.begin() as conn:
-        conn.execute(text("DROP TABLE IF EXISTS silver.usage_events"))
-
-        df.to_sql(
-            name="usage_events",
-            schema="silver",
-            con=conn,
-            index=False,
-            if_exists="replace"
-        )
-    invalid_events = df[df["event_count"] < 0]
-
-    write_rejected_rows(
-        table_name="silver.usage_events",
-        rule_name="EVENT_COUNT_NON_NEGATIVE",
-        reason="event_count is negative",
-        df=invalid_events
-    )
+        if full_refresh:
+            create_staging(conn, "silver.usage_events")
+        else:
+            create_delta(conn, "usage_events")
 
-    print("✅ silver.usage_events built successfully")
+    partials = map_partitions(_usage_events_partition, processes, full_refresh, chunksize)
+
+    with engine.begin() as conn:
+        if full_refresh:
+            publish_silver(conn, "usage_events")
+        else:
+            merge_delta(conn, "usage_events", silver_dtypes("usage_events"))
+
+    # Reduce
+    for results, metrics in partials:
+        add_rule_results(results)
+        add_metrics(metrics)
+
+    print(f"✅ silver.usage_events built successfully ({processes} processes)")
 
 
 if __name__ == "__main__":
-    build_silver_customers()
-    build_silver_users()
-    build_silver_subscriptions()
-    build_silver_payments()
-    build_silver_usage_events()
+    import sys
+
+    full_refresh = "--full-refresh" in sys.argv
+
+    build_silver_customers(full_refresh)
+    build_silver_users(full_refresh)
+    build_silver_subscriptions(full_refresh)
+    build_silver_payments(full_refresh)
+    build_silver_usage_events(full_refresh)
+
+    flush_rejected_rows()
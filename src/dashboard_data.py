@@ -0,0 +1,115 @@
+import os
+
+import pandas as pd
+from sqlalchemy import text
+
+from src.dialect import is_duckdb, table_exists
+from src.gold_sql import CUBE_ALL, CUBE_DIMENSIONS
+
+
+# How long the dashboard trusts its last version check before asking
+# Postgres again; page interactions in between never touch the database
+VERSION_TTL_SECONDS = int(os.getenv("DASHBOARD_VERSION_TTL", "30"))
+
+
+def data_version(engine):
+    """
+    Identifies the current build of the gold tables the dashboard reads.
+
+    It combines the end of the last successful gold stage recorded in
+    audit.pipeline_runs with the storage id of gold.dashboard_monthly, which
+    changes whenever the table is rebuilt in full, and its last build in
+    audit.gold_builds, which also covers months replaced in place; both
+    change even outside src.etl. All are catalogue-sized lookups, far
+    cheaper than reading the data.
+    """
+    # DuckDB has no storage id, so there only runs recorded by src.etl count
+    dashboard_storage = (
+        "NULL"
+        if is_duckdb()
+        else "(SELECT relfilenode FROM pg_class WHERE oid = to_regclass('gold.dashboard_monthly'))"
+    )
+    query = f"""
+        SELECT
+            (
+                SELECT MAX(ended_at)
+                FROM audit.pipeline_runs
+                WHERE stage LIKE 'gold.%'
+                  AND status = 'success'
+            ) AS last_gold_run,
+            {dashboard_storage} AS dashboard_storage,
+            (
+                SELECT updated_at
+                FROM audit.gold_builds
+                WHERE table_name = 'gold.dashboard_monthly'
+            ) AS dashboard_built
+    """
+
+    with engine.connect() as conn:
+        last_gold_run, dashboard_storage, dashboard_built = conn.execute(text(query)).one()
+
+    return f"{last_gold_run}|{dashboard_storage}|{dashboard_built}"
+
+
+def load_dashboard_monthly(engine):
+    """
+    gold.dashboard_monthly, ready to chart: one row per month, oldest first
+    """
+    query = """
+        SELECT *
+        FROM gold.dashboard_monthly
+        ORDER BY month
+    """
+
+    df = pd.read_sql(query, engine)
+
+    df["month"] = pd.to_datetime(df["month"])
+    df["month_str"] = df["month"].dt.strftime("%Y-%m")
+    return df
+
+
+def load_cube_options(engine):
+    """
+    Values each gold.metrics_cube dimension can be filtered on, or an empty
+    dict when the cube has not been built
+    """
+    if not table_exists(engine, "gold.metrics_cube"):
+        return {}
+
+    with engine.connect() as conn:
+        return {
+            dimension: conn.execute(
+                text(
+                    f"SELECT DISTINCT {dimension} FROM gold.metrics_cube "
+                    f"WHERE {dimension} <> :all ORDER BY 1"
+                ),
+                {"all": CUBE_ALL},
+            ).scalars().all()
+            for dimension in CUBE_DIMENSIONS
+        }
+
+
+def load_cube_slice(engine, filters):
+    """
+    The dashboard metrics for one slice of gold.metrics_cube. filters maps
+    each dimension to a value (missing dimensions are ALL); only that slice's
+    rows are read, through the cube's index.
+    """
+    query = f"""
+        SELECT
+            month,
+            mrr,
+            active_customers,
+            churn_rate,
+            dau_mau_ratio
+        FROM gold.metrics_cube
+        WHERE {" AND ".join(f"{d} = :{d}" for d in CUBE_DIMENSIONS)}
+        ORDER BY month
+    """
+    params = {d: filters.get(d, CUBE_ALL) for d in CUBE_DIMENSIONS}
+
+    df = pd.read_sql(text(query), engine, params=params)
+
+    df["month"] = pd.to_datetime(df["month"])
+    df["month_str"] = df["month"].dt.strftime("%Y-%m")
+    return df
@@ -0,0 +1,115 @@
+import numpy as np
+import pandas as pd
+
+from src.schemas import DATE_FORMATS, DATETIME
+
+
+# Formats tried by detect_format, in order of preference
+CANDIDATE_FORMATS = [
+    "%Y-%m-%d",
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%dT%H:%M:%S",
+    "%Y/%m/%d",
+    "%d/%m/%Y",
+    "%m/%d/%Y",
+    "%d-%m-%Y",
+    "%d.%m.%Y",
+]
+
+# Distinct values a format is detected from
+DETECT_SAMPLE = 1000
+
+
+def detect_format(values, candidates=CANDIDATE_FORMATS):
+    """
+    The candidate format that parses the most of a sample of the distinct
+    values (the first one on ties), or None when none parses any
+    """
+    sample = pd.Series(pd.unique(np.asarray(values, dtype=object))).dropna().head(DETECT_SAMPLE)
+
+    best, best_count = None, 0
+    for fmt in candidates:
+        count = pd.to_datetime(sample, format=fmt, errors="coerce").notna().sum()
+        if count > best_count:
+            best, best_count = fmt, count
+    return best
+
+
+class DateParser:
+    """
+    Parses the raw date strings of one silver column with a single format,
+    from DATE_FORMATS or detected from the first values seen.
+
+    Each distinct string is parsed once and remembered, and rows get their
+    date through a vectorized lookup, so a column that repeats a few
+    thousand dates over millions of rows (or over many chunks, when the
+    parser is reused) costs a few thousand parses.
+    """
+
+    def __init__(self, table, column, fmt=None):
+        self.table = table
+        self.column = column
+        self.format = fmt or DATE_FORMATS.get(table, {}).get(column)
+
+        # Raw string -> parsed date, and whether it failed to parse
+        self._known = pd.DataFrame({"date": pd.Series(dtype=DATETIME), "bad": pd.Series(dtype=bool)})
+
+    def _learn(self, values):
+        stripped = values.str.strip()
+        present = stripped != ""
+
+        if self.format is None:
+            self.format = detect_format(stripped[present])
+
+        dates = pd.to_datetime(stripped, format=self.format, errors="coerce")
+        learned = pd.DataFrame(
+            {"date": dates.astype(DATETIME), "bad": present & dates.isna()},
+            index=values,
+        )
+        self._known = pd.concat([self._known, learned])
+
+    def parse(self, values):
+        """
+        Returns (dates, unparseable): values parsed as datetime64, with NaT
+        for missing, blank and unparseable values, and a boolean array that
+        is True where a value is present but not a date
+        """
+        codes, uniques = pd.factorize(values)  # missing values get code -1
+        uniques = pd.Index(np.asarray(uniques, dtype=object))
+
+        new = uniques[self._known.index.get_indexer(uniques) == -1]
+        if len(new):
+            self._learn(new)
+
+        known = self._known.reindex(uniques)
+        # Appended entries are what code -1 picks
+        dates = np.append(known["date"].to_numpy(DATETIME), np.datetime64("NaT", "ns"))[codes]
+        bad = np.append(known["bad"].to_numpy(bool), False)[codes]
+
+        return pd.Series(dates, index=values.index, name=values.name), bad
+
+    def parse_column(self, df):
+        """
+        Replaces df[column] by its parsed dates and returns the number of
+        rows whose value is present but not a date. Those rows fail the
+        column's not_null rule (<COLUMN>_VALID in src/dq_rules.py), which
+        reports them once, together with the missing ones.
+        """
+        dates, bad = self.parse(df[self.column])
+        df[self.column] = dates
+        return int(bad.sum())
+
+
+def parse_date_columns(df, table, parsers=None):
+    """
+    Parses every DATE_FORMATS column of silver.<table> in df. Pass the same
+    parsers dict for every chunk of a table to parse each string only once.
+    """
+    parsers = parsers if parsers is not None else {}
+
+    for column in DATE_FORMATS.get(table, {}):
+        if column not in parsers:
+            parsers[column] = DateParser(table, column)
+        parsers[column].parse_column(df)
+
+    return df
@@ -0,0 +1,123 @@
+import io
+
+import pandas as pd
+from sqlalchemy import text
+
+from config.db import get_backend
+
+
+# strftime directives used by date_text() and their Postgres to_char patterns
+_TO_CHAR = {"%Y": "YYYY", "%m": "MM", "%d": "DD"}
+
+
+def is_duckdb():
+    return get_backend() == "duckdb"
+
+
+def regex_match(expr, param):
+    """
+    SQL condition that expr contains a match of the regex bound to :param
+    """
+    if is_duckdb():
+        return f"regexp_matches({expr}, :{param})"
+    return f"{expr} ~ :{param}"
+
+
+def date_text(expr, fmt):
+    """
+    SQL formatting a date as text, fmt given as strftime directives
+    (%Y, %m, %d)
+    """
+    if is_duckdb():
+        return f"strftime({expr}, '{fmt}')"
+
+    pattern = fmt
+    for directive, to_char in _TO_CHAR.items():
+        pattern = pattern.replace(directive, to_char)
+    return f"to_char({expr}, '{pattern}')"
+
+
+def row_fingerprint(alias):
+    """
+    Aggregate over the rows of a grouped query whose value changes whenever
+    any row does, independent of row order
+    """
+    if is_duckdb():
+        return f"SUM(hash({alias}))::text"
+    return f"SUM(('x' || left(md5({alias}::text), 16))::bit(64)::bigint)::text"
+
+
+def hash_bucket(expr, buckets):
+    """
+    SQL assigning each value of expr to one of buckets hash buckets, as an
+    integer from 0 to buckets - 1 (NULLs go to bucket 0)
+    """
+    if is_duckdb():
+        return f"COALESCE(hash({expr}) % {int(buckets)}, 0)"
+    return f"COALESCE(abs(hashtext({expr})::bigint) % {int(buckets)}, 0)"
+
+
+def table_columns(engine, table):
+    """
+    Column names of a table, empty when it does not exist. Read from
+    information_schema, which both backends provide.
+    """
+    schema, name = table.split(".")
+    with engine.connect() as conn:
+        return conn.execute(
+            text(
+                "SELECT column_name FROM information_schema.columns "
+                "WHERE table_schema = :schema AND table_name = :name "
+                "ORDER BY ordinal_position"
+            ),
+            {"schema": schema, "name": name},
+        ).scalars().all()
+
+
+def table_exists(engine, table):
+    return bool(table_columns(engine, table))
+
+
+def _duckdb_insert(pd_table, conn, keys, data_iter):
+    table = f"{pd_table.schema}.{pd_table.name}" if pd_table.schema else pd_table.name
+    columns = ", ".join(f'"{key}"' for key in keys)
+    frame = pd.DataFrame(list(data_iter), columns=keys)
+
+    driver_connection = conn.connection.driver_connection
+    driver_connection.register("_insert_frame", frame)
+    try:
+        conn.exec_driver_sql(f"INSERT INTO {table} ({columns}) SELECT {columns} FROM _insert_frame")
+    finally:
+        driver_connection.unregister("_insert_frame")
+    return len(frame)
+
+
+def insert_method():
+    """
+    method= for DataFrame.to_sql: pandas' default on Postgres; on DuckDB,
+    where row-by-row inserts are slow, one INSERT ... SELECT per chunk
+    """
+    return _duckdb_insert if is_duckdb() else None
+
+
+def copy_frame(dbapi_conn, cursor, df, table_name):
+    """
+    Bulk-inserts df into table_name on a raw DBAPI connection: COPY on
+    Postgres, a scan of the registered frame on DuckDB
+    """
+    columns = ", ".join(df.columns)
+
+    if is_duckdb():
+        dbapi_conn.driver_connection.register("_copy_frame", df)
+        try:
+            cursor.execute(
+                f"INSERT INTO {table_name} ({columns}) SELECT {columns} FROM _copy_frame"
+            )
+        finally:
+            dbapi_conn.driver_connection.unregister("_copy_frame")
+        return
+
+    buffer = io.StringIO()
+    df.to_csv(buffer, index=False, header=False)
+    buffer.seek(0)
+    cursor.copy_expert(f"COPY {table_name} ({columns}) FROM STDIN WITH (FORMAT csv)", buffer)
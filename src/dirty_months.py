@@ -0,0 +1,247 @@
+import os
+
+import pandas as pd
+from sqlalchemy import bindparam, text
+
+
+# Gold tables rebuilt month by month (gold.active_users_daily and
+# gold.usage_sketches: the days of those months), by the table whose
+# changes make their months stale.
+# Rebuilding one of them in turn marks its months stale in the tables built
+# from it.
+MONTHLY_DEPENDENTS = {
+    "silver.subscriptions": [
+        "gold.mrr_monthly",
+        "gold.customer_churn_monthly",
+        "gold.active_customers_monthly",
+    ],
+    "silver.usage_events": [
+        "gold.dau_mau_monthly",
+        "gold.active_users_daily",
+        "gold.usage_sketches",
+    ],
+    # Sketches are also kept per customer_id and plan_type of the user
+    "silver.users": ["gold.usage_sketches"],
+    "silver.customers": ["gold.usage_sketches"],
+    "gold.mrr_monthly": ["gold.dashboard_monthly"],
+    "gold.customer_churn_monthly": ["gold.dashboard_monthly"],
+    "gold.active_customers_monthly": ["gold.dashboard_monthly"],
+    "gold.dau_mau_monthly": ["gold.dashboard_monthly"],
+}
+
+# Gold tables are rebuilt in full when their last full build is older than
+# this, to catch anything the month tracking missed (0: every run)
+FULL_REBUILD_DAYS = int(os.getenv("GOLD_FULL_REBUILD_DAYS", "7"))
+
+# Months whose gold rows change when the silver rows listed in
+# silver.{stale} (by row_hash) are replaced by the rows staged in
+# silver.{delta} (see merge_delta). For subscriptions these are all months
+# of every customer involved, old rows and new: new and churned customer
+# counts depend on a customer's whole history, e.g. churn in month m
+# depends on activity in m + 1. For users and customers these are the
+# months of the events of every user involved.
+CHANGED_MONTHS_SQL = {
+    "subscriptions": """
+        WITH customers AS (
+            SELECT customer_id FROM silver.{delta}
+            UNION
+            SELECT customer_id
+            FROM silver.subscriptions
+            WHERE row_hash IN (SELECT row_hash FROM silver.{stale})
+        ),
+        spans AS (
+            SELECT start_date, end_date FROM silver.{delta}
+            UNION ALL
+            SELECT start_date, end_date
+            FROM silver.subscriptions
+            WHERE row_hash IN (SELECT row_hash FROM silver.{stale})
+               OR customer_id IN (SELECT customer_id FROM customers)
+        )
+        SELECT DISTINCT m.month
+        FROM spans
+        CROSS JOIN LATERAL generate_series(
+            date_trunc('month', start_date),
+            date_trunc('month', COALESCE(end_date, start_date)),
+            interval '1 month'
+        ) AS m(month)
+        WHERE start_date IS NOT NULL
+    """,
+    "usage_events": """
+        SELECT DISTINCT date_trunc('month', event_date)::timestamp AS month
+        FROM (
+            SELECT event_date FROM silver.{delta}
+            UNION ALL
+            SELECT event_date
+            FROM silver.usage_events
+            WHERE row_hash IN (SELECT row_hash FROM silver.{stale})
+        ) e
+        WHERE event_date IS NOT NULL
+    """,
+    "users": """
+        SELECT DISTINCT date_trunc('month', event_date)::timestamp AS month
+        FROM silver.usage_events
+        WHERE event_date IS NOT NULL
+          AND user_id IN (
+              SELECT user_id FROM silver.{delta}
+              UNION
+              SELECT user_id
+              FROM silver.users
+              WHERE row_hash IN (SELECT row_hash FROM silver.{stale})
+          )
+    """,
+    "customers": """
+        SELECT DISTINCT date_trunc('month', event_date)::timestamp AS month
+        FROM silver.usage_events
+        WHERE event_date IS NOT NULL
+          AND user_id IN (
+              SELECT user_id
+              FROM silver.users
+              WHERE customer_id IN (
+                  SELECT customer_id FROM silver.{delta}
+                  UNION
+                  SELECT customer_id
+                  FROM silver.customers
+                  WHERE row_hash IN (SELECT row_hash FROM silver.{stale})
+              )
+          )
+    """,
+}
+
+
+def is_monthly(table):
+    """
+    True for gold tables rebuilt month by month, e.g. "gold.mrr_monthly"
+    """
+    return any(table in tables for tables in MONTHLY_DEPENDENTS.values())
+
+
+def _timestamps(months):
+    return [month.to_pydatetime() for month in pd.DatetimeIndex(months)]
+
+
+def mark_months(conn, table, months=None):
+    """
+    Marks the given months (default: all) of the gold tables built from
+    table as stale
+    """
+    targets = MONTHLY_DEPENDENTS.get(table, [])
+    months = [None] if months is None else _timestamps(months)
+    if not targets or not months:
+        return
+
+    conn.execute(
+        text("INSERT INTO audit.gold_dirty_months (table_name, month) VALUES (:table_name, :month)"),
+        [{"table_name": target, "month": month} for target in targets for month in months],
+    )
+
+
+def mark_changed_months(conn, table, delta, stale):
+    """
+    Marks the months changed by replacing the rows of silver.<table> listed
+    in silver.<stale> by those of silver.<delta>. Run it before the replace.
+    """
+    if f"silver.{table}" not in MONTHLY_DEPENDENTS:
+        return
+
+    months = conn.execute(
+        text(CHANGED_MONTHS_SQL[table].format(delta=delta, stale=stale))
+    ).scalars().all()
+    mark_months(conn, f"silver.{table}", months)
+
+
+def _needs_full_build(conn, table):
+    if FULL_REBUILD_DAYS <= 0:
+        return True
+
+    if not conn.execute(text(f"SELECT EXISTS (SELECT 1 FROM {table})")).scalar():
+        return True
+
+    # Never built, or last built in full too long ago
+    recent = conn.execute(
+        text(
+            "SELECT last_full_build_at >= CURRENT_TIMESTAMP - :days * INTERVAL '1 day' "
+            "FROM audit.gold_builds WHERE table_name = :table_name"
+        ),
+        {"days": FULL_REBUILD_DAYS, "table_name": table},
+    ).scalar()
+    return not recent
+
+
+def pending_months(engine, table, full_refresh=False):
+    """
+    Returns (months, marked_until): the stale months of a monthly gold table
+    (possibly none), or None when it is rebuilt in full instead, and the
+    latest mark read, to pass to record_build.
+
+    It is rebuilt in full when full_refresh, when it is empty, when an input
+    was rebuilt in full or when its last full build is older than
+    GOLD_FULL_REBUILD_DAYS days.
+    """
+    with engine.connect() as conn:
+        marks = conn.execute(
+            text("SELECT month, marked_at FROM audit.gold_dirty_months WHERE table_name = :table_name"),
+            {"table_name": table},
+        ).all()
+        full_build = full_refresh or _needs_full_build(conn, table)
+
+    marked_until = max((marked_at for _, marked_at in marks), default=None)
+    if full_build or any(month is None for month, _ in marks):
+        return None, marked_until
+
+    return sorted(pd.DatetimeIndex({month for month, _ in marks})), marked_until
+
+
+def delete_months(conn, table, months):
+    """
+    Deletes the rows of the given months from a monthly gold table
+    """
+    conn.execute(
+        text(f"DELETE FROM {table} WHERE month IN :months").bindparams(
+            bindparam("months", expanding=True)
+        ),
+        {"months": _timestamps(months)},
+    )
+
+
+def record_build(conn, table, months, marked_until):
+    """
+    Records a build of the given months (None: all) of a monthly gold
+    table: clears the marks it consumed and marks the same months stale in
+    the tables built from it
+    """
+    if marked_until is not None:
+        conn.execute(
+            text(
+                "DELETE FROM audit.gold_dirty_months "
+                "WHERE table_name = :table_name AND marked_at <= :marked_until"
+            ),
+            {"table_name": table, "marked_until": marked_until},
+        )
+
+    mark_months(conn, table, months)
+
+    conn.execute(
+        text(
+            """
+            INSERT INTO audit.gold_builds AS b (
+                table_name, months_rebuilt, last_full_build_at, updated_at
+            )
+            VALUES (
+                :table_name, :months_rebuilt,
+                CASE WHEN :full_build THEN CURRENT_TIMESTAMP END,
+                CURRENT_TIMESTAMP
+            )
+            ON CONFLICT (table_name) DO UPDATE SET
+                months_rebuilt = EXCLUDED.months_rebuilt,
+                last_full_build_at = COALESCE(
+                    EXCLUDED.last_full_build_at, b.last_full_build_at
+                ),
+                updated_at = EXCLUDED.updated_at
+            """
+        ),
+        {
+            "table_name": table,
+            "months_rebuilt": None if months is None else len(months),
+            "full_build": months is None,
+        },
+    )
@@ -0,0 +1,261 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from config.db import get_engine
+from src.dq_utils import write_rejected_rows
+from src.schemas import silver_dtypes
+
+
+@dataclass(frozen=True)
+class Rule:
+    """
+    A data-quality rule on one silver column. Rows that fail it are still
+    written to silver, and are reported to the audit tables under name.
+
+    kind is one of:
+      pk        the value is unique within the rows being checked and
+                among the other rows already in the silver table
+      fk        the value exists in the silver column named by references
+      not_null  the value is present (i.e. it was also parseable)
+      range     min_value <= value <= max_value (< and > unless inclusive)
+      integer   the value is a whole number, and in range if bounds are set
+      enum      the value is one of values
+    Missing values only ever fail not_null and fk rules.
+    """
+
+    name: str
+    kind: str
+    column: str
+    reason: str
+    references: str = None   # fk: "<silver table>.<column>"
+    values: tuple = ()       # enum
+    ignore_case: bool = False
+    min_value: float = None  # range
+    max_value: float = None
+    inclusive: bool = True
+
+
+PLANS = ("Basic", "Pro", "Enterprise")
+
+
+# Rules of every silver table. Duplicate event_ids are not checked: usage
+# events are checked one chunk at a time.
+SILVER_RULES = {
+    "customers": [
+        Rule("PK_UNIQUENESS", "pk", "customer_id", "Duplicate customer_id found"),
+        Rule("CUSTOMER_ID_NOT_NULL", "not_null", "customer_id", "customer_id is missing"),
+        Rule("SIGNUP_DATE_VALID", "not_null", "signup_date", "signup_date is missing or unparseable"),
+        Rule("PLAN_TYPE_VALID", "enum", "plan_type", "Unknown plan_type", values=PLANS),
+    ],
+    "users": [
+        Rule("PK_UNIQUENESS", "pk", "user_id", "Duplicate user_id found"),
+        Rule("USER_ID_NOT_NULL", "not_null", "user_id", "user_id is missing"),
+        Rule(
+            "FK_CUSTOMER_EXISTS", "fk", "customer_id", "Invalid customer_id",
+            references="customers.customer_id",
+        ),
+        Rule("CREATED_AT_VALID", "not_null", "created_at", "created_at is missing or unparseable"),
+        Rule("IS_ACTIVE_VALID", "not_null", "is_active", "is_active is not true or false"),
+        Rule(
+            "USER_ROLE_VALID", "enum", "user_role", "Unknown user_role",
+            values=("admin", "member", "viewer"),
+        ),
+    ],
+    "subscriptions": [
+        Rule("PK_UNIQUENESS", "pk", "subscription_id", "Duplicate subscription_id found"),
+        Rule("SUBSCRIPTION_ID_NOT_NULL", "not_null", "subscription_id", "subscription_id is missing"),
+        Rule(
+            "FK_CUSTOMER_EXISTS", "fk", "customer_id", "Invalid customer_id",
+            references="customers.customer_id",
+        ),
+        Rule("START_DATE_VALID", "not_null", "start_date", "start_date is missing or unparseable"),
+        Rule("MONTHLY_AMOUNT_VALID", "not_null", "monthly_amount", "monthly_amount is missing or not a number"),
+        Rule("AMOUNT_POSITIVE", "range", "monthly_amount", "monthly_amount is negative", min_value=0),
+        Rule("PLAN_NAME_VALID", "enum", "plan_name", "Unknown plan_name", values=PLANS),
+        Rule(
+            "SUBSCRIPTION_STATUS_VALID", "enum", "subscription_status", "Unknown subscription_status",
+            values=("active", "cancelled"), ignore_case=True,
+        ),
+    ],
+    "payments": [
+        Rule("PK_UNIQUENESS", "pk", "payment_id", "Duplicate payment_id found"),
+        Rule("PAYMENT_ID_NOT_NULL", "not_null", "payment_id", "payment_id is missing"),
+        Rule(
+            "FK_CUSTOMER_EXISTS", "fk", "customer_id", "Invalid customer_id",
+            references="customers.customer_id",
+        ),
+        Rule(
+            "FK_SUBSCRIPTION_EXISTS", "fk", "subscription_id", "Invalid subscription_id",
+            references="subscriptions.subscription_id",
+        ),
+        Rule("PAYMENT_DATE_VALID", "not_null", "payment_date", "payment_date is missing or unparseable"),
+        Rule("PAYMENT_AMOUNT_VALID", "not_null", "payment_amount", "payment_amount is missing or not a number"),
+        Rule(
+            "PAYMENT_AMOUNT_POSITIVE", "range", "payment_amount", "payment_amount is zero or negative",
+            min_value=0, inclusive=False,
+        ),
+        Rule(
+            "PAYMENT_METHOD_VALID", "enum", "payment_method", "Unknown payment_method",
+            values=("card", "upi", "bank_transfer"),
+        ),
+        Rule(
+            "PAYMENT_STATUS_VALID", "enum", "payment_status", "Unknown payment_status",
+            values=("paid", "failed", "refunded"),
+        ),
+    ],
+    "usage_events": [
+        Rule("EVENT_ID_NOT_NULL", "not_null", "event_id", "event_id is missing"),
+        Rule(
+            "FK_USER_EXISTS", "fk", "user_id", "Invalid user_id",
+            references="users.user_id",
+        ),
+        Rule("EVENT_DATE_VALID", "not_null", "event_date", "event_date is missing or unparseable"),
+        Rule(
+            "EVENT_COUNT_INTEGER", "integer", "event_count", "event_count is not a 32-bit integer",
+            min_value=-(2**31), max_value=2**31 - 1,
+        ),
+        Rule("EVENT_COUNT_NON_NEGATIVE", "range", "event_count", "event_count is negative", min_value=0),
+        Rule(
+            "EVENT_TYPE_VALID", "enum", "event_type", "Unknown event_type",
+            values=("login", "feature_use", "report_view", "export", "api_call"),
+        ),
+    ],
+}
+
+
+def referenced_tables(table):
+    """
+    Silver tables the foreign-key rules of silver.<table> read, which must
+    be built before it
+    """
+    return sorted(
+        {f"silver.{rule.references.split('.')[0]}" for rule in SILVER_RULES[table] if rule.kind == "fk"}
+    )
+
+
+def load_key_set(engine, reference):
+    """
+    Distinct non-null values of a silver column as a pandas Index, whose
+    hash table is built once and reused by every lookup
+    """
+    table, column = reference.split(".")
+    keys = pd.read_sql(
+        f"SELECT DISTINCT {column} FROM silver.{table} WHERE {column} IS NOT NULL",
+        engine,
+        dtype=silver_dtypes(table, [column]),
+    )
+    return pd.Index(keys[column])
+
+
+def load_stored_keys(engine, table, column):
+    """
+    (column, row_hash) of the silver.<table> rows with a non-null column,
+    to check new rows' keys against the rows already stored
+    """
+    return pd.read_sql(
+        f"SELECT {column}, row_hash FROM silver.{table} WHERE {column} IS NOT NULL",
+        engine,
+        dtype=silver_dtypes(table, [column, "row_hash"]),
+    )
+
+
+def _fails(values, rule, key_sets):
+    if rule.kind == "pk":
+        return values.duplicated(keep=False) & values.notna()
+
+    if rule.kind == "fk":
+        return key_sets[rule.references].get_indexer(values) == -1
+
+    if rule.kind == "not_null":
+        return values.isna()
+
+    if rule.kind in ("range", "integer"):
+        fails = pd.Series(False, index=values.index)
+        if rule.kind == "integer":
+            fails |= (values % 1 != 0) & values.notna()
+        if rule.min_value is not None:
+            fails |= values < rule.min_value if rule.inclusive else values <= rule.min_value
+        if rule.max_value is not None:
+            fails |= values > rule.max_value if rule.inclusive else values >= rule.max_value
+        return fails.fillna(False).astype(bool)
+
+    if rule.kind == "enum":
+        checked = values.str.lower() if rule.ignore_case else values
+        return ~checked.isin(rule.values) & values.notna()
+
+    raise ValueError(f"Invalid rule kind: {rule.kind} (expected pk | fk | not_null | range | integer | enum)")
+
+
+class RuleChecker:
+    """
+    Checks frames of silver.<table> against its rules in one vectorized pass
+    per frame. Foreign-key key sets, and the keys already stored for the
+    primary-key rules, are read once, when the checker is created, so a
+    table written in chunks does not re-read them per chunk. Create it
+    after writing the frames: stored rows with the same row_hash as a
+    checked row are that row itself and are not counted as duplicates.
+    """
+
+    def __init__(self, table, engine=None, rules=None):
+        self.table = table
+        self.rules = SILVER_RULES[table] if rules is None else rules
+
+        if engine is None and any(rule.kind in ("pk", "fk") for rule in self.rules):
+            engine = get_engine()
+        self.key_sets = {
+            rule.references: load_key_set(engine, rule.references)
+            for rule in self.rules
+            if rule.kind == "fk"
+        }
+        self.stored_keys = {
+            rule.column: load_stored_keys(engine, table, rule.column)
+            for rule in self.rules
+            if rule.kind == "pk"
+        }
+
+    def masks(self, df):
+        """
+        {rule name: boolean array, True where the row fails the rule}
+        """
+        masks = {
+            rule.name: np.asarray(_fails(df[rule.column], rule, self.key_sets), dtype=bool)
+            for rule in self.rules
+        }
+
+        for rule in self.rules:
+            if rule.kind == "pk":
+                # Keys of the stored rows other than the checked ones
+                stored = self.stored_keys[rule.column]
+                others = stored.loc[~stored["row_hash"].isin(df["row_hash"]), rule.column]
+                masks[rule.name] = masks[rule.name] | df[rule.column].isin(others).to_numpy(dtype=bool)
+        return masks
+
+    def check(self, df):
+        """
+        Sends the rows failing each rule to the audit sink and returns the
+        masks
+        """
+        masks = self.masks(df)
+
+        for rule in self.rules:
+            mask = masks[rule.name]
+            if mask.any():
+                write_rejected_rows(
+                    table_name=f"silver.{self.table}",
+                    rule_name=rule.name,
+                    reason=rule.reason,
+                    df=df[mask],
+                )
+        return masks
+
+
+def check_rule(df, table, name):
+    """
+    Checks df against one rule of silver.<table> that reads no key set,
+    e.g. before a cast that the failing values would break, and returns its
+    mask (the failing rows go to the audit sink as for check)
+    """
+    rules = [rule for rule in SILVER_RULES[table] if rule.name == name]
+    return RuleChecker(table, rules=rules).check(df)[name]
@@ -1,33 +1,198 @@
-import json
+import os
+import threading
+from contextlib import closing
+
 import pandas as pd
-from sqlalchemy import text
 from config.db import get_engine
+from src.dialect import copy_frame
+from src.telemetry import record
+
+
+# Example rows stored per rule and run (0 = keep every rejected row).
+# Counts in audit.rule_results are always exact.
+MAX_ROWS_PER_RULE = int(os.getenv("AUDIT_MAX_ROWS_PER_RULE", "0"))
+
+# How example rows are picked when a rule has more than the cap: "head" or "random"
+SAMPLING = os.getenv("AUDIT_SAMPLING", "head")
+
+# Buffered rows that trigger an early flush, to bound memory on bad drops
+FLUSH_THRESHOLD = int(os.getenv("AUDIT_FLUSH_THRESHOLD", "1000000"))
+
+
+def serialize_rows(df):
+    """
+    Serializes every row of df to a JSON object string in one vectorized pass.
+    Values are stored as text; missing values become JSON null.
+    """
+    as_text = df.astype(str).where(df.notna(), None)
+    return as_text.to_json(orient="records", lines=True, force_ascii=False).splitlines()
+
+
+class AuditSink:
+    """
+    Buffers rejected rows from every rule in a run and writes them to
+    audit.rejected_rows with a single COPY on flush(), together with one
+    audit.rule_results row per rule.
+    """
+
+    def __init__(
+        self,
+        max_rows_per_rule=MAX_ROWS_PER_RULE,
+        sampling=SAMPLING,
+        flush_threshold=FLUSH_THRESHOLD,
+    ):
+        if sampling not in ("head", "random"):
+            raise ValueError(f"Invalid audit sampling: {sampling} (expected head | random)")
+
+        self.max_rows_per_rule = max_rows_per_rule
+        self.sampling = sampling
+        self.flush_threshold = flush_threshold
+
+        self._lock = threading.Lock()
+        self._frames = []
+        self._buffered = 0
+        # (table_name, rule_name) -> [reason, rejected_count, stored_count]
+        self._results = {}
+
+    def add(self, table_name, rule_name, reason, df):
+        if df is None or df.empty:
+            return
+
+        record(rows_rejected=len(df))
+
+        with self._lock:
+            result = self._results.setdefault((table_name, rule_name), [reason, 0, 0])
+            result[1] += len(df)
+
+            sample = df
+            if self.max_rows_per_rule:
+                remaining = max(self.max_rows_per_rule - result[2], 0)
+                if len(df) > remaining:
+                    sample = (
+                        df.sample(n=remaining, random_state=0)
+                        if self.sampling == "random"
+                        else df.head(remaining)
+                    )
+            result[2] += len(sample)
+
+            if not sample.empty:
+                self._frames.append(
+                    pd.DataFrame(
+                        {
+                            "table_name": table_name,
+                            "rule_name": rule_name,
+                            "rejected_reason": reason,
+                            "row_data": serialize_rows(sample),
+                        }
+                    )
+                )
+                self._buffered += len(sample)
+
+            flush_rows = self._buffered >= self.flush_threshold
+
+        if flush_rows:
+            self.flush(results=False)
+
+    def take_results(self):
+        """
+        Writes the buffered rows and returns the per-rule counts collected
+        since the last full flush instead of writing them
+        """
+        self.flush(results=False)
+        with self._lock:
+            results, self._results = self._results, {}
+        return results
+
+    def add_results(self, results):
+        """
+        Adds per-rule counts returned by take_results() in another process
+        """
+        with self._lock:
+            for key, (reason, rejected, stored) in results.items():
+                result = self._results.setdefault(key, [reason, 0, 0])
+                result[1] += rejected
+                result[2] += stored
+
+    def flush(self, results=True):
+        """
+        Writes buffered rows with COPY and, unless results=False, the per-rule
+        counts collected since the last full flush.
+        """
+        with self._lock:
+            frames, self._frames, self._buffered = self._frames, [], 0
+            if results:
+                pending, self._results = self._results, {}
+            else:
+                pending = {}
+
+        if not frames and not pending:
+            return
+
+        engine = get_engine()
+        dbapi_conn = engine.raw_connection()
+        try:
+            with closing(dbapi_conn.cursor()) as cursor:
+                if frames:
+                    copy_frame(
+                        dbapi_conn,
+                        cursor,
+                        pd.concat(frames, ignore_index=True),
+                        "audit.rejected_rows",
+                    )
+
+                if pending:
+                    copy_frame(
+                        dbapi_conn,
+                        cursor,
+                        pd.DataFrame(
+                            [
+                                (table_name, rule_name, reason, rejected, stored)
+                                for (table_name, rule_name), (reason, rejected, stored)
+                                in pending.items()
+                            ],
+                            columns=[
+                                "table_name",
+                                "rule_name",
+                                "rejected_reason",
+                                "rejected_count",
+                                "stored_count",
+                            ],
+                        ),
+                        "audit.rule_results",
+                    )
+
+            dbapi_conn.commit()
+        except Exception:
+            dbapi_conn.rollback()
+            raise
+        finally:
+            dbapi_conn.close()
+
+
+# Sink shared by every builder in the process
+_sink = AuditSink()
+
 
 def write_rejected_rows(table_name, rule_name, reason, df):
-    if df is None or df.empty:
-        return
-
-    engine = get_engine()
-
-    records = [
-        {
-            "table_name": table_name,
-            "rule_name": rule_name,
-            "rejected_reason": reason,
-            "row_data": json.dumps(
-                {k: (str(v) if v is not None else None) for k, v in row.items()}
-            ),
-        }
-        for row in df.to_dict(orient="records")
-    ]
-
-    audit_df = pd.DataFrame(records)
-
-    with engine.begin() as conn:
-        audit_df.to_sql(
-            name="rejected_rows",
-            schema="audit",
-            con=conn,
-            index=False,
-            if_exists="append",
-        )
+    """
+    Buffers rejected rows for the audit tables; call flush_rejected_rows()
+    at the end of the run to write them.
+    """
+    _sink.add(table_name, rule_name, reason, df)
+
+
+def flush_rejected_rows():
+    _sink.flush()
+
+
+def take_rule_results():
+    """
+    Writes this process's buffered rejected rows and returns its per-rule
+    counts, e.g. from a worker process, for add_rule_results() in the
+    process that flushes the run
+    """
+    return _sink.take_results()
+
+
+def add_rule_results(results):
+    _sink.add_results(results)
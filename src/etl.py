@@ -1,4 +1,10 @@
-import sys
+import argparse
+import os
+from functools import partial
+
+from config.db import pool_stats
+from src.dq_rules import referenced_tables
+from src.dq_utils import flush_rejected_rows
 from src.build_silver import (
     build_silver_customers,
     build_silver_users,
@@ -12,35 +18,350 @@ from src.build_gold import (
     build_gold_dau_mau,
     build_gold_active_customers,
     build_gold_dashboard_monthly,
+    build_gold_metrics_cube,
+    BACKENDS,
 )
+from src.active_users import build_gold_active_users_daily
+from src.sketches import build_gold_usage_sketches
+from src.export_parquet import EXPORT_TABLES, export_table
+from src.gold_context import GoldContext
+from src.load_bronze import BRONZE_INPUTS_DIR, FILE_TABLE_MAP, load_file
+from src.manifest import skip_unchanged
+from src.partitioned import PROCESSES
+from src.scheduler import Stage, print_plan, critical_path, run_stages
+from src.telemetry import PROFILES_DIR, RunRecorder
+
+# Maximum number of stages running at the same time
+MAX_WORKERS = int(os.getenv("ETL_MAX_WORKERS", "4"))
+
+
+def bronze_stages(inputs_dir=None, full_refresh=False):
+    # One load per CSV; files whose content is already loaded are skipped
+    return [
+        Stage(
+            table,
+            partial(load_file, csv_file, inputs_dir, force=full_refresh),
+            outputs=[table],
+        )
+        for csv_file, table in FILE_TABLE_MAP.items()
+    ]
+
+
+def silver_stages(full_refresh=False, processes=PROCESSES):
+    # Tables checked by foreign-key rules are built first
+    return [
+        Stage(
+            "silver.customers",
+            partial(build_silver_customers, full_refresh),
+            inputs=["bronze.customers"] + referenced_tables("customers"),
+            outputs=["silver.customers"],
+        ),
+        Stage(
+            "silver.users",
+            partial(build_silver_users, full_refresh),
+            inputs=["bronze.users"] + referenced_tables("users"),
+            outputs=["silver.users"],
+        ),
+        Stage(
+            "silver.subscriptions",
+            partial(build_silver_subscriptions, full_refresh),
+            inputs=["bronze.subscriptions"] + referenced_tables("subscriptions"),
+            outputs=["silver.subscriptions"],
+        ),
+        Stage(
+            "silver.payments",
+            partial(build_silver_payments, full_refresh),
+            inputs=["bronze.payments"] + referenced_tables("payments"),
+            outputs=["silver.payments"],
+        ),
+        Stage(
+            "silver.usage_events",
+            partial(build_silver_usage_events, full_refresh, processes=processes),
+            inputs=["bronze.usage_events"] + referenced_tables("usage_events"),
+            outputs=["silver.usage_events"],
+        ),
+    ]
+
+
+def parse_gold_backends(values):
+    """
+    Turns --engine values into {table: backend}. A bare value ("sql") sets the
+    default for every table; "table=backend" overrides a single table.
+    """
+    backends = {"*": "pandas"}
+
+    for value in values or []:
+        table, _, backend = value.rpartition("=")
+        if backend not in BACKENDS:
+            raise ValueError(f"Invalid --engine value: {value} (expected sql | pandas | sketch)")
+        if backend == "sketch" and not table:
+            raise ValueError("The sketch backend is set per table, e.g. dau_mau_monthly=sketch")
+        backends[table.removeprefix("gold.") or "*"] = backend
+
+    return backends
+
+
+def gold_stages(ctx=None, backends=None, full_refresh=False, processes=PROCESSES):
+    # Silver inputs are loaded once and shared by every gold builder;
+    # the context only reads them when the first pandas builder needs them
+    ctx = ctx if ctx is not None else GoldContext(processes=processes)
+    backends = backends or {}
+
+    def backend(table):
+        return backends.get(table, backends.get("*", "pandas"))
+
+    def dau_mau_inputs():
+        if backend("dau_mau_monthly") == "sketch":
+            return ["gold.usage_sketches"]
+        return ["silver.usage_events"]
+
+    stages = [
+        Stage(
+            "gold.active_users_daily",
+            partial(build_gold_active_users_daily, full_refresh),
+            inputs=["silver.usage_events"],
+            outputs=["gold.active_users_daily"],
+        ),
+        Stage(
+            "gold.mrr_monthly",
+            partial(build_gold_mrr_monthly, ctx, backend("mrr_monthly"), full_refresh),
+            inputs=["silver.subscriptions"],
+            outputs=["gold.mrr_monthly"],
+        ),
+        Stage(
+            "gold.customer_churn_monthly",
+            partial(build_gold_customer_churn, ctx, backend("customer_churn_monthly"), full_refresh),
+            inputs=["silver.subscriptions"],
+            outputs=["gold.customer_churn_monthly"],
+        ),
+        Stage(
+            "gold.dau_mau_monthly",
+            partial(build_gold_dau_mau, ctx, backend("dau_mau_monthly"), full_refresh),
+            inputs=dau_mau_inputs(),
+            outputs=["gold.dau_mau_monthly"],
+        ),
+        Stage(
+            "gold.active_customers_monthly",
+            partial(build_gold_active_customers, ctx, backend("active_customers_monthly"), full_refresh),
+            inputs=["silver.subscriptions"],
+            outputs=["gold.active_customers_monthly"],
+        ),
+        Stage(
+            "gold.dashboard_monthly",
+            partial(build_gold_dashboard_monthly, ctx, backend("dashboard_monthly"), full_refresh),
+            inputs=[
+                "gold.mrr_monthly",
+                "gold.active_customers_monthly",
+                "gold.customer_churn_monthly",
+                "gold.dau_mau_monthly",
+            ],
+            outputs=["gold.dashboard_monthly"],
+        ),
+        Stage(
+            "gold.metrics_cube",
+            partial(build_gold_metrics_cube, ctx),
+            inputs=[
+                "silver.subscriptions",
+                "silver.customers",
+                "silver.users",
+                "silver.usage_events",
+            ],
+            outputs=["gold.metrics_cube"],
+        ),
+    ]
+
+    # The sketches are only built for the sketch backend, which reads them
+    if backend("dau_mau_monthly") == "sketch":
+        stages.insert(
+            0,
+            Stage(
+                "gold.usage_sketches",
+                partial(build_gold_usage_sketches, full_refresh),
+                inputs=["silver.usage_events", "silver.users", "silver.customers"],
+                outputs=["gold.usage_sketches"],
+            ),
+        )
+    return stages
+
+
+def export_stages(built, full_refresh=False):
+    # One Parquet export per table built by the run, started as soon as it is
+    return [
+        Stage(
+            f"export.{table}",
+            partial(export_table, table, full_refresh=full_refresh),
+            inputs=[table],
+            outputs=[f"parquet.{table}"],
+        )
+        for table in EXPORT_TABLES
+        if table in built
+    ]
 
-def run_silver():
-    build_silver_customers()
-    build_silver_users()
-    build_silver_subscriptions()
-    build_silver_payments()
-    build_silver_usage_events()
 
-def run_gold():
-    build_gold_mrr_monthly()
-    build_gold_customer_churn()
-    build_gold_dau_mau()
-    build_gold_active_customers()
-    build_gold_dashboard_monthly()
+def build_plan(
+    mode, full_refresh=False, backends=None, export=False, bronze_dir=None, processes=PROCESSES
+):
+    stages = []
+    if bronze_dir:
+        stages += bronze_stages(bronze_dir, full_refresh)
+    if mode in ("silver", "all"):
+        stages += silver_stages(full_refresh, processes)
+    if mode in ("gold", "all"):
+        stages += gold_stages(backends=backends, full_refresh=full_refresh, processes=processes)
+    if export:
+        stages += export_stages({output for stage in stages for output in stage.outputs}, full_refresh)
+    return stages
+
+
+def finish_run(recorder):
+    """
+    Writes the run's rejected rows (from every rule, once per run) and its
+    audit.pipeline_runs rows. Failures are printed and the first one is
+    returned rather than raised, so that it never replaces a stage's error.
+    """
+    error = None
+    for finish in (flush_rejected_rows, recorder.save):
+        try:
+            finish()
+        except Exception as exc:
+            print(f"❌ Recording the run failed: {exc}")
+            error = error or exc
+    return error
+
+
+def run(
+    mode,
+    full_refresh=False,
+    max_workers=MAX_WORKERS,
+    backends=None,
+    profile_dir=None,
+    export=False,
+    bronze_dir=None,
+    processes=PROCESSES,
+):
+    """
+    Runs the plan and records one audit.pipeline_runs row per stage. With a
+    profile_dir, also writes <profile_dir>/<run_id>/<stage>.prof per stage;
+    stages then run one at a time so each profile only covers its stage.
+
+    Stages whose inputs are unchanged since they last built their outputs
+    are skipped (see src/manifest.py), unless full_refresh. With a
+    bronze_dir, its CSVs are loaded first. With processes > 1, usage events
+    are built by that many worker processes (see src/partitioned.py).
+    """
+    recorder = RunRecorder(profile_dir=profile_dir)
+    stages = build_plan(mode, full_refresh, backends, export, bronze_dir, processes)
+    if profile_dir:
+        max_workers = 1
+
+    print(f"Run {recorder.run_id}")
+    try:
+        # Skipped stages are not recorded in audit.pipeline_runs
+        skipped = set()
+        stages_to_run = skip_unchanged(recorder.instrument(stages), force=full_refresh, skipped=skipped)
+        durations = run_stages(stages_to_run, max_workers=max_workers)
+    except BaseException:
+        # The stage's error is the one raised, even if recording the run fails
+        finish_run(recorder)
+        raise
+
+    error = finish_run(recorder)
+    if error is not None:
+        raise error
+
+    if profile_dir:
+        print(f"Profiles written to {recorder.profile_dir}")
+
+    # Only stages that ran are timed; skipped ones would pad the path
+    durations = {name: duration for name, duration in durations.items() if name not in skipped}
+    path, total = critical_path([stage for stage in stages if stage.name in durations], durations)
+    if path:
+        print(f"\nCritical path ({total:.2f}s): {' -> '.join(path)}")
+    else:
+        print("\nCritical path: no stage ran")
+    print(f"Sum of all stages: {sum(durations.values()):.2f}s")
+    print(f"Connection pool: {pool_stats()}")
+    return durations
+
+
+def run_silver(full_refresh=False, max_workers=MAX_WORKERS):
+    return run("silver", full_refresh, max_workers)
+
+
+def run_gold(max_workers=MAX_WORKERS, backends=None):
+    return run("gold", max_workers=max_workers, backends=backends)
+
 
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage: python etl.py [silver|gold|all]")
-        sys.exit(1)
-
-    mode = sys.argv[1]
-
-    if mode == "silver":
-        run_silver()
-    elif mode == "gold":
-        run_gold()
-    elif mode == "all":
-        run_silver()
-        run_gold()
+    parser = argparse.ArgumentParser(description="Run the silver and gold layers")
+    parser.add_argument("mode", choices=["silver", "gold", "all"])
+    parser.add_argument(
+        "--full-refresh",
+        action="store_true",
+        help="Run every stage, even if its inputs are unchanged, rebuilding silver tables from all "
+        "of bronze and every gold month and usage sketch, instead of only new or changed rows and "
+        "the months they affect",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=MAX_WORKERS,
+        help="Maximum number of stages running concurrently (default: ETL_MAX_WORKERS or 4)",
+    )
+    parser.add_argument(
+        "--engine",
+        action="append",
+        metavar="[TABLE=]sql|pandas|sketch",
+        help="Gold backend for all tables or for one table; repeatable (default: pandas). "
+        "sketch is only available per table, for dau_mau_monthly",
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const=PROFILES_DIR,
+        metavar="DIR",
+        help="Write a cProfile dump per stage under DIR/<run_id>/ (default DIR: profiles/)",
+    )
+    parser.add_argument(
+        "--export",
+        action="store_true",
+        help="Also export the built tables to partitioned Parquet (only changed partitions are rewritten)",
+    )
+    parser.add_argument(
+        "--bronze",
+        nargs="?",
+        const=BRONZE_INPUTS_DIR,
+        metavar="DIR",
+        help="Load the bronze CSVs from DIR first (default DIR: bronze_inputs); "
+        "files whose content is already loaded are skipped",
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=PROCESSES,
+        help="Build silver.usage_events and gold.dau_mau_monthly as map/reduce over this many worker "
+        "processes, each owning a hash partition of user_id (Postgres only; default: ETL_PROCESSES or 0, "
+        "i.e. in the stage's own process)",
+    )
+    parser.add_argument(
+        "--plan",
+        action="store_true",
+        help="Print the stage plan and critical path without running anything",
+    )
+    args = parser.parse_args()
+
+    backends = parse_gold_backends(args.engine)
+
+    if args.plan:
+        print_plan(build_plan(args.mode, args.full_refresh, backends, args.export, args.bronze, args.processes))
     else:
-        print("Invalid option: silver | gold | all")
+        run(
+            args.mode,
+            args.full_refresh,
+            args.workers,
+            backends,
+            args.profile,
+            args.export,
+            args.bronze,
+            args.processes,
+        )
@@ -0,0 +1,250 @@
+import argparse
+import importlib.util
+import json
+import os
+import shutil
+from datetime import datetime
+
+import pandas as pd
+from sqlalchemy import bindparam, text
+
+from config.db import get_engine
+from src.dialect import date_text, row_fingerprint
+from src.schemas import CATEGORY, STRING, silver_dtypes
+from src.telemetry import record
+
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(__file__))
+EXPORT_DIR = os.getenv("PARQUET_EXPORT_DIR") or os.path.join(PROJECT_ROOT, "exports", "parquet")
+
+# Rows read from the database at a time while writing partitions
+EXPORT_CHUNK_ROWS = int(os.getenv("PARQUET_EXPORT_CHUNK_ROWS", "250000"))
+
+# Directory name of rows whose partition value is NULL (Hive convention)
+NULL_PARTITION = "__HIVE_DEFAULT_PARTITION__"
+
+# Partition column of every exported table and the SQL expression it is
+# computed from. Partition values live in the directory names
+# (<column>=<value>), so the column itself is not stored in the files.
+EXPORT_TABLES = {
+    "silver.customers": ("signup_year", "signup_year::text"),
+    "silver.users": ("created_year", "created_year::text"),
+    "silver.subscriptions": ("start_year", "start_year::text"),
+    "silver.payments": ("payment_year", "payment_year::text"),
+    "silver.usage_events": ("event_month", date_text("event_date", "%Y-%m")),
+    "gold.mrr_monthly": ("year", date_text("month", "%Y")),
+    "gold.customer_churn_monthly": ("year", date_text("month", "%Y")),
+    "gold.dau_mau_monthly": ("year", date_text("month", "%Y")),
+    "gold.active_customers_monthly": ("year", date_text("month", "%Y")),
+    "gold.dashboard_monthly": ("year", date_text("month", "%Y")),
+    "gold.metrics_cube": ("year", date_text("month", "%Y")),
+    "gold.usage_sketches": ("year", date_text("day", "%Y")),
+    "gold.active_users_daily": ("year", date_text("day", "%Y")),
+}
+
+MANIFEST = "_manifest.json"
+
+
+def _require_pyarrow():
+    if importlib.util.find_spec("pyarrow") is None:
+        raise ImportError("The Parquet export needs pyarrow: pip install pyarrow")
+
+
+def table_dir(table, export_dir=None):
+    schema, name = table.split(".")
+    return os.path.join(export_dir or EXPORT_DIR, schema, name)
+
+
+def _partition_expr(table):
+    return f"COALESCE({EXPORT_TABLES[table][1]}, '{NULL_PARTITION}')"
+
+
+def partition_fingerprints(engine, table):
+    """
+    {partition value: {"rows": n, "fingerprint": ...}} for the current
+    contents of a table, computed in the database. The fingerprint is a sum of
+    per-row hashes, so it does not depend on row order and needs no sort.
+    """
+    query = f"""
+        SELECT
+            {_partition_expr(table)} AS partition,
+            COUNT(*) AS rows,
+            {row_fingerprint('t')} AS fingerprint
+        FROM {table} t
+        GROUP BY 1
+    """
+
+    with engine.connect() as conn:
+        return {
+            partition: {"rows": rows, "fingerprint": fingerprint}
+            for partition, rows, fingerprint in conn.execute(text(query))
+        }
+
+
+def load_manifest(path):
+    manifest = os.path.join(path, MANIFEST)
+    if not os.path.exists(manifest):
+        return {}
+    with open(manifest) as f:
+        return json.load(f)
+
+
+def _save_manifest(path, column, partitions):
+    manifest = {
+        "partition_column": column,
+        "exported_at": datetime.now().isoformat(timespec="seconds"),
+        "partitions": partitions,
+    }
+
+    tmp = os.path.join(path, f".{MANIFEST}.tmp")
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp, os.path.join(path, MANIFEST))
+
+
+def _read_dtypes(table):
+    # Categories are written as plain strings: their codes could differ
+    # between chunks, and Parquet dictionary-encodes strings anyway
+    schema, name = table.split(".")
+    if schema != "silver":
+        return None
+    return {
+        column: STRING if dtype == CATEGORY else dtype
+        for column, dtype in silver_dtypes(name).items()
+    }
+
+
+def _write_partitions(engine, table, partitions, path, chunksize):
+    """
+    Streams the rows of the given partitions and writes one Parquet file per
+    partition. Files are written under a hidden name and swapped in only
+    when complete. Returns the number of rows written.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    column = EXPORT_TABLES[table][0]
+    query = text(
+        f"SELECT t.*, {_partition_expr(table)} AS _partition "
+        f"FROM {table} t WHERE {_partition_expr(table)} IN :partitions"
+    ).bindparams(bindparam("partitions", expanding=True))
+
+    writers = {}
+    rows = 0
+    try:
+        with engine.connect() as conn:
+            conn = conn.execution_options(stream_results=True, max_row_buffer=chunksize)
+            chunks = pd.read_sql(
+                query,
+                conn,
+                params={"partitions": list(partitions)},
+                chunksize=chunksize,
+                dtype=_read_dtypes(table),
+            )
+
+            for chunk in chunks:
+                chunk = chunk.drop(columns=[column], errors="ignore")
+
+                for partition, part in chunk.groupby("_partition", sort=False):
+                    part = pa.Table.from_pandas(
+                        part.drop(columns="_partition"), preserve_index=False
+                    )
+
+                    if partition not in writers:
+                        directory = os.path.join(path, f"{column}={partition}")
+                        os.makedirs(directory, exist_ok=True)
+                        tmp = os.path.join(directory, ".part-0.parquet.tmp")
+                        writers[partition] = (pq.ParquetWriter(tmp, part.schema), tmp)
+
+                    writer, _ = writers[partition]
+                    writer.write_table(part.cast(writer.schema))
+                    rows += part.num_rows
+
+        for partition, (writer, tmp) in writers.items():
+            writer.close()
+            os.replace(tmp, os.path.join(os.path.dirname(tmp), "part-0.parquet"))
+    finally:
+        for writer, tmp in writers.values():
+            if writer.is_open:
+                writer.close()
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    return rows
+
+
+def export_table(table, export_dir=None, full_refresh=False, chunksize=EXPORT_CHUNK_ROWS, engine=None):
+    """
+    Exports a silver or gold table to a Hive-partitioned Parquet dataset
+    under <export_dir>/<schema>/<table>/.
+
+    Only partitions whose fingerprint differs from the last export are
+    rewritten, and partitions that no longer exist are removed; a full
+    refresh rewrites every partition.
+    """
+    _require_pyarrow()
+
+    engine = engine if engine is not None else get_engine()
+    column = EXPORT_TABLES[table][0]
+    path = table_dir(table, export_dir)
+
+    current = partition_fingerprints(engine, table)
+    previous = {} if full_refresh else load_manifest(path).get("partitions", {})
+
+    changed = [p for p, state in current.items() if previous.get(p) != state]
+    removed = [p for p in previous if p not in current]
+
+    os.makedirs(path, exist_ok=True)
+
+    rows = _write_partitions(engine, table, changed, path, chunksize) if changed else 0
+
+    for partition in removed:
+        shutil.rmtree(os.path.join(path, f"{column}={partition}"), ignore_errors=True)
+
+    _save_manifest(path, column, current)
+    record(rows_in=rows, rows_out=rows)
+
+    print(
+        f"✅ {table} exported to Parquet "
+        f"({len(changed)} of {len(current)} partitions written, {len(removed)} removed)"
+    )
+
+
+def read_export(table, filters=None, columns=None, export_dir=None):
+    """
+    Reads an exported table back into pandas. filters are pushed down to the
+    partition directories and Parquet row groups, e.g.
+    read_export("silver.usage_events", filters=[("event_month", ">=", "2024-01")]).
+
+    NULL partitions are read back as missing values.
+    """
+    _require_pyarrow()
+    import pyarrow.dataset as ds
+
+    # An explicit (non-dictionary) Hive partitioning, which unlike the
+    # default also reads NULL partitions
+    return pd.read_parquet(
+        table_dir(table, export_dir),
+        partitioning=ds.partitioning(flavor="hive"),
+        filters=filters,
+        columns=columns,
+    )
+
+
+def export_tables(tables=None, export_dir=None, full_refresh=False):
+    for table in tables or list(EXPORT_TABLES):
+        export_table(table, export_dir, full_refresh)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export silver and gold tables to partitioned Parquet")
+    parser.add_argument("tables", nargs="*", help="Tables to export, e.g. silver.payments (default: all)")
+    parser.add_argument("--export-dir", default=None, help="Dataset root (default: PARQUET_EXPORT_DIR or exports/parquet)")
+    parser.add_argument("--full-refresh", action="store_true", help="Rewrite every partition")
+    args = parser.parse_args()
+
+    unknown = set(args.tables) - set(EXPORT_TABLES)
+    if unknown:
+        parser.error(f"Unknown tables: {', '.join(sorted(unknown))}")
+
+    export_tables(args.tables, args.export_dir, args.full_refresh)
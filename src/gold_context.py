@@ -0,0 +1,188 @@
+import threading
+from collections import defaultdict
+from functools import wraps
+
+import pandas as pd
+from sqlalchemy import text
+
+from config.db import get_engine
+from src.dialect import hash_bucket
+from src.intervals import (
+    coalesce_spans,
+    distinct_active,
+    distinct_ends,
+    first_starts,
+    month_spans,
+)
+from src.partitioned import PROCESSES
+from src.schemas import silver_dtypes
+from src.telemetry import record
+
+
+def memoized(method):
+    """
+    Like functools.cached_property, but safe to share between the worker
+    threads of a parallel run: each value is computed exactly once, and
+    different values can be computed concurrently.
+    """
+    name = method.__name__
+
+    @wraps(method)
+    def getter(self):
+        with self._locks_guard:
+            lock = self._locks[name]
+
+        with lock:
+            if name not in self._cache:
+                self._cache[name] = method(self)
+            return self._cache[name]
+
+    return property(getter)
+
+
+class GoldContext:
+    """
+    Shared state for one gold run.
+
+    Silver inputs are read once and every derived frame is computed on first
+    use, so builders that need the same subscription activity or churn flags
+    reuse it instead of re-querying and re-deriving it.
+
+    With months, only the silver rows that the gold rows of those months
+    depend on are read: frames are then only complete for those months.
+
+    With processes > 1, builders that support it run as map/reduce over
+    that many worker processes (see src/partitioned.py).
+    """
+
+    def __init__(self, engine=None, months=None, processes=PROCESSES):
+        self.engine = engine if engine is not None else get_engine()
+        self.months = None if months is None else pd.DatetimeIndex(months)
+        self.processes = processes
+
+        self._cache = {}
+        self._locks = defaultdict(threading.Lock)
+        self._locks_guard = threading.Lock()
+
+    # ---------------------------------------------------
+    # Silver inputs
+    # ---------------------------------------------------
+    def _month_range(self):
+        # First and last month as bind parameters, and the month after
+        return {
+            "first_month": self.months.min().to_pydatetime(),
+            "last_month": self.months.max().to_pydatetime(),
+            "end_month": (self.months.max() + pd.offsets.MonthBegin()).to_pydatetime(),
+        }
+
+    @memoized
+    def subscriptions(self):
+        query = """
+            SELECT
+                subscription_id,
+                customer_id,
+                start_date,
+                end_date,
+                monthly_amount,
+                is_active
+            FROM silver.subscriptions
+        """
+        params = {}
+
+        if self.months is not None:
+            # Subscriptions active in the months, and the whole history of
+            # their customers (for new and churned customers)
+            overlaps = """
+                date_trunc('month', start_date) <= :last_month
+                AND date_trunc('month', COALESCE(end_date, start_date)) >= :first_month
+            """
+            query += f"""
+                WHERE ({overlaps})
+                   OR customer_id IN (SELECT customer_id FROM silver.subscriptions WHERE {overlaps})
+            """
+            params = self._month_range()
+
+        df = pd.read_sql(
+            text(query),
+            self.engine,
+            params=params,
+            dtype=silver_dtypes(
+                "subscriptions",
+                ["subscription_id", "customer_id", "start_date", "end_date", "monthly_amount"],
+            ),
+        )
+        # Counted once, by the stage that loads it first
+        record(rows_in=len(df))
+        return df
+
+    @memoized
+    def usage_events(self):
+        return self.read_usage_events()
+
+    def read_usage_events(self, partition=None, partitions=None):
+        """
+        Active (user_id, event_date) rows, or only those of one user_id hash
+        partition (see src/partitioned.py). Not cached.
+        """
+        query = """
+            SELECT
+                user_id,
+                event_date
+            FROM silver.usage_events
+            WHERE event_count > 0
+        """
+        params = {}
+
+        if self.months is not None:
+            query += " AND event_date >= :first_month AND event_date < :end_month"
+            params = self._month_range()
+
+        if partitions is not None:
+            query += f" AND {hash_bucket('user_id', partitions)} = :partition"
+            params["partition"] = int(partition)
+
+        df = pd.read_sql(
+            text(query),
+            self.engine,
+            params=params,
+            dtype=silver_dtypes("usage_events", ["user_id", "event_date"]),
+        )
+        record(rows_in=len(df))
+        return df
+
+    # ---------------------------------------------------
+    # Derived frames
+    # ---------------------------------------------------
+    @memoized
+    def subscription_spans(self):
+        return month_spans(self.subscriptions)
+
+    @memoized
+    def active_subscription_spans(self):
+        spans = self.subscription_spans
+        return spans[spans["is_active"].eq(True)]
+
+    @memoized
+    def customer_activity(self):
+        """Merged month spans per customer across all subscriptions"""
+        return coalesce_spans(self.subscription_spans, "customer_id")
+
+    @memoized
+    def active_customers(self):
+        return distinct_active(self.customer_activity, "customer_id").reset_index(
+            name="active_customers"
+        )
+
+    @memoized
+    def new_customers(self):
+        """Customers counted in the month they were first seen"""
+        return first_starts(self.customer_activity, "customer_id").reset_index(
+            name="new_customers"
+        )
+
+    @memoized
+    def churned_customers(self):
+        """Customers active in a month but not in the following month"""
+        return distinct_ends(self.customer_activity, "customer_id").reset_index(
+            name="churned_customers"
+        )
@@ -0,0 +1,118 @@
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from src.build_gold import GOLD_COMPUTE
+from src.gold_context import GoldContext
+from src.gold_sql import GOLD_SQL
+
+
+def compare_frames(left, right, rtol=1e-9):
+    """
+    Returns a list of differences between two gold frames, ignoring dtypes
+    (e.g. float vs bigint counts) and row order. Missing values compare equal.
+    """
+    if sorted(left.columns) != sorted(right.columns):
+        return [f"columns differ: {sorted(left.columns)} vs {sorted(right.columns)}"]
+
+    columns = list(left.columns)
+    left = left[columns].copy()
+    right = right[columns].copy()
+
+    for df in (left, right):
+        df["month"] = pd.to_datetime(df["month"]).astype("datetime64[ns]")
+    left = left.sort_values("month").reset_index(drop=True)
+    right = right.sort_values("month").reset_index(drop=True)
+
+    if len(left) != len(right) or not left["month"].equals(right["month"]):
+        missing = set(left["month"]) ^ set(right["month"])
+        return [f"months differ ({len(left)} vs {len(right)} rows): {sorted(missing)[:5]}"]
+
+    problems = []
+    for column in columns:
+        if column == "month":
+            continue
+
+        a = pd.to_numeric(left[column]).to_numpy(dtype=float)
+        b = pd.to_numeric(right[column]).to_numpy(dtype=float)
+        mismatched = ~np.isclose(a, b, rtol=rtol, atol=0, equal_nan=True)
+
+        if mismatched.any():
+            first = np.flatnonzero(mismatched)[0]
+            problems.append(
+                f"{column}: {mismatched.sum()} rows differ, "
+                f"e.g. {left['month'][first]:%Y-%m}: {a[first]} vs {b[first]}"
+            )
+
+    return problems
+
+
+def check_gold_parity(tables=None, ctx=None, rtol=1e-9):
+    """
+    Computes each gold table with both backends, without writing anything,
+    and reports whether they agree. Returns {table: list of differences}.
+    """
+    ctx = ctx if ctx is not None else GoldContext()
+    tables = tables or list(GOLD_COMPUTE)
+
+    results = {}
+    for table in tables:
+        from_pandas = GOLD_COMPUTE[table](ctx)
+        from_sql = pd.read_sql(GOLD_SQL[table], ctx.engine)
+
+        results[table] = compare_frames(from_pandas, from_sql, rtol=rtol)
+
+        if results[table]:
+            print(f"❌ gold.{table}: pandas and sql backends differ")
+            for problem in results[table]:
+                print(f"   {problem}")
+        else:
+            print(f"✅ gold.{table}: pandas and sql backends match ({len(from_pandas)} rows)")
+
+    return results
+
+
+def check_stored_gold(tables=None, ctx=None, rtol=1e-9):
+    """
+    Compares the stored gold tables with a full pandas recompute, e.g. to
+    verify tables that were only rebuilt for changed months. Returns
+    {table: list of differences}.
+    """
+    ctx = ctx if ctx is not None else GoldContext()
+    tables = tables or list(GOLD_COMPUTE)
+
+    results = {}
+    for table in tables:
+        recomputed = GOLD_COMPUTE[table](ctx)
+        stored = pd.read_sql(f"SELECT * FROM gold.{table}", ctx.engine)
+
+        # Columns beyond the pandas result (e.g. sketch error bounds) are not compared
+        results[table] = compare_frames(recomputed, stored[recomputed.columns], rtol=rtol)
+
+        if results[table]:
+            print(f"❌ gold.{table}: stored rows differ from a full rebuild")
+            for problem in results[table]:
+                print(f"   {problem}")
+        else:
+            print(f"✅ gold.{table}: stored rows match a full rebuild ({len(stored)} rows)")
+
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare pandas and sql gold backends")
+    parser.add_argument("tables", nargs="*", help="Gold tables to check (default: all)")
+    parser.add_argument("--rtol", type=float, default=1e-9)
+    parser.add_argument(
+        "--stored",
+        action="store_true",
+        help="Compare the stored tables with a full pandas rebuild instead",
+    )
+    args = parser.parse_args()
+
+    tables = [t.removeprefix("gold.") for t in args.tables]
+    check = check_stored_gold if args.stored else check_gold_parity
+    results = check(tables, rtol=args.rtol)
+
+    raise SystemExit(1 if any(results.values()) else 0)
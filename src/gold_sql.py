@@ -0,0 +1,316 @@
+from sqlalchemy import bindparam, text
+
+from src.dirty_months import delete_months
+from src.publish import create_staging, publish_table
+from src.telemetry import record
+
+
+# Set-based definitions of every gold table, computed inside Postgres.
+# Each query returns the same columns and rows as the pandas builder in
+# src/build_gold.py, so either backend can produce the table.
+
+# One row per subscription and month it covers; open-ended subscriptions
+# only cover their start month, as in the pandas builders
+SUBSCRIPTION_MONTHS = """
+    SELECT
+        s.subscription_id,
+        s.customer_id,
+        s.plan_name,
+        s.monthly_amount,
+        s.is_active,
+        m.month
+    FROM silver.subscriptions s
+    CROSS JOIN LATERAL generate_series(
+        date_trunc('month', s.start_date),
+        date_trunc('month', COALESCE(s.end_date, s.start_date)),
+        interval '1 month'
+    ) AS m(month)
+    WHERE s.start_date IS NOT NULL
+"""
+
+# Distinct customer-months, flagged when the customer is not active the
+# following month (churn) or when it is their first active month (new)
+CUSTOMER_ACTIVITY = f"""
+    SELECT
+        customer_id,
+        month,
+        LEAD(month) OVER w IS DISTINCT FROM month + interval '1 month' AS churned,
+        month = MIN(month) OVER w AS first_month
+    FROM (
+        SELECT DISTINCT customer_id, month
+        FROM ({SUBSCRIPTION_MONTHS}) sm
+    ) a
+    WINDOW w AS (PARTITION BY customer_id ORDER BY month)
+"""
+
+GOLD_SQL = {
+    "mrr_monthly": f"""
+        SELECT
+            month,
+            COALESCE(SUM(monthly_amount), 0) AS mrr,
+            COUNT(DISTINCT subscription_id) AS active_subscriptions
+        FROM ({SUBSCRIPTION_MONTHS}) sm
+        WHERE is_active = true
+        GROUP BY month
+        ORDER BY month
+    """,
+    "customer_churn_monthly": f"""
+        SELECT
+            month,
+            COUNT(DISTINCT customer_id) AS active_customers,
+            COUNT(DISTINCT customer_id) FILTER (WHERE churned) AS churned_customers,
+            COUNT(DISTINCT customer_id) FILTER (WHERE churned)::double precision
+                / NULLIF(COUNT(DISTINCT customer_id), 0) AS churn_rate
+        FROM ({CUSTOMER_ACTIVITY}) ca
+        GROUP BY month
+        ORDER BY month
+    """,
+    "dau_mau_monthly": """
+        WITH events AS (
+            SELECT
+                user_id,
+                event_date,
+                date_trunc('month', event_date::timestamp) AS month
+            FROM silver.usage_events
+            WHERE event_count > 0
+              AND event_date IS NOT NULL
+        ),
+        daily AS (
+            SELECT month, event_date, COUNT(DISTINCT user_id) AS dau
+            FROM events
+            GROUP BY month, event_date
+        ),
+        monthly AS (
+            SELECT month, COUNT(DISTINCT user_id) AS mau
+            FROM events
+            GROUP BY month
+        )
+        SELECT
+            d.month,
+            AVG(d.dau)::double precision AS dau,
+            m.mau,
+            AVG(d.dau)::double precision / NULLIF(m.mau, 0) AS dau_mau_ratio
+        FROM daily d
+        JOIN monthly m USING (month)
+        GROUP BY d.month, m.mau
+        ORDER BY d.month
+    """,
+    "active_customers_monthly": f"""
+        SELECT
+            month,
+            COUNT(DISTINCT customer_id) AS active_customers,
+            COUNT(DISTINCT customer_id) FILTER (WHERE first_month) AS new_customers,
+            COUNT(DISTINCT customer_id) FILTER (WHERE churned) AS churned_customers
+        FROM ({CUSTOMER_ACTIVITY}) ca
+        GROUP BY month
+        ORDER BY month
+    """,
+    "dashboard_monthly": """
+        SELECT
+            m.month,
+            m.mrr,
+            a.active_customers,
+            c.churn_rate,
+            d.dau_mau_ratio
+        FROM gold.mrr_monthly m
+        LEFT JOIN gold.active_customers_monthly a USING (month)
+        LEFT JOIN gold.customer_churn_monthly c USING (month)
+        LEFT JOIN gold.dau_mau_monthly d USING (month)
+    """,
+}
+
+
+def replace_rows(conn, table, query):
+    """
+    Replaces the managed table gold.<table> (see sql/gold) by a copy filled
+    with the result of query inside the database, swapped in once complete.
+    Returns the rows inserted.
+    """
+    # Column names of the result, without running it
+    columns = ", ".join(conn.execute(text(f"SELECT * FROM ({query}) q LIMIT 0")).keys())
+
+    staging = create_staging(conn, f"gold.{table}")
+    result = conn.execute(
+        text(f"INSERT INTO gold.{staging} ({columns}) SELECT {columns} FROM ({query}) q")
+    )
+
+    publish_table(conn, f"gold.{table}")
+    return max(result.rowcount, 0)
+
+
+def replace_months(conn, table, query, months):
+    """
+    Replaces the rows of gold.<table> for the given months by those of the
+    result of query, in place. Returns the rows inserted.
+    """
+    columns = ", ".join(conn.execute(text(f"SELECT * FROM ({query}) q LIMIT 0")).keys())
+
+    delete_months(conn, f"gold.{table}", months)
+    result = conn.execute(
+        text(
+            f"INSERT INTO gold.{table} ({columns}) "
+            f"SELECT {columns} FROM ({query}) q WHERE month IN :months"
+        ).bindparams(bindparam("months", expanding=True)),
+        {"months": [month.to_pydatetime() for month in months]},
+    )
+    return max(result.rowcount, 0)
+
+
+def build_gold_table_in_sql(engine, table, months=None):
+    """
+    Rebuilds gold.<table>, or only its rows of the given months, with
+    INSERT ... SELECT, without moving any rows through Python
+    """
+    with engine.begin() as conn:
+        if months is None:
+            rows = replace_rows(conn, table, GOLD_SQL[table])
+        else:
+            rows = replace_months(conn, table, GOLD_SQL[table], months)
+
+    record(rows_out=rows)
+
+
+# Dimensions of gold.metrics_cube. Rolled-up dimensions hold ALL, and
+# missing values are stored as 'unknown', so every cell is found by equality
+CUBE_DIMENSIONS = ["plan_type", "country", "industry", "plan_name"]
+CUBE_ALL = "All"
+
+# One row per customer (silver may hold duplicate keys), with its dimensions
+CUBE_CUSTOMERS = """
+    SELECT DISTINCT ON (customer_id)
+        customer_id,
+        COALESCE(plan_type, 'unknown') AS plan_type,
+        COALESCE(country, 'unknown') AS country,
+        COALESCE(industry, 'unknown') AS industry
+    FROM silver.customers
+    WHERE customer_id IS NOT NULL
+    ORDER BY customer_id, signup_date DESC NULLS LAST
+"""
+
+
+def _rolled_up(dimensions):
+    return ",\n".join(
+        f"CASE WHEN GROUPING({d}) = 1 THEN '{CUBE_ALL}' ELSE {d} END AS {d}"
+        for d in dimensions
+    )
+
+
+# MRR, customers and churn for every combination of the four dimensions, and
+# DAU/MAU for every combination of the customer dimensions (usage cannot be
+# attributed to a plan_name, so DAU/MAU is NULL in plan_name slices). Each
+# part is aggregated once with CUBE instead of one query per slice. The ALL
+# slice matches gold.mrr_monthly, gold.customer_churn_monthly,
+# gold.active_customers_monthly and gold.dau_mau_monthly.
+METRICS_CUBE_SQL = f"""
+    WITH customers AS ({CUBE_CUSTOMERS}),
+    subscription_rows AS (
+        SELECT
+            sm.month,
+            sm.subscription_id,
+            sm.customer_id,
+            sm.monthly_amount,
+            sm.is_active,
+            ca.churned,
+            ca.first_month,
+            COALESCE(c.plan_type, 'unknown') AS plan_type,
+            COALESCE(c.country, 'unknown') AS country,
+            COALESCE(c.industry, 'unknown') AS industry,
+            COALESCE(sm.plan_name, 'unknown') AS plan_name
+        FROM ({SUBSCRIPTION_MONTHS}) sm
+        LEFT JOIN ({CUSTOMER_ACTIVITY}) ca
+            ON ca.customer_id = sm.customer_id AND ca.month = sm.month
+        LEFT JOIN customers c ON c.customer_id = sm.customer_id
+    ),
+    subscription_cube AS (
+        SELECT
+            month,
+            {_rolled_up(CUBE_DIMENSIONS)},
+            COALESCE(SUM(monthly_amount) FILTER (WHERE is_active), 0) AS mrr,
+            COUNT(DISTINCT subscription_id) FILTER (WHERE is_active) AS active_subscriptions,
+            COUNT(DISTINCT customer_id) AS active_customers,
+            COUNT(DISTINCT customer_id) FILTER (WHERE first_month) AS new_customers,
+            COUNT(DISTINCT customer_id) FILTER (WHERE churned) AS churned_customers
+        FROM subscription_rows
+        GROUP BY month, CUBE ({", ".join(CUBE_DIMENSIONS)})
+    ),
+    events AS (
+        SELECT
+            e.user_id,
+            e.event_date,
+            date_trunc('month', e.event_date::timestamp) AS month,
+            COALESCE(c.plan_type, 'unknown') AS plan_type,
+            COALESCE(c.country, 'unknown') AS country,
+            COALESCE(c.industry, 'unknown') AS industry
+        FROM silver.usage_events e
+        LEFT JOIN (
+            SELECT DISTINCT ON (user_id) user_id, customer_id
+            FROM silver.users
+            ORDER BY user_id, created_at DESC NULLS LAST
+        ) u ON u.user_id = e.user_id
+        LEFT JOIN customers c ON c.customer_id = u.customer_id
+        WHERE e.event_count > 0
+          AND e.event_date IS NOT NULL
+    ),
+    daily AS (
+        SELECT
+            month,
+            event_date,
+            {_rolled_up(CUBE_DIMENSIONS[:3])},
+            COUNT(DISTINCT user_id) AS dau
+        FROM events
+        GROUP BY month, event_date, CUBE (plan_type, country, industry)
+    ),
+    monthly AS (
+        SELECT
+            month,
+            {_rolled_up(CUBE_DIMENSIONS[:3])},
+            COUNT(DISTINCT user_id) AS mau
+        FROM events
+        GROUP BY month, CUBE (plan_type, country, industry)
+    ),
+    usage_cube AS (
+        SELECT
+            d.month,
+            d.plan_type,
+            d.country,
+            d.industry,
+            AVG(d.dau)::double precision AS dau,
+            m.mau
+        FROM daily d
+        JOIN monthly m USING (month, plan_type, country, industry)
+        GROUP BY d.month, d.plan_type, d.country, d.industry, m.mau
+    )
+    SELECT
+        s.month,
+        s.plan_type,
+        s.country,
+        s.industry,
+        s.plan_name,
+        s.mrr,
+        s.active_subscriptions,
+        s.active_customers,
+        s.new_customers,
+        s.churned_customers,
+        s.churned_customers::double precision / NULLIF(s.active_customers, 0) AS churn_rate,
+        u.dau,
+        u.mau,
+        u.dau / NULLIF(u.mau, 0) AS dau_mau_ratio
+    FROM subscription_cube s
+    LEFT JOIN usage_cube u
+        ON u.month = s.month
+       AND u.plan_type = s.plan_type
+       AND u.country = s.country
+       AND u.industry = s.industry
+       AND s.plan_name = '{CUBE_ALL}'
+"""
+
+
+def build_metrics_cube_in_sql(engine):
+    """
+    Rebuilds gold.metrics_cube in one statement. Its primary key serves
+    dashboard lookups of a single slice (one value or ALL per dimension).
+    """
+    with engine.begin() as conn:
+        rows = replace_rows(conn, "metrics_cube", METRICS_CUBE_SQL)
+
+    record(rows_out=rows)
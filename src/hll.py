@@ -0,0 +1,95 @@
+import zlib
+
+import numpy as np
+import pandas as pd
+
+
+# With at least 11 index bits, the remaining hash bits fit exactly in a
+# float64 mantissa, which is what _bit_length relies on
+MIN_PRECISION = 11
+MAX_PRECISION = 18
+
+
+def _check_precision(precision):
+    if not MIN_PRECISION <= precision <= MAX_PRECISION:
+        raise ValueError(
+            f"HyperLogLog precision must be between {MIN_PRECISION} and {MAX_PRECISION}"
+        )
+
+
+def hash_values(values):
+    """
+    Stable 64-bit hashes of a Series (the same value always hashes the same,
+    across runs and processes)
+    """
+    return pd.util.hash_pandas_object(pd.Series(values), index=False).to_numpy()
+
+
+def _bit_length(values):
+    # frexp returns e with 2**(e-1) <= x < 2**e, and e == 0 for x == 0
+    return np.frexp(values.astype(np.float64))[1].astype(np.int64)
+
+
+def build_registers(hashes, groups, n_groups, precision):
+    """
+    Builds one HyperLogLog register array per group in a single pass.
+
+    hashes are uint64 hashes, groups the group index (0..n_groups-1) of each
+    hash. Returns a (n_groups, 2**precision) uint8 array.
+    """
+    _check_precision(precision)
+
+    m = 1 << precision
+    hashes = np.asarray(hashes, dtype=np.uint64)
+    groups = np.asarray(groups, dtype=np.int64)
+
+    index = (hashes >> np.uint64(64 - precision)).astype(np.int64)
+    remainder = hashes & np.uint64((1 << (64 - precision)) - 1)
+
+    # Position of the first 1-bit in the remaining 64 - precision bits
+    rank = (64 - precision) - _bit_length(remainder) + 1
+
+    registers = np.zeros(n_groups * m, dtype=np.uint8)
+    np.maximum.at(registers, groups * m + index, rank.astype(np.uint8))
+    return registers.reshape(n_groups, m)
+
+
+def merge(registers):
+    """
+    Union of sketches: element-wise max over the first axis
+    """
+    return np.maximum.reduce(np.asarray(registers, dtype=np.uint8), axis=0)
+
+
+def estimate(registers):
+    """
+    Cardinality estimate for each row of a (n, m) register array (or a single
+    register array), with the small-range (linear counting) correction
+    """
+    registers = np.atleast_2d(np.asarray(registers, dtype=np.uint8))
+    m = registers.shape[1]
+
+    alpha = 0.7213 / (1 + 1.079 / m)
+    raw = alpha * m * m / np.sum(np.ldexp(1.0, -registers.astype(np.int64)), axis=1)
+
+    zeros = np.count_nonzero(registers == 0, axis=1)
+    with np.errstate(divide="ignore"):
+        linear = m * np.log(m / np.maximum(zeros, 1))
+
+    return np.where((raw <= 2.5 * m) & (zeros > 0), linear, raw)
+
+
+def relative_error(precision):
+    """
+    Standard error of an estimate, relative to the true cardinality
+    """
+    return 1.04 / np.sqrt(1 << precision)
+
+
+def to_bytes(registers):
+    # Sketches of small sets are mostly zeros and compress very well
+    return zlib.compress(np.asarray(registers, dtype=np.uint8).tobytes())
+
+
+def from_bytes(data):
+    return np.frombuffer(zlib.decompress(data), dtype=np.uint8)
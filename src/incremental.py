@@ -0,0 +1,336 @@
+import pandas as pd
+from sqlalchemy import text
+
+from src.dialect import insert_method, is_duckdb, table_columns
+from src.dirty_months import mark_changed_months, mark_months
+from src.dq_utils import write_rejected_rows
+from src.publish import create_staging, publish_table, staging_name
+from src.schemas import bronze_dtypes
+from src.telemetry import db_timer, record
+
+
+# Incremental silver builds are a full fingerprint diff: every bronze row
+# is hashed (row_hash) and compared with silver, since bronze is reloaded
+# whole from each extract and has nothing (no load batch, no reliable date)
+# to narrow the scan by; the natural keys are not unique either. The cost
+# grows with bronze, but only the delta is transformed and written.
+# Tables with a partition column are range-partitioned by its month (see
+# sql/silver).
+SILVER_TABLES = {
+    "customers": {"partition": None},
+    "users": {"partition": None},
+    "subscriptions": {"partition": None},
+    "payments": {"partition": None},
+    "usage_events": {"partition": "event_date"},
+}
+
+# Fingerprint of a raw bronze row; select it as row_hash from "bronze.<table> b"
+ROW_HASH = "md5(b::text)"
+
+
+def needs_full_refresh(engine, table):
+    """
+    True when silver.<table> does not exist yet, predates row fingerprints
+    or is empty (e.g. just created by src.init_db)
+    """
+    # An empty column list means the table does not exist
+    if "row_hash" not in table_columns(engine, f"silver.{table}"):
+        return True
+
+    with engine.connect() as conn:
+        return not conn.execute(text(f"SELECT EXISTS (SELECT 1 FROM silver.{table})")).scalar()
+
+
+def bronze_delta_query(query, table, full_refresh=False):
+    """
+    Wraps a bronze query (which must select a row_hash column) so that it
+    returns only the rows to process.
+
+    In incremental mode only rows whose fingerprint is not in silver yet are
+    returned, i.e. new or changed bronze rows, whatever their dates: late
+    or back-dated rows are loaded like any other.
+
+    Every copy of a row but one is returned too, flagged in an is_duplicate
+    column for drop_duplicate_rows, so exact duplicates are reported on
+    every run as long as bronze holds them, even copies of rows already
+    in silver (e.g. a payment imported twice).
+    """
+    delta = "" if full_refresh else f"""
+        WHERE d.is_duplicate OR NOT EXISTS (
+            SELECT 1 FROM silver.{table} s WHERE s.row_hash = d.row_hash
+        )
+    """
+
+    return text(
+        f"""
+        SELECT *
+        FROM (
+            SELECT q.*, ROW_NUMBER() OVER (PARTITION BY q.row_hash) > 1 AS is_duplicate
+            FROM ({query}) q
+        ) d
+        {delta}
+        """
+    )
+
+
+def drop_duplicate_rows(df, table):
+    """
+    Drops the rows flagged as exact copies of another bronze row (silver
+    keeps one row per row_hash) and sends them to the audit tables
+    """
+    duplicate = df.pop("is_duplicate").astype(bool).to_numpy()
+    if duplicate.any():
+        write_rejected_rows(
+            table_name=f"silver.{table}",
+            rule_name="DUPLICATE_ROW",
+            reason="Exact duplicate of another bronze row",
+            df=df[duplicate],
+        )
+        df = df[~duplicate].reset_index(drop=True)
+    return df
+
+
+def read_bronze_delta(engine, query, table, full_refresh=False):
+    """
+    Reads the bronze rows to process into one frame, with the compact
+    read-time dtypes from src/schemas.py. Exact duplicate rows are dropped
+    and reported (see drop_duplicate_rows).
+    """
+    query = bronze_delta_query(query, table, full_refresh)
+    df = pd.read_sql(query, engine, dtype=bronze_dtypes(table))
+    record(rows_in=len(df))
+
+    return drop_duplicate_rows(df, table)
+
+
+def stream_bronze_delta(engine, query, table, full_refresh=False, chunksize=100000):
+    """
+    Yields the bronze rows to process in frames of at most chunksize rows,
+    using a server-side cursor so the full result never sits in memory.
+    At least one (possibly empty) frame is always yielded. Exact duplicate
+    rows are dropped and reported (see drop_duplicate_rows).
+    """
+    query = bronze_delta_query(query, table, full_refresh)
+
+    with engine.connect() as conn:
+        conn = conn.execution_options(stream_results=True, max_row_buffer=chunksize)
+        chunks = pd.read_sql(
+            query, conn, chunksize=chunksize, dtype=bronze_dtypes(table)
+        )
+
+        while True:
+            # Rows are fetched from the cursor as each chunk is requested
+            with db_timer("read"):
+                df = next(chunks, None)
+            if df is None:
+                return
+
+            record(rows_in=len(df))
+            yield drop_duplicate_rows(df, table)
+
+
+def add_partitions(conn, table, months, parent=None):
+    """
+    Creates the monthly partitions of silver.<table> (or of its staging copy
+    silver.<parent>) for the given months (pandas Periods) that do not exist
+    yet. Rows without a date go to the default partition. DuckDB tables are
+    not partitioned.
+
+    Run it only while no query in this process is reading silver.<table>:
+    adding a partition waits for those readers to finish.
+    """
+    if SILVER_TABLES[table]["partition"] is None or is_duckdb():
+        return
+
+    parent = parent or table
+
+    existing = set(
+        conn.execute(
+            text(
+                "SELECT c.relname FROM pg_inherits i "
+                "JOIN pg_class c ON c.oid = i.inhrelid "
+                "WHERE i.inhparent = to_regclass(:parent)"
+            ),
+            {"parent": f"silver.{parent}"},
+        ).scalars()
+    )
+
+    for month in months:
+        name = f"{parent}_{month.strftime('%Y_%m')}"
+        if name in existing:
+            continue
+
+        conn.execute(
+            text(
+                f"CREATE TABLE silver.{name} PARTITION OF silver.{parent} "
+                f"FOR VALUES FROM ('{month.start_time:%Y-%m-%d}') "
+                f"TO ('{(month + 1).start_time:%Y-%m-%d}')"
+            )
+        )
+
+
+def _months(df, table):
+    column = SILVER_TABLES[table]["partition"]
+    if column is None:
+        return []
+    return df[column].dropna().dt.to_period("M").unique()
+
+
+def replace_silver(conn, df, table, publish=True):
+    """
+    Writes df to a new staging copy of silver.<table> (see src/publish.py)
+    and, unless publish=False, swaps it in. To write more chunks first, call
+    append_silver(..., staged=True) and then publish_silver.
+    """
+    create_staging(conn, f"silver.{table}")
+    append_silver(conn, df, table, staged=True)
+
+    if publish:
+        publish_silver(conn, table)
+
+
+def publish_silver(conn, table):
+    """
+    Swaps the staging copy of silver.<table> in; every month of the gold
+    tables built from it is then stale
+    """
+    publish_table(conn, f"silver.{table}")
+    mark_months(conn, f"silver.{table}")
+
+
+def append_silver(conn, df, table, staged=False):
+    name = staging_name(table) if staged else table
+    add_partitions(conn, table, _months(df, table), parent=name)
+    df.to_sql(
+        name=name,
+        schema="silver",
+        con=conn,
+        index=False,
+        if_exists="append",
+        method=insert_method()
+    )
+    record(rows_out=len(df))
+
+
+def append_staged_concurrently(engine, df, table):
+    """
+    Appends df to the staging copy of silver.<table> while other processes
+    do the same: partitions are created in a short transaction of their
+    own, by one writer at a time, and the rows are written in another.
+    """
+    with engine.begin() as conn:
+        if not is_duckdb():
+            conn.execute(
+                text("SELECT pg_advisory_xact_lock(hashtext(:name))"),
+                {"name": f"silver.{staging_name(table)}"},
+            )
+        add_partitions(conn, table, _months(df, table), parent=staging_name(table))
+
+    with engine.begin() as conn:
+        append_silver(conn, df, table, staged=True)
+
+
+def create_delta(conn, table):
+    """
+    Creates an empty silver._<table>_delta with the columns of
+    silver.<table>, for stage_delta(..., replace=False) from several writers
+    """
+    conn.execute(text(f"DROP TABLE IF EXISTS silver._{table}_delta"))
+    conn.execute(
+        text(f"CREATE TABLE silver._{table}_delta AS SELECT * FROM silver.{table} WHERE false")
+    )
+
+
+def stage_delta(conn, df, table, replace=True):
+    """
+    Writes df to the staging table silver._<table>_delta, replacing it
+    unless replace=False
+    """
+    df.to_sql(
+        name=f"_{table}_delta",
+        schema="silver",
+        con=conn,
+        index=False,
+        if_exists="replace" if replace else "append",
+        method=insert_method()
+    )
+
+
+def merge_delta(conn, table, columns):
+    """
+    Brings silver.<table> in line with bronze: removes the silver rows whose
+    bronze row is gone (edited or deleted), i.e. whose row_hash no longer
+    matches any bronze row, and inserts the staged delta. Natural keys are
+    not unique, so rows are matched by fingerprint, never by key.
+    """
+    partition = SILVER_TABLES[table]["partition"]
+    staging = f"_{table}_delta"
+    stale = f"_{table}_stale"
+    columns = ", ".join(f'"{c}"' for c in columns)
+
+    conn.execute(text(f"DROP TABLE IF EXISTS silver.{stale}"))
+    conn.execute(
+        text(
+            f"""
+            CREATE TABLE silver.{stale} AS
+            SELECT s.row_hash
+            FROM silver.{table} s
+            WHERE NOT EXISTS (
+                SELECT 1 FROM bronze.{table} b WHERE {ROW_HASH} = s.row_hash
+            )
+            """
+        )
+    )
+
+    # Read while the stale rows are still there
+    mark_changed_months(conn, table, staging, stale)
+
+    conn.execute(
+        text(
+            f"DELETE FROM silver.{table} "
+            f"WHERE row_hash IN (SELECT row_hash FROM silver.{stale})"
+        )
+    )
+
+    if partition is not None:
+        months = conn.execute(
+            text(
+                f"SELECT DISTINCT date_trunc('month', {partition}) "
+                f"FROM silver.{staging} WHERE {partition} IS NOT NULL"
+            )
+        ).scalars()
+        add_partitions(conn, table, [pd.Period(month, "M") for month in months])
+
+    result = conn.execute(
+        text(
+            f"INSERT INTO silver.{table} ({columns}) "
+            f"SELECT {columns} FROM silver.{staging}"
+        )
+    )
+    conn.execute(text(f"DROP TABLE silver.{staging}"))
+    conn.execute(text(f"DROP TABLE silver.{stale}"))
+    record(rows_out=max(result.rowcount, 0))
+
+
+def upsert_silver(conn, df, table):
+    """
+    Stages df (the new or changed bronze rows) and merges it, which also
+    removes the rows whose bronze row changed or was deleted
+    """
+    stage_delta(conn, df, table)
+    merge_delta(conn, table, df.columns)
+
+
+def write_silver(engine, df, table, full_refresh=False):
+    """
+    Writes a transformed frame to silver.<table>.
+
+    Full refresh builds a new copy of the table and swaps it in. Incremental
+    mode stages the delta and merges it (see merge_delta) in one
+    transaction.
+    """
+    with engine.begin() as conn:
+        if full_refresh:
+            replace_silver(conn, df, table)
+        else:
+            upsert_silver(conn, df, table)
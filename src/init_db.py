@@ -0,0 +1,75 @@
+import argparse
+import glob
+import os
+import re
+
+from config.db import get_backend, get_engine
+from src.dialect import table_exists
+from src.manifest import TRACKED_LAYERS, clear_fingerprints
+
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(__file__))
+SQL_DIR = os.path.join(PROJECT_ROOT, "sql")
+
+# Applied in this order; files within a layer run in name order
+LAYERS = ["bronze", "silver", "gold", "audit"]
+
+# Postgres types spelled differently in DuckDB
+DUCKDB_TYPES = {"JSONB": "JSON"}
+
+# DuckDB has no declarative partitioning: partitioned tables become plain ones
+PARTITION_BY = re.compile(r"\s+PARTITION BY RANGE \([^)]*\)")
+PARTITION_OF = re.compile(r"CREATE TABLE [^;]* PARTITION OF [^;]*;")
+
+# DuckDB cannot rename a table that has indexes, which src.publish does on
+# every rebuild; its scans rely on zone maps instead, so only keys are kept
+CREATE_INDEX = re.compile(r"CREATE (UNIQUE )?INDEX [^;]*;")
+
+
+def _translate(sql, backend):
+    if backend == "duckdb":
+        for postgres_type, duckdb_type in DUCKDB_TYPES.items():
+            sql = sql.replace(postgres_type, duckdb_type)
+        sql = PARTITION_OF.sub("", PARTITION_BY.sub("", sql))
+        sql = CREATE_INDEX.sub("", sql)
+    return sql
+
+
+def init_db(layers=None):
+    """
+    Creates the schemas and tables of the given layers (default: all) by
+    running the DDL under sql/ against the configured backend. Bronze,
+    silver and gold tables are recreated empty (rebuild them with
+    src.etl all) and forgotten by the manifest; audit tables and the usage
+    sketches are kept.
+    """
+    backend = get_backend()
+    engine = get_engine()
+
+    for layer in layers or LAYERS:
+        for path in sorted(glob.glob(os.path.join(SQL_DIR, layer, "*.sql"))):
+            with open(path) as f:
+                sql = _translate(f.read(), backend)
+
+            with engine.begin() as conn:
+                conn.exec_driver_sql(sql)
+
+            print(f"Applied {os.path.relpath(path, PROJECT_ROOT)}")
+
+    # The recreated tables are empty: their stages must run again
+    if table_exists(engine, "audit.fingerprints"):
+        clear_fingerprints(engine, [layer for layer in layers or LAYERS if layer in TRACKED_LAYERS])
+
+    print(f"✅ {backend} database initialised")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create the bronze/silver/gold/audit schemas")
+    parser.add_argument("layers", nargs="*", help=f"Layers to create: {', '.join(LAYERS)} (default: all)")
+    args = parser.parse_args()
+
+    unknown = set(args.layers) - set(LAYERS)
+    if unknown:
+        parser.error(f"Unknown layers: {', '.join(sorted(unknown))}")
+
+    init_db(args.layers)
@@ -0,0 +1,197 @@
+import numpy as np
+import pandas as pd
+
+
+# Month indexes are "months since 1970-01", so they can be used directly as
+# positions on a numpy axis. NaT becomes the smallest int64.
+NAT_MONTH = np.iinfo(np.int64).min
+
+
+def to_month_index(dates):
+    """
+    Converts a date-like Series to integer month indexes (months since 1970-01)
+    """
+    values = pd.to_datetime(dates).to_numpy(dtype="datetime64[ns]")
+    return values.astype("datetime64[M]").astype(np.int64)
+
+
+def month_index_to_timestamp(months):
+    """
+    Converts integer month indexes back to month-start timestamps
+    """
+    months = np.asarray(months, dtype=np.int64)
+    return pd.DatetimeIndex(
+        months.astype("datetime64[M]").astype("datetime64[ns]"),
+        name="month",
+    )
+
+
+def month_spans(df, start_col="start_date", end_col="end_date"):
+    """
+    Turns each row into an inclusive span of months [start_month, end_month].
+
+    Open-ended rows (no end date) cover only their start month, and rows that
+    end before they start cover nothing and are dropped.
+    """
+    start = to_month_index(df[start_col])
+    end = to_month_index(df[end_col])
+    end = np.where(end == NAT_MONTH, start, end)
+
+    keep = (start != NAT_MONTH) & (end >= start)
+
+    spans = df.loc[keep].copy()
+    spans["start_month"] = start[keep]
+    spans["end_month"] = end[keep]
+    return spans
+
+
+def coalesce_spans(spans, key):
+    """
+    Merges overlapping or back-to-back spans of the same key, so every key is
+    counted at most once per month and each merged span ends exactly in the
+    month after which the key is no longer active.
+
+    Missing keys are grouped together (like a pandas merge would) so that the
+    months they cover are preserved; callers decide whether to count them.
+    """
+    if spans.empty:
+        return pd.DataFrame(
+            {
+                key: spans[key],
+                "start_month": spans["start_month"],
+                "end_month": spans["end_month"],
+            }
+        )
+
+    codes, uniques = pd.factorize(spans[key], use_na_sentinel=False)
+    start = spans["start_month"].to_numpy()
+    end = spans["end_month"].to_numpy()
+
+    order = np.lexsort((start, codes))
+    codes, start, end = codes[order], start[order], end[order]
+
+    # Running max of end_month within each key, as of the previous span
+    running_end = pd.Series(end).groupby(codes).cummax().to_numpy()
+    prev_end = np.empty_like(running_end)
+    prev_end[0] = NAT_MONTH
+    prev_end[1:] = running_end[:-1]
+
+    new_key = np.ones(len(codes), dtype=bool)
+    new_key[1:] = codes[1:] != codes[:-1]
+
+    is_new_span = new_key | (start > prev_end + 1)
+    span_id = np.cumsum(is_new_span) - 1
+
+    first = np.flatnonzero(is_new_span)
+    merged_end = np.maximum.reduceat(end, first)
+
+    return pd.DataFrame(
+        {
+            key: uniques.take(codes[first]),
+            "start_month": start[first],
+            "end_month": merged_end,
+        },
+        index=pd.RangeIndex(span_id[-1] + 1),
+    )
+
+
+def _boundary_deltas(start, end, size, values=None):
+    # +value in the first month of each span, -value in the month after it
+    return (
+        np.bincount(start, weights=values, minlength=size)
+        - np.bincount(end + 1, weights=values, minlength=size)
+    )
+
+
+def sweep(spans, weights=None, name=None):
+    """
+    Aggregates spans per month using start/end boundary deltas.
+
+    Without weights, returns the number of spans active in each month. With
+    weights (a column name or array), returns the sum of the weights of the
+    spans active in each month, treating missing weights as zero. Only months
+    covered by at least one span are returned.
+    """
+    if spans.empty:
+        return pd.Series([], index=month_index_to_timestamp([]), name=name, dtype=np.int64)
+
+    start = spans["start_month"].to_numpy()
+    end = spans["end_month"].to_numpy()
+
+    lo = start.min()
+    size = end.max() - lo + 2
+
+    coverage = np.cumsum(_boundary_deltas(start - lo, end - lo, size))[:-1]
+    covered = coverage > 0
+
+    if weights is None:
+        totals = coverage
+    else:
+        if isinstance(weights, str):
+            weights = spans[weights]
+        weights = pd.Series(np.asarray(weights), copy=False)
+        if weights.isna().any():
+            weights = weights.fillna(0)
+        values = weights.to_numpy()
+
+        totals = np.cumsum(_boundary_deltas(start - lo, end - lo, size, values))[:-1]
+        # Integer weights are accumulated in float64, which is exact for any
+        # realistic amount, so cast them back to keep the groupby-sum dtype.
+        if np.issubdtype(values.dtype, np.integer) or values.dtype == np.bool_:
+            totals = np.rint(totals).astype(np.int64)
+
+    months = np.arange(lo, lo + size - 1)[covered]
+    return pd.Series(totals[covered], index=month_index_to_timestamp(months), name=name)
+
+
+def count_by_month(months, weights=None, name=None):
+    """
+    Counts span boundaries (e.g. starts or ends) per month.
+
+    With weights, sums the weights instead of counting rows, while still
+    returning every month that has at least one boundary.
+    """
+    months = np.asarray(months, dtype=np.int64)
+
+    if weights is None:
+        weights = np.ones(len(months), dtype=np.int64)
+    else:
+        weights = np.asarray(weights).astype(np.int64)
+
+    totals = pd.Series(weights).groupby(months).sum()
+    totals.index = month_index_to_timestamp(totals.index)
+    totals.name = name
+    return totals
+
+
+def distinct_active(coalesced, key, name=None):
+    """
+    Distinct keys active per month, from the output of coalesce_spans.
+
+    Months covered only by rows with a missing key are kept with a count of
+    zero, matching groupby(...).nunique().
+    """
+    return sweep(coalesced, weights=coalesced[key].notna(), name=name)
+
+
+def distinct_ends(coalesced, key, name=None):
+    """
+    Distinct keys active in a month but not in the following month, from the
+    output of coalesce_spans.
+    """
+    return count_by_month(
+        coalesced["end_month"], weights=coalesced[key].notna(), name=name
+    )
+
+
+def first_starts(coalesced, key, name=None):
+    """
+    Distinct keys whose first active month is each month, from the output of
+    coalesce_spans. Rows with a missing key are ignored.
+    """
+    first = (
+        coalesced.loc[coalesced[key].notna()]
+        .groupby(key)["start_month"]
+        .min()
+    )
+    return count_by_month(first, name=name)
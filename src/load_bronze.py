@@ -1,8 +1,16 @@
+import argparse
+import csv
+import io
 import os
+from itertools import islice
+
 import pandas as pd
 from sqlalchemy import text
 
 from config.db import get_engine
+from src.dialect import insert_method, is_duckdb
+from src.manifest import file_fingerprint, load_fingerprints, record_table
+from src.telemetry import db_timer, record
 
 
 # Absolute path to bronze_inputs folder
@@ -19,39 +27,178 @@ FILE_TABLE_MAP = {
     "saas_bronze_raw_data-usage_events.csv": "bronze.usage_events",
 }
 
+# "copy" streams files with COPY ... FROM STDIN, "pandas" uses read_csv + to_sql
+LOAD_MODE = os.getenv("BRONZE_LOAD_MODE", "copy")
+
+# Rows buffered in memory per COPY round-trip
+COPY_CHUNK_ROWS = int(os.getenv("BRONZE_COPY_CHUNK_ROWS", "100000"))
+
 
-def load_csv_to_bronze():
+def copy_csv_to_table(dbapi_conn, csv_path, table_name, chunk_rows=COPY_CHUNK_ROWS):
     """
-    Loads all CSV files from bronze_inputs into bronze tables.
-    This step is idempotent: tables are truncated before load.
+    Streams a CSV file into a table with COPY ... FROM STDIN.
+
+    The file is read chunk_rows records at a time, so memory stays constant
+    regardless of file size. Values are passed through as raw text, which is
+    what the all-TEXT bronze tables expect. Returns the number of rows loaded.
     """
-    engine = get_engine()
+    rows_loaded = 0
 
-    for csv_file, table_name in FILE_TABLE_MAP.items():
-        csv_path = os.path.join(BRONZE_INPUTS_DIR, csv_file)
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader)
 
-        print(f"\nLoading file: {csv_file}")
-        print(f"Target table: {table_name}")
+        columns = ", ".join(f'"{column}"' for column in header)
+        copy_sql = f"COPY {table_name} ({columns}) FROM STDIN WITH (FORMAT csv)"
 
-        # Read CSV
-        df = pd.read_csv(csv_path)
-        print(f"Rows read from CSV: {len(df)}")
+        with dbapi_conn.cursor() as cursor:
+            while True:
+                chunk = list(islice(reader, chunk_rows))
+                if not chunk:
+                    break
 
-        with engine.begin() as connection:
+                buffer = io.StringIO()
+                csv.writer(buffer, lineterminator="\n").writerows(chunk)
+                buffer.seek(0)
+
+                with db_timer("write"):
+                    cursor.copy_expert(copy_sql, buffer)
+                rows_loaded += len(chunk)
+                record(rows_in=len(chunk), rows_out=len(chunk))
+
+    return rows_loaded
+
+
+def _load_with_copy(engine, csv_path, table_name, chunk_rows):
+    dbapi_conn = engine.raw_connection()
+    try:
+        with dbapi_conn.cursor() as cursor:
             # Truncate table before load (idempotent)
-            connection.execute(text(f"TRUNCATE TABLE {table_name};"))
-
-            # Load data
-            df.to_sql(
-                name=table_name.split(".")[1],
-                schema="bronze",
-                con=connection,
-                if_exists="append",
-                index=False
+            cursor.execute(f"TRUNCATE TABLE {table_name};")
+
+        rows_loaded = copy_csv_to_table(dbapi_conn, csv_path, table_name, chunk_rows)
+
+        # Truncate and all chunks are committed together
+        dbapi_conn.commit()
+    except Exception:
+        dbapi_conn.rollback()
+        raise
+    finally:
+        dbapi_conn.close()
+
+    return rows_loaded
+
+
+def _load_with_read_csv(engine, csv_path, table_name):
+    # DuckDB's counterpart of COPY: the database scans the file itself,
+    # every column as text, so no rows pass through Python
+    path = csv_path.replace("'", "''")
+
+    with engine.begin() as connection:
+        # Truncate table before load (idempotent)
+        connection.exec_driver_sql(f"TRUNCATE TABLE {table_name};")
+
+        with db_timer("write"):
+            connection.exec_driver_sql(
+                f"INSERT INTO {table_name} BY NAME "
+                f"SELECT * FROM read_csv('{path}', header = true, all_varchar = true)"
             )
+        rows_loaded = connection.exec_driver_sql(f"SELECT COUNT(*) FROM {table_name}").scalar()
+
+    record(rows_in=rows_loaded, rows_out=rows_loaded)
+    return rows_loaded
+
+
+def _load_with_pandas(engine, csv_path, table_name):
+    # Read CSV
+    df = pd.read_csv(csv_path)
+    print(f"Rows read from CSV: {len(df)}")
+
+    with engine.begin() as connection:
+        # Truncate table before load (idempotent)
+        connection.execute(text(f"TRUNCATE TABLE {table_name};"))
+
+        # Load data
+        df.to_sql(
+            name=table_name.split(".")[1],
+            schema="bronze",
+            con=connection,
+            if_exists="append",
+            method=insert_method(),
+            index=False
+        )
 
-        print(f"Loaded {len(df)} rows into {table_name}")
+    record(rows_in=len(df), rows_out=len(df))
+    return len(df)
+
+
+def load_file(csv_file, inputs_dir=None, mode=None, chunk_rows=COPY_CHUNK_ROWS, force=False):
+    """
+    Loads one CSV file of FILE_TABLE_MAP into its bronze table. This step is
+    idempotent: the table is truncated before load.
+
+    The load is skipped unless force when the table already holds a file
+    with the same content (see src/manifest.py); returns the number of rows
+    loaded, or None when skipped.
+    """
+    mode = mode or LOAD_MODE
+    if mode not in ("copy", "pandas"):
+        raise ValueError(f"Invalid bronze load mode: {mode} (expected copy | pandas)")
+
+    engine = get_engine()
+    csv_path = os.path.join(inputs_dir or BRONZE_INPUTS_DIR, csv_file)
+    table_name = FILE_TABLE_MAP[csv_file]
+
+    fingerprint = file_fingerprint(engine, csv_path)
+    loaded = load_fingerprints(engine, [table_name]).get(table_name, (None, None))[0]
+    if not force and loaded == fingerprint:
+        print(f"\nSkipped {csv_file}: {table_name} already holds its content")
+        return None
+
+    print(f"\nLoading file: {csv_file}")
+    print(f"Target table: {table_name}")
+
+    if mode == "copy" and is_duckdb():
+        rows_loaded = _load_with_read_csv(engine, csv_path, table_name)
+    elif mode == "copy":
+        rows_loaded = _load_with_copy(engine, csv_path, table_name, chunk_rows)
+    else:
+        rows_loaded = _load_with_pandas(engine, csv_path, table_name)
+
+    record_table(engine, table_name, fingerprint, {os.path.abspath(csv_path): fingerprint})
+
+    print(f"Loaded {rows_loaded} rows into {table_name}")
+    return rows_loaded
+
+
+def load_csv_to_bronze(mode=None, chunk_rows=COPY_CHUNK_ROWS, inputs_dir=None, force=False):
+    """
+    Loads all CSV files from bronze_inputs (or inputs_dir) into bronze tables,
+    skipping files whose content is already loaded unless force.
+
+    mode="copy" (default) streams each file with COPY in bounded chunks, or
+    on DuckDB lets the database read the file; mode="pandas" reads each file
+    fully and inserts it with to_sql.
+    Returns the number of rows loaded per table that was loaded.
+    """
+    rows_loaded = {}
+
+    for csv_file, table_name in FILE_TABLE_MAP.items():
+        rows = load_file(csv_file, inputs_dir, mode, chunk_rows, force)
+        if rows is not None:
+            rows_loaded[table_name] = rows
+
+    return rows_loaded
 
 
 if __name__ == "__main__":
-    load_csv_to_bronze()
+    parser = argparse.ArgumentParser(description="Load bronze_inputs CSVs into bronze tables")
+    parser.add_argument("--mode", choices=["copy", "pandas"], default=None)
+    parser.add_argument("--chunk-rows", type=int, default=COPY_CHUNK_ROWS)
+    parser.add_argument("--inputs-dir", default=None, help="Directory with the CSVs (default: bronze_inputs)")
+    parser.add_argument("--force", action="store_true", help="Reload files whose content is already loaded")
+    args = parser.parse_args()
+
+    load_csv_to_bronze(
+        mode=args.mode, chunk_rows=args.chunk_rows, inputs_dir=args.inputs_dir, force=args.force
+    )
@@ -0,0 +1,180 @@
+import hashlib
+import json
+import os
+import uuid
+from dataclasses import replace
+
+from sqlalchemy import bindparam, text
+
+from config.db import get_engine
+
+
+# Content fingerprints of the bronze input files and of every table built by
+# src.etl, kept in audit.fingerprints.
+#
+# A file is only re-hashed when its size or mtime changed. A bronze table's
+# fingerprint is the content hash of the file loaded into it; any other
+# table's hashes the fingerprints of the inputs its stage read. A stage whose
+# inputs still have the fingerprints its outputs were built from is skipped,
+# which leaves its outputs' fingerprints unchanged, so on a day without new
+# data every stage after the bronze loads is skipped too.
+
+# Stage outputs tracked in the manifest (not e.g. Parquet exports)
+TRACKED_LAYERS = ("bronze", "silver", "gold")
+
+
+def _is_tracked(name):
+    return name.split(".")[0] in TRACKED_LAYERS
+
+
+def _save(conn, name, fingerprint, size_bytes=None, mtime=None, inputs=None):
+    conn.execute(
+        text(
+            """
+            INSERT INTO audit.fingerprints AS f (
+                name, fingerprint, size_bytes, mtime, inputs, updated_at
+            )
+            VALUES (
+                :name, :fingerprint, :size_bytes, :mtime, :inputs, CURRENT_TIMESTAMP
+            )
+            ON CONFLICT (name) DO UPDATE SET
+                fingerprint = EXCLUDED.fingerprint,
+                size_bytes = EXCLUDED.size_bytes,
+                mtime = EXCLUDED.mtime,
+                inputs = EXCLUDED.inputs,
+                updated_at = EXCLUDED.updated_at
+            """
+        ),
+        {
+            "name": name,
+            "fingerprint": fingerprint,
+            "size_bytes": size_bytes,
+            "mtime": mtime,
+            "inputs": None if inputs is None else json.dumps(inputs, sort_keys=True),
+        },
+    )
+
+
+def load_fingerprints(engine, names):
+    """
+    {name: (fingerprint, inputs)} of the given files and tables that are in
+    the manifest
+    """
+    names = list(names)
+    if not names:
+        return {}
+
+    with engine.connect() as conn:
+        rows = conn.execute(
+            text("SELECT name, fingerprint, inputs FROM audit.fingerprints WHERE name IN :names")
+            .bindparams(bindparam("names", expanding=True)),
+            {"names": names},
+        ).all()
+
+    return {
+        name: (fingerprint, None if inputs is None else json.loads(inputs))
+        for name, fingerprint, inputs in rows
+    }
+
+
+def file_fingerprint(engine, path):
+    """
+    sha256 of a file's content, re-hashed only when its size or mtime
+    differ from the manifest
+    """
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+
+    with engine.connect() as conn:
+        known = conn.execute(
+            text("SELECT fingerprint, size_bytes, mtime FROM audit.fingerprints WHERE name = :name"),
+            {"name": path},
+        ).first()
+
+    if known is not None and (known.size_bytes, known.mtime) == (stat.st_size, stat.st_mtime):
+        return known.fingerprint
+
+    with open(path, "rb") as f:
+        fingerprint = hashlib.file_digest(f, "sha256").hexdigest()
+
+    with engine.begin() as conn:
+        _save(conn, path, fingerprint, size_bytes=stat.st_size, mtime=stat.st_mtime)
+    return fingerprint
+
+
+def record_table(engine, table, fingerprint, inputs):
+    """
+    Records that table now holds what was built from inputs
+    ({input: fingerprint})
+    """
+    with engine.begin() as conn:
+        _save(conn, table, fingerprint, inputs=inputs)
+
+
+def clear_fingerprints(engine, layers=TRACKED_LAYERS):
+    """
+    Forgets the tables of the given layers, e.g. after they were emptied or
+    rebuilt outside src.etl, so their stages run again
+    """
+    with engine.begin() as conn:
+        for layer in layers:
+            conn.execute(
+                text("DELETE FROM audit.fingerprints WHERE name LIKE :prefix"),
+                {"prefix": f"{layer}.%"},
+            )
+
+
+def is_unchanged(stage, known):
+    """
+    True when every tracked output of stage was built from its inputs'
+    current fingerprints (known: load_fingerprints of both)
+    """
+    outputs = [output for output in stage.outputs if _is_tracked(output)]
+    if not stage.inputs or not outputs:
+        return False
+
+    inputs = {name: known.get(name, (None, None))[0] for name in stage.inputs}
+    if None in inputs.values():
+        return False
+
+    return all(known.get(output, (None, None))[1] == inputs for output in outputs)
+
+
+def skip_unchanged(stages, force=False, engine=None, skipped=None):
+    """
+    Wraps the stages of a run so each is skipped when is_unchanged (unless
+    force), and otherwise records the fingerprints of its tracked outputs.
+    Stages without inputs (the bronze loads) fingerprint their own outputs.
+    The names of skipped stages are added to the skipped set, if given.
+    """
+    def wrap(stage):
+        def run():
+            db = engine if engine is not None else get_engine()
+            known = load_fingerprints(db, stage.inputs + stage.outputs)
+
+            if not force and is_unchanged(stage, known):
+                print(f"✅ {stage.name} skipped (inputs unchanged)")
+                if skipped is not None:
+                    skipped.add(stage.name)
+                return
+
+            stage.func()
+
+            if not stage.inputs:
+                return
+
+            inputs = {name: known.get(name, (None, None))[0] for name in stage.inputs}
+            if None in inputs.values():
+                # Built from something untracked: downstream stages must run
+                fingerprint = uuid.uuid4().hex
+            else:
+                payload = json.dumps([stage.name, inputs], sort_keys=True)
+                fingerprint = hashlib.sha256(payload.encode()).hexdigest()
+
+            for output in stage.outputs:
+                if _is_tracked(output):
+                    record_table(db, output, fingerprint, inputs)
+
+        return run
+
+    return [replace(stage, func=wrap(stage)) for stage in stages]
@@ -0,0 +1,47 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from src.dialect import is_duckdb
+
+
+# Map/reduce mode for usage events: silver.usage_events and
+# gold.dau_mau_monthly are built by this many worker processes, each owning
+# the rows of one hash partition of user_id (0 or 1: in the stage's own
+# process). Partitions never share a user, so distinct users counted per
+# partition add up to exact totals.
+PROCESSES = int(os.getenv("ETL_PROCESSES", "0"))
+
+
+def use_processes(processes):
+    """
+    True when a stage should run as map/reduce over processes workers. Only
+    on Postgres: a DuckDB file cannot be opened by several processes while
+    the run has it open.
+    """
+    return processes > 1 and not is_duckdb()
+
+
+def map_partitions(func, partitions, *args):
+    """
+    Runs func(partition, partitions, *args) for every partition in a pool
+    of partitions worker processes and returns the results in partition
+    order.
+
+    Workers are spawned rather than forked, since stages run in threads;
+    each opens its own connection pool.
+    """
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=partitions, mp_context=context) as pool:
+        futures = [pool.submit(func, partition, partitions, *args) for partition in range(partitions)]
+        return [future.result() for future in futures]
+
+
+def sum_counts(partials):
+    """
+    Adds up per-partition counts (Series indexed e.g. by day), treating keys
+    missing from a partition as 0
+    """
+    return pd.concat(partials).groupby(level=0).sum()
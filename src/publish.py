@@ -0,0 +1,148 @@
+import argparse
+
+from sqlalchemy import text
+
+from config.db import get_engine
+from src.dialect import is_duckdb
+
+
+# Builders write a full rebuild of <schema>.<table> into <schema>._<table>_next
+# and then swap it in by renaming, so readers never see a half-written or
+# locked table for longer than the renames take. The replaced version stays
+# as <schema>._<table>_prev until the next publish, for rollback.
+
+
+def staging_name(table):
+    return f"_{table}_next"
+
+
+def previous_name(table):
+    return f"_{table}_prev"
+
+
+def _exists(conn, schema, table):
+    return bool(
+        conn.execute(
+            text(
+                "SELECT 1 FROM information_schema.tables "
+                "WHERE table_schema = :schema AND table_name = :table"
+            ),
+            {"schema": schema, "table": table},
+        ).first()
+    )
+
+
+def create_staging(conn, table):
+    """
+    Creates an empty staging copy of the managed table <schema>.<table> with
+    the same columns, keys, indexes and partitioning (the partitions
+    themselves are added by the writer). Returns its unqualified name.
+    """
+    schema, name = table.split(".")
+    staging = staging_name(name)
+    conn.execute(text(f"DROP TABLE IF EXISTS {schema}.{staging}"))
+
+    if is_duckdb():
+        ddl = conn.execute(
+            text(
+                "SELECT sql FROM duckdb_tables() "
+                "WHERE schema_name = :schema AND table_name = :table"
+            ),
+            {"schema": schema, "table": name},
+        ).scalar()
+        conn.exec_driver_sql(ddl.replace(f"{table}(", f"{schema}.{staging}(", 1))
+        return staging
+
+    partition_key = conn.execute(
+        text("SELECT pg_get_partkeydef(to_regclass(:table))"), {"table": table}
+    ).scalar()
+
+    ddl = f"CREATE TABLE {schema}.{staging} (LIKE {table} INCLUDING ALL)"
+    if partition_key:
+        ddl += f" PARTITION BY {partition_key}"
+    conn.execute(text(ddl))
+
+    if partition_key:
+        conn.execute(
+            text(f"CREATE TABLE {schema}.{staging}_default PARTITION OF {schema}.{staging} DEFAULT")
+        )
+
+    return staging
+
+
+def _rename(conn, schema, old, new):
+    """
+    Renames <schema>.<old> to new. On Postgres its partitions and the
+    indexes of both are renamed too when their names start with old, so
+    names stay stable across swaps (customers_pkey, usage_events_2024_01...).
+    """
+    if not is_duckdb():
+        partitions = conn.execute(
+            text(
+                "SELECT c.relname FROM pg_inherits i "
+                "JOIN pg_class c ON c.oid = i.inhrelid "
+                "WHERE i.inhparent = to_regclass(:parent)"
+            ),
+            {"parent": f"{schema}.{old}"},
+        ).scalars().all()
+
+        indexes = conn.execute(
+            text(
+                "SELECT indexname FROM pg_indexes "
+                "WHERE schemaname = :schema AND tablename = ANY(:tables)"
+            ),
+            {"schema": schema, "tables": [old] + partitions},
+        ).scalars().all()
+
+        for relation, kind in [(index, "INDEX") for index in indexes] + [
+            (partition, "TABLE") for partition in partitions
+        ]:
+            if relation.startswith(f"{old}_"):
+                renamed = new + relation[len(old):]
+                conn.execute(text(f'ALTER {kind} {schema}."{relation}" RENAME TO "{renamed}"'))
+
+    conn.execute(text(f"ALTER TABLE {schema}.{old} RENAME TO {new}"))
+
+
+def publish_table(conn, table):
+    """
+    Swaps the staging copy of <schema>.<table> in, keeping the replaced
+    version as <schema>._<table>_prev. Run it in the transaction that
+    filled the staging table, as its last statement: the swap is then
+    atomic, and readers only wait for the renames and the commit.
+    """
+    schema, name = table.split(".")
+    previous = previous_name(name)
+
+    conn.execute(text(f"DROP TABLE IF EXISTS {schema}.{previous}"))
+    _rename(conn, schema, name, previous)
+    _rename(conn, schema, staging_name(name), name)
+
+
+def rollback_table(conn, table):
+    """
+    Swaps <schema>.<table> with its previous version, so rolling back
+    twice restores the latest build. The next incremental run diffs a
+    rolled-back silver table against bronze again.
+    """
+    schema, name = table.split(".")
+    previous = previous_name(name)
+    if not _exists(conn, schema, previous):
+        raise ValueError(f"No previous version of {table} to roll back to")
+
+    staging = staging_name(name)
+    conn.execute(text(f"DROP TABLE IF EXISTS {schema}.{staging}"))
+    _rename(conn, schema, name, staging)
+    _rename(conn, schema, previous, name)
+    _rename(conn, schema, staging, previous)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Roll silver/gold tables back to their previous build")
+    parser.add_argument("tables", nargs="+", help="Tables to roll back, e.g. gold.dashboard_monthly")
+    args = parser.parse_args()
+
+    with get_engine().begin() as conn:
+        for table in args.tables:
+            rollback_table(conn, table)
+            print(f"✅ {table} rolled back")
@@ -0,0 +1,165 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Callable
+
+
+@dataclass
+class Stage:
+    """
+    One pipeline step and the tables it reads and writes.
+
+    Dependencies are not listed explicitly: a stage depends on every other
+    stage in the same plan that outputs one of its inputs.
+    """
+
+    name: str
+    func: Callable
+    inputs: list = field(default_factory=list)
+    outputs: list = field(default_factory=list)
+
+
+def resolve_dependencies(stages):
+    """
+    Returns {stage name: set of upstream stage names} for a plan
+    """
+    producers = {}
+    for stage in stages:
+        for output in stage.outputs:
+            if output in producers:
+                raise ValueError(
+                    f"{output} is produced by both {producers[output]} and {stage.name}"
+                )
+            producers[output] = stage.name
+
+    return {
+        stage.name: {
+            producers[table]
+            for table in stage.inputs
+            if table in producers and producers[table] != stage.name
+        }
+        for stage in stages
+    }
+
+
+def topological_levels(stages):
+    """
+    Groups stages into waves; every stage only depends on earlier waves
+    """
+    deps = resolve_dependencies(stages)
+    done = set()
+    levels = []
+
+    while len(done) < len(deps):
+        ready = sorted(
+            name for name, upstream in deps.items()
+            if name not in done and upstream <= done
+        )
+        if not ready:
+            cycle = sorted(set(deps) - done)
+            raise ValueError(f"Dependency cycle between stages: {', '.join(cycle)}")
+
+        levels.append(ready)
+        done.update(ready)
+
+    return levels
+
+
+def critical_path(stages, durations=None):
+    """
+    Longest chain of dependent stages, weighted by durations in seconds
+    (each stage counts as 1 when no duration is known).
+
+    Returns (list of stage names, total weight).
+    """
+    durations = durations or {}
+    deps = resolve_dependencies(stages)
+
+    finish = {}
+    previous = {}
+    for level in topological_levels(stages):
+        for name in level:
+            upstream = max(deps[name], key=lambda n: finish[n], default=None)
+            start = finish[upstream] if upstream else 0
+            finish[name] = start + durations.get(name, 1)
+            previous[name] = upstream
+
+    if not finish:
+        return [], 0
+
+    name = max(finish, key=finish.get)
+    total = finish[name]
+
+    path = []
+    while name:
+        path.append(name)
+        name = previous[name]
+
+    return path[::-1], total
+
+
+def print_plan(stages, durations=None):
+    deps = resolve_dependencies(stages)
+
+    print("Execution plan:")
+    for i, level in enumerate(topological_levels(stages), start=1):
+        print(f"  wave {i}:")
+        for name in level:
+            upstream = ", ".join(sorted(deps[name])) or "-"
+            print(f"    {name}  (after: {upstream})")
+
+    path, total = critical_path(stages, durations)
+    weight = f"{total:.2f}s" if durations else f"{total} stages"
+    print(f"Critical path ({weight}): {' -> '.join(path)}")
+
+
+def run_stages(stages, max_workers=1):
+    """
+    Runs stages on a thread pool as soon as all their upstream stages have
+    finished, with at most max_workers running at once.
+
+    If a stage fails, no new stages are started; stages already running are
+    allowed to finish and the first error is re-raised. Returns the duration
+    of every completed stage in seconds.
+    """
+    deps = resolve_dependencies(stages)
+    by_name = {stage.name: stage for stage in stages}
+
+    # Fail fast on cycles before anything runs
+    topological_levels(stages)
+
+    done = set()
+    durations = {}
+    running = {}
+    error = None
+
+    def timed(stage):
+        started = time.perf_counter()
+        stage.func()
+        return time.perf_counter() - started
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while True:
+            if error is None:
+                started = set(running.values()) | done
+                for name in sorted(deps):
+                    if name not in started and deps[name] <= done:
+                        running[pool.submit(timed, by_name[name])] = name
+
+            if not running:
+                break
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                try:
+                    durations[name] = future.result()
+                    done.add(name)
+                except Exception as exc:
+                    print(f"❌ {name} failed: {exc}")
+                    error = error or exc
+
+    if error is not None:
+        raise error
+
+    return durations
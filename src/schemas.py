@@ -0,0 +1,208 @@
+import argparse
+import importlib.util
+
+import pandas as pd
+
+from config.db import get_engine
+
+
+# Arrow-backed strings store IDs and free text in contiguous buffers instead
+# of one Python object per value; fall back to pandas strings without pyarrow
+STRING = "string[pyarrow]" if importlib.util.find_spec("pyarrow") else "string"
+
+# Low-cardinality text is stored as integer codes plus a small dictionary
+CATEGORY = "category"
+
+DATETIME = "datetime64[ns]"
+YEAR = "Int16"
+
+
+# Dtypes of the raw (all-TEXT) bronze columns as they are read, so frames
+# are compact from the start instead of only after the transforms
+BRONZE_DTYPES = {
+    "customers": {
+        "customer_id": STRING,
+        "customer_name": STRING,
+        "industry": CATEGORY,
+        "country": CATEGORY,
+        "signup_date": STRING,
+        "plan_type": CATEGORY,
+        "row_hash": STRING,
+    },
+    "users": {
+        "user_id": STRING,
+        "customer_id": STRING,
+        "user_role": CATEGORY,
+        "email": STRING,
+        "created_at": STRING,
+        "is_active": CATEGORY,
+        "row_hash": STRING,
+    },
+    "subscriptions": {
+        "subscription_id": STRING,
+        "customer_id": STRING,
+        "plan_name": CATEGORY,
+        "start_date": STRING,
+        "end_date": STRING,
+        "monthly_amount": STRING,
+        "subscription_status": CATEGORY,
+        "row_hash": STRING,
+    },
+    "payments": {
+        "payment_id": STRING,
+        "customer_id": STRING,
+        "subscription_id": STRING,
+        "payment_date": STRING,
+        "payment_amount": STRING,
+        "payment_method": CATEGORY,
+        "payment_status": CATEGORY,
+        "row_hash": STRING,
+    },
+    "usage_events": {
+        "event_id": STRING,
+        "user_id": STRING,
+        "event_type": CATEGORY,
+        "event_date": STRING,
+        "event_count": STRING,
+        "row_hash": STRING,
+    },
+}
+
+# Format of each raw date column (see src/dates.py); a column set to None
+# has its format detected from the first values parsed
+DATE_FORMATS = {
+    "customers": {"signup_date": "%Y-%m-%d"},
+    "users": {"created_at": "%Y-%m-%d"},
+    "subscriptions": {"start_date": "%Y-%m-%d", "end_date": "%Y-%m-%d"},
+    "payments": {"payment_date": "%Y-%m-%d"},
+    "usage_events": {"event_date": "%Y-%m-%d"},
+}
+
+# Dtypes of every silver column after the transforms in src/build_silver.py
+SILVER_DTYPES = {
+    "customers": {
+        "customer_id": STRING,
+        "customer_name": STRING,
+        "industry": CATEGORY,
+        "country": CATEGORY,
+        "signup_date": DATETIME,
+        "plan_type": CATEGORY,
+        "row_hash": STRING,
+        "signup_year": YEAR,
+    },
+    "users": {
+        "user_id": STRING,
+        "customer_id": STRING,
+        "user_role": CATEGORY,
+        "email": STRING,
+        "created_at": DATETIME,
+        "is_active": "boolean",
+        "row_hash": STRING,
+        "created_year": YEAR,
+    },
+    "subscriptions": {
+        "subscription_id": STRING,
+        "customer_id": STRING,
+        "plan_name": CATEGORY,
+        "start_date": DATETIME,
+        "end_date": DATETIME,
+        "monthly_amount": "float64",
+        "subscription_status": CATEGORY,
+        "row_hash": STRING,
+        "is_active": "bool",
+        "start_year": YEAR,
+    },
+    "payments": {
+        "payment_id": STRING,
+        "customer_id": STRING,
+        "subscription_id": STRING,
+        "payment_date": DATETIME,
+        "payment_amount": "float64",
+        "payment_method": CATEGORY,
+        "payment_status": CATEGORY,
+        "row_hash": STRING,
+        "payment_year": YEAR,
+    },
+    "usage_events": {
+        "event_id": STRING,
+        "user_id": STRING,
+        "event_type": CATEGORY,
+        "event_date": DATETIME,
+        "event_count": "Int32",
+        "row_hash": STRING,
+        "event_year": YEAR,
+    },
+}
+
+
+def bronze_dtypes(table, columns=None):
+    """
+    Read-time dtypes for bronze.<table>, optionally limited to some columns
+    """
+    dtypes = BRONZE_DTYPES[table]
+    columns = dtypes if columns is None else columns
+    return {c: dtypes[c] for c in columns if c in dtypes}
+
+
+def silver_dtypes(table, columns=None):
+    """
+    Read-time dtypes for silver.<table>, optionally limited to some columns
+    """
+    dtypes = SILVER_DTYPES[table]
+    columns = dtypes if columns is None else columns
+    return {c: dtypes[c] for c in columns if c in dtypes}
+
+
+def apply_silver_schema(df, table):
+    """
+    Casts a transformed frame to the declared silver dtypes
+    """
+    return df.astype(silver_dtypes(table, df.columns))
+
+
+def frame_bytes(df):
+    return int(df.memory_usage(deep=True, index=False).sum())
+
+
+def memory_report(tables=None, limit=None):
+    """
+    Reads each silver table with default pandas dtypes and with the declared
+    schema, and prints the bytes used by each
+    """
+    engine = get_engine()
+    tables = tables or list(SILVER_DTYPES)
+
+    report = []
+    for table in tables:
+        query = f"SELECT * FROM silver.{table}"
+        if limit:
+            query += f" LIMIT {int(limit)}"
+
+        before = pd.read_sql(query, engine)
+        after = pd.read_sql(query, engine, dtype=silver_dtypes(table, before.columns))
+
+        rows = max(len(before), 1)
+        report.append(
+            {
+                "table": f"silver.{table}",
+                "rows": len(before),
+                "bytes_before": frame_bytes(before),
+                "bytes_after": frame_bytes(after),
+                "bytes_per_row_before": frame_bytes(before) / rows,
+                "bytes_per_row_after": frame_bytes(after) / rows,
+            }
+        )
+
+    report = pd.DataFrame(report)
+    report["reduction"] = 1 - report["bytes_after"] / report["bytes_before"]
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bytes per silver table before and after the schema layer")
+    parser.add_argument("tables", nargs="*", help="Silver tables to measure (default: all)")
+    parser.add_argument("--limit", type=int, help="Only read this many rows per table")
+    args = parser.parse_args()
+
+    tables = [t.removeprefix("silver.") for t in args.tables]
+    print(memory_report(tables, args.limit).to_string(index=False))
@@ -0,0 +1,290 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+from config.db import get_engine
+from src import hll
+from src.dialect import insert_method
+from src.dirty_months import pending_months, record_build
+from src.telemetry import record
+
+
+# 2^precision registers per sketch; 14 gives ~0.8% standard error
+HLL_PRECISION = int(os.getenv("HLL_PRECISION", "14"))
+
+# Dimensions a sketch is kept for, besides the "all" total
+SKETCH_DIMENSIONS = ["event_type", "customer_id", "plan_type"]
+
+# Sketches built at once, to bound the uncompressed register memory
+SKETCH_BATCH_GROUPS = 2048
+
+GRAINS = ("day", "week", "month", "total")
+
+
+TABLE = "gold.usage_sketches"
+
+
+def _has_precision(engine, precision):
+    with engine.connect() as conn:
+        return conn.execute(
+            text("SELECT EXISTS (SELECT 1 FROM gold.usage_sketches WHERE precision = :precision)"),
+            {"precision": precision},
+        ).scalar()
+
+
+def _read_active_users(engine, months=None):
+    query = """
+        SELECT
+            e.user_id,
+            e.event_date::date AS day,
+            e.event_type,
+            u.customer_id,
+            c.plan_type
+        FROM silver.usage_events e
+        LEFT JOIN silver.users u ON u.user_id = e.user_id
+        LEFT JOIN silver.customers c ON c.customer_id = u.customer_id
+        WHERE e.event_count > 0
+          AND e.event_date IS NOT NULL
+          AND e.user_id IS NOT NULL
+    """
+    params = {}
+    if months is not None:
+        query += " AND e.event_date >= :first_month AND e.event_date < :end_month"
+        params = {
+            "first_month": min(months).to_pydatetime(),
+            "end_month": (max(months) + pd.offsets.MonthBegin()).to_pydatetime(),
+        }
+
+    df = pd.read_sql(text(query), engine, params=params)
+    df["day"] = pd.to_datetime(df["day"])
+
+    if months is not None:
+        df = df[df["day"].dt.to_period("M").dt.to_timestamp().isin(months)]
+    return df
+
+
+def _sketch_frame(df, hashes, dimension, precision):
+    """
+    One row per (day, dimension value) with its compressed sketch
+    """
+    values = (
+        pd.Series("all", index=df.index)
+        if dimension == "all"
+        else df[dimension].astype("string").fillna("unknown")
+    )
+
+    groups = pd.DataFrame({"day": df["day"], "dimension_value": values})
+    codes = groups.groupby(["day", "dimension_value"], sort=True).ngroup().to_numpy()
+    keys = groups.drop_duplicates().sort_values(["day", "dimension_value"]).reset_index(drop=True)
+
+    order = np.argsort(codes, kind="stable")
+    codes, hashes = codes[order], hashes[order]
+
+    sketches = []
+    for lo in range(0, len(keys), SKETCH_BATCH_GROUPS):
+        hi = min(lo + SKETCH_BATCH_GROUPS, len(keys))
+        start, stop = np.searchsorted(codes, [lo, hi])
+
+        registers = hll.build_registers(
+            hashes[start:stop], codes[start:stop] - lo, hi - lo, precision
+        )
+        sketches.extend(hll.to_bytes(r) for r in registers)
+
+    keys["dimension"] = dimension
+    keys["precision"] = precision
+    keys["registers"] = sketches
+    return keys
+
+
+def build_gold_usage_sketches(full_refresh=False, precision=HLL_PRECISION):
+    """
+    Builds the HyperLogLog sketch of active users for every day and
+    dimension value in gold.usage_sketches.
+
+    Incremental runs only rebuild the days of the months whose events,
+    users or customers changed (see src/dirty_months.py); a full refresh
+    rebuilds every day at the given precision.
+    """
+    engine = get_engine()
+
+    months, marked_until = pending_months(engine, TABLE, full_refresh)
+    if months is not None and not _has_precision(engine, precision):
+        # Never built at this precision: the marks do not cover its days
+        months = None
+    if months is not None and not months:
+        print(f"✅ {TABLE} is up to date")
+        return
+
+    df = _read_active_users(engine, months)
+    record(rows_in=len(df))
+    hashes = hll.hash_values(df["user_id"])
+
+    sketches = pd.concat(
+        [
+            _sketch_frame(df, hashes, dimension, precision)
+            for dimension in ["all"] + SKETCH_DIMENSIONS
+        ],
+        ignore_index=True,
+    )
+
+    with engine.begin() as conn:
+        delete = "DELETE FROM gold.usage_sketches WHERE precision = :precision"
+        if months is None:
+            conn.execute(text(delete), {"precision": precision})
+        for month in months or []:
+            conn.execute(
+                text(delete + " AND day >= :start AND day < :end"),
+                {
+                    "precision": precision,
+                    "start": month.to_pydatetime(),
+                    "end": (month + pd.offsets.MonthBegin()).to_pydatetime(),
+                },
+            )
+
+        sketches.to_sql(
+            name="usage_sketches",
+            schema="gold",
+            con=conn,
+            index=False,
+            if_exists="append",
+            method=insert_method(),
+        )
+
+        record_build(conn, TABLE, months, marked_until)
+
+    record(rows_out=len(sketches))
+    rebuilt = "all months" if months is None else f"{len(months)} months"
+    print(f"✅ {TABLE} built successfully ({rebuilt})")
+
+
+def load_sketches(engine, dimension="all", precision=HLL_PRECISION, start=None, end=None):
+    query = """
+        SELECT day, dimension_value, registers
+        FROM gold.usage_sketches
+        WHERE dimension = :dimension
+          AND precision = :precision
+    """
+    params = {"dimension": dimension, "precision": precision}
+    if start is not None:
+        query += " AND day >= :start"
+        params["start"] = start
+    if end is not None:
+        query += " AND day <= :end"
+        params["end"] = end
+
+    df = pd.read_sql(text(query), engine, params=params)
+    df["day"] = pd.to_datetime(df["day"])
+    df["registers"] = [hll.from_bytes(bytes(r)) for r in df["registers"]]
+    return df
+
+
+def _period(days, grain):
+    if grain == "day":
+        return days
+    if grain == "week":
+        return days - pd.to_timedelta(days.dt.weekday, unit="D")
+    if grain == "month":
+        return days.dt.to_period("M").dt.to_timestamp()
+    if grain == "total":
+        return pd.Series(days.min(), index=days.index)
+    raise ValueError(f"Invalid grain: {grain} (expected {' | '.join(GRAINS)})")
+
+
+def active_users(
+    grain="day",
+    dimension="all",
+    precision=HLL_PRECISION,
+    start=None,
+    end=None,
+    with_error=False,
+    engine=None,
+):
+    """
+    Distinct active users per period (day, ISO week, month or the whole
+    range) and dimension value, by merging daily sketches.
+
+    With with_error=True, adds the standard error and a ~95% interval next
+    to each estimate.
+    """
+    engine = engine if engine is not None else get_engine()
+    sketches = load_sketches(engine, dimension, precision, start, end)
+
+    if sketches.empty:
+        return pd.DataFrame(columns=["period", "dimension_value", "active_users"])
+
+    sketches["period"] = _period(sketches["day"], grain)
+
+    rows = [
+        (period, value, hll.estimate(hll.merge(list(group["registers"])))[0])
+        for (period, value), group in sketches.groupby(["period", "dimension_value"], sort=True)
+    ]
+    result = pd.DataFrame(rows, columns=["period", "dimension_value", "active_users"])
+
+    if with_error:
+        result = _with_error(result, "active_users", precision)
+
+    return result
+
+
+def _with_error(df, column, precision):
+    error = hll.relative_error(precision)
+    df[f"{column}_std_error"] = df[column] * error
+    df[f"{column}_lower"] = (df[column] * (1 - 2 * error)).clip(lower=0)
+    df[f"{column}_upper"] = df[column] * (1 + 2 * error)
+    return df
+
+
+def compute_dau_mau_from_sketches(engine, precision=HLL_PRECISION, with_error=True):
+    """
+    gold.dau_mau_monthly computed from sketches instead of events: average
+    daily actives per month, monthly actives and their ratio
+    """
+    daily = active_users("day", precision=precision, engine=engine)
+    monthly = active_users("month", precision=precision, engine=engine)
+
+    if daily.empty:
+        return pd.DataFrame(columns=["month", "dau", "mau", "dau_mau_ratio"])
+
+    daily["month"] = daily["period"].dt.to_period("M").dt.to_timestamp()
+    avg_dau = daily.groupby("month")["active_users"].mean().reset_index(name="dau")
+
+    mau = monthly.rename(columns={"period": "month", "active_users": "mau"})[["month", "mau"]]
+
+    result = avg_dau.merge(mau, on="month")
+    result["dau_mau_ratio"] = result["dau"] / result["mau"]
+
+    if with_error:
+        result = _with_error(result, "dau", precision)
+        result = _with_error(result, "mau", precision)
+
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Active users from HyperLogLog sketches")
+    parser.add_argument("--build", action="store_true", help="Update the sketch store first")
+    parser.add_argument("--full-refresh", action="store_true", help="Rebuild every day's sketches")
+    parser.add_argument("--grain", choices=GRAINS, default="month")
+    parser.add_argument("--dimension", choices=["all"] + SKETCH_DIMENSIONS, default="all")
+    parser.add_argument("--precision", type=int, default=HLL_PRECISION)
+    parser.add_argument("--start", help="First day (YYYY-MM-DD)")
+    parser.add_argument("--end", help="Last day (YYYY-MM-DD)")
+    parser.add_argument("--with-error", action="store_true", help="Report the error bound of each estimate")
+    args = parser.parse_args()
+
+    if args.build or args.full_refresh:
+        build_gold_usage_sketches(args.full_refresh, args.precision)
+
+    print(
+        active_users(
+            args.grain,
+            args.dimension,
+            args.precision,
+            args.start,
+            args.end,
+            args.with_error,
+        ).to_string(index=False)
+    )
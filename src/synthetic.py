@@ -0,0 +1,278 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from src.load_bronze import FILE_TABLE_MAP, PROJECT_ROOT
+
+
+# Date range the generated history covers
+START_DATE = "2022-01-01"
+END_DATE = "2026-01-31"
+
+# Share of rows per table that carry a data quality problem
+DIRTY_RATE = float(os.getenv("SYNTHETIC_DIRTY_RATE", "0.01"))
+
+# Usage events generated and written per batch
+CHUNK_ROWS = 1_000_000
+
+INDUSTRIES = ["SaaS", "Retail", "Fintech", "Healthcare", "Education", "Manufacturing"]
+COUNTRIES = ["IN", "US", "UK", "DE", "SG", "AU", "CA"]
+PLANS = ["Basic", "Pro", "Enterprise"]
+PLAN_WEIGHTS = [0.55, 0.33, 0.12]
+PLAN_PRICES = {"Basic": (1000, 3000), "Pro": (3000, 6000), "Enterprise": (6000, 10000)}
+USER_ROLES = ["admin", "member", "viewer"]
+EVENT_TYPES = ["login", "feature_use", "report_view", "export", "api_call"]
+PAYMENT_METHODS = ["card", "upi", "bank_transfer"]
+
+# Raw values the silver layer has to cope with
+BAD_DATES = ["", "N/A", "2023-13-45", "31/02/2024", "not a date"]
+BAD_BOOLEANS = ["", "yes", "0"]
+
+
+def table_sizes(events):
+    """
+    Row counts of every bronze table for a given number of usage events,
+    keeping the ratios of a B2B SaaS product (many events per user, a few
+    users per customer, monthly payments per subscription)
+    """
+    customers = max(100, events // 2000)
+    subscriptions = customers * 3 // 2
+    return {
+        "customers": customers,
+        "users": customers * 8,
+        "subscriptions": subscriptions,
+        "payments": subscriptions * 12,
+        "usage_events": events,
+    }
+
+
+def parse_count(value):
+    # Accepts 1000000, 1e6 or 1_000_000
+    return int(float(str(value).replace("_", "")))
+
+
+class _Generator:
+    def __init__(self, sizes, dirty_rate, seed):
+        self.sizes = sizes
+        self.dirty_rate = dirty_rate
+        self.rng = np.random.default_rng(seed)
+
+        # Every date is an index into this array, so formatting is a lookup
+        self.days = pd.date_range(START_DATE, END_DATE, freq="D").strftime("%Y-%m-%d").to_numpy()
+
+    def dirty(self, n):
+        return self.rng.random(n) < self.dirty_rate
+
+    def ids(self, prefix, numbers, width):
+        return np.char.add(prefix, np.char.zfill(numbers.astype(str), width))
+
+    def day_indexes(self, n, low=0, high=None):
+        high = len(self.days) if high is None else high
+        return self.rng.integers(low, np.maximum(high, low + 1), n)
+
+    def dates(self, indexes):
+        values = self.days[np.minimum(indexes, len(self.days) - 1)].astype(object)
+        bad = self.dirty(len(values))
+        values[bad] = self.rng.choice(BAD_DATES, bad.sum())
+        return values
+
+    def with_duplicates(self, ids):
+        # A dirty row reuses the previous row's key
+        ids = ids.copy()
+        duplicate = self.dirty(len(ids))
+        duplicate[0] = False
+        ids[duplicate] = ids[np.flatnonzero(duplicate) - 1]
+        return ids
+
+    def customers(self):
+        n = self.sizes["customers"]
+        numbers = np.arange(n)
+
+        # Signups grow over time: later days are more likely
+        self.signup_day = (np.sqrt(self.rng.random(n)) * (len(self.days) - 60)).astype(np.int64)
+
+        return pd.DataFrame(
+            {
+                "customer_id": self.with_duplicates(self.ids("C", numbers, 7)),
+                "customer_name": np.char.add("Customer ", numbers.astype(str)),
+                "industry": self.rng.choice(INDUSTRIES, n),
+                "country": self.rng.choice(COUNTRIES, n),
+                "signup_date": self.dates(self.signup_day),
+                "plan_type": self.rng.choice(PLANS, n, p=PLAN_WEIGHTS),
+            }
+        )
+
+    def users(self):
+        n = self.sizes["users"]
+        n_customers = self.sizes["customers"]
+
+        customer = self.rng.integers(0, n_customers, n)
+        self.user_day = self.day_indexes(n, self.signup_day[customer])
+
+        # Orphans point at customers that do not exist
+        orphan = self.dirty(n)
+        customer_ids = self.ids("C", np.where(orphan, customer + n_customers, customer), 7)
+
+        is_active = self.rng.choice(["True", "False", "true", "FALSE"], n, p=[0.6, 0.2, 0.15, 0.05]).astype(object)
+        bad = self.dirty(n)
+        is_active[bad] = self.rng.choice(BAD_BOOLEANS, bad.sum())
+
+        numbers = np.arange(n)
+        return pd.DataFrame(
+            {
+                "user_id": self.ids("U", numbers, 8),
+                "customer_id": customer_ids,
+                "user_role": self.rng.choice(USER_ROLES, n, p=[0.1, 0.6, 0.3]),
+                "email": np.char.add(np.char.add("user", numbers.astype(str)), "@example.com"),
+                "created_at": self.dates(self.user_day),
+                "is_active": is_active,
+            }
+        )
+
+    def subscriptions(self):
+        n = self.sizes["subscriptions"]
+
+        customer = self.rng.integers(0, self.sizes["customers"], n)
+        plan = self.rng.choice(PLANS, n, p=PLAN_WEIGHTS)
+        low = np.array([PLAN_PRICES[p][0] for p in plan])
+        high = np.array([PLAN_PRICES[p][1] for p in plan])
+        amount = self.rng.integers(low, high)
+        amount[self.dirty(n)] *= -1
+
+        self.start_day = self.day_indexes(n, self.signup_day[customer])
+        length = self.rng.geometric(1 / 300, n)
+        end_day = self.start_day + length
+        active = (end_day >= len(self.days)) | (self.rng.random(n) < 0.3)
+
+        end_date = self.dates(end_day).astype(object)
+        end_date[active] = ""
+
+        status = np.where(active, "active", "cancelled").astype(object)
+        mixed_case = self.dirty(n) & active
+        status[mixed_case] = "Active"
+
+        self.subscription_customer = customer
+        self.subscription_end_day = np.where(active, len(self.days), end_day)
+
+        return pd.DataFrame(
+            {
+                "subscription_id": self.with_duplicates(self.ids("S", np.arange(n), 8)),
+                "customer_id": self.ids("C", customer, 7),
+                "plan_name": plan,
+                "start_date": self.dates(self.start_day),
+                "end_date": end_date,
+                "monthly_amount": amount.astype(str),
+                "subscription_status": status,
+            }
+        )
+
+    def payments(self):
+        n = self.sizes["payments"]
+        n_subscriptions = self.sizes["subscriptions"]
+
+        subscription = self.rng.integers(0, n_subscriptions, n)
+        day = self.day_indexes(n, self.start_day[subscription], self.subscription_end_day[subscription])
+
+        amount = self.rng.integers(1000, 10000, n)
+        bad = self.dirty(n)
+        amount[bad] = self.rng.integers(-500, 1, bad.sum())
+
+        orphan = self.dirty(n)
+        subscription_ids = self.ids("S", np.where(orphan, subscription + n_subscriptions, subscription), 8)
+
+        return pd.DataFrame(
+            {
+                "payment_id": self.ids("P", np.arange(n), 9),
+                "customer_id": self.ids("C", self.subscription_customer[subscription], 7),
+                "subscription_id": subscription_ids,
+                "payment_date": self.dates(day),
+                "amount": amount,
+                "payment_method": self.rng.choice(PAYMENT_METHODS, n, p=[0.6, 0.3, 0.1]),
+                "payment_status": self.rng.choice(["paid", "failed", "refunded"], n, p=[0.92, 0.06, 0.02]),
+            }
+        )
+
+    def usage_events(self, start, n):
+        n_users = self.sizes["users"]
+
+        # A few heavy users generate most events (Zipf-like activity)
+        if not hasattr(self, "user_cdf"):
+            weights = 1 / np.arange(1, n_users + 1) ** 0.8
+            self.user_cdf = np.cumsum(self.rng.permutation(weights))
+            self.user_cdf /= self.user_cdf[-1]
+
+        user = np.minimum(np.searchsorted(self.user_cdf, self.rng.random(n)), n_users - 1)
+        day = self.day_indexes(n, self.user_day[user])
+
+        count = self.rng.geometric(0.2, n)
+        count[self.dirty(n)] = -1
+        count[self.rng.random(n) < 0.05] = 0
+
+        # Unknown users: ids past the last generated user
+        unknown = self.dirty(n)
+        user_ids = self.ids("U", np.where(unknown, user + n_users, user), 8)
+
+        return pd.DataFrame(
+            {
+                "event_id": self.with_duplicates(self.ids("E", np.arange(start, start + n), 10)),
+                "user_id": user_ids,
+                "event_type": self.rng.choice(EVENT_TYPES, n, p=[0.35, 0.3, 0.2, 0.05, 0.1]),
+                "event_date": self.dates(day),
+                "event_count": count,
+            }
+        )
+
+
+def default_output_dir(events):
+    """
+    benchmarks/data/events_<events>: generated files never overwrite the
+    real CSVs in bronze_inputs
+    """
+    return os.path.join(PROJECT_ROOT, "benchmarks", "data", f"events_{events}")
+
+
+def generate_bronze(events, output_dir=None, dirty_rate=DIRTY_RATE, seed=0, chunk_rows=CHUNK_ROWS):
+    """
+    Writes bronze CSVs for every table with the given number of usage events
+    (other tables are sized from it, see table_sizes), including a dirty_rate
+    share of duplicate keys, orphan references, unparseable dates, negative
+    amounts and counts. The same seed always produces the same files.
+
+    Usage events are generated chunk_rows at a time, so memory stays bounded
+    at any scale. Returns the number of rows written per table.
+    """
+    output_dir = output_dir or default_output_dir(events)
+    os.makedirs(output_dir, exist_ok=True)
+
+    sizes = table_sizes(events)
+    generator = _Generator(sizes, dirty_rate, seed)
+    files = {table.split(".")[1]: name for name, table in FILE_TABLE_MAP.items()}
+
+    # Order matters: later tables reference earlier ones
+    for table in ["customers", "users", "subscriptions", "payments"]:
+        df = getattr(generator, table)()
+        df.to_csv(os.path.join(output_dir, files[table]), index=False)
+        print(f"Generated {len(df)} rows for {table}")
+
+    path = os.path.join(output_dir, files["usage_events"])
+    for start in range(0, events, chunk_rows):
+        n = min(chunk_rows, events - start)
+        generator.usage_events(start, n).to_csv(
+            path, index=False, mode="w" if start == 0 else "a", header=start == 0
+        )
+    print(f"Generated {events} rows for usage_events")
+
+    return sizes
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic bronze CSVs")
+    parser.add_argument("--events", default="1e5", help="Number of usage events, e.g. 1e4 to 1e8 (default: 1e5)")
+    parser.add_argument("--output-dir", default=None, help="Directory for the CSVs (default: benchmarks/data/events_<events>)")
+    parser.add_argument("--dirty-rate", type=float, default=DIRTY_RATE)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    generate_bronze(parse_count(args.events), args.output_dir, args.dirty_rate, args.seed)
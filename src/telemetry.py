@@ -0,0 +1,239 @@
+import cProfile
+import os
+import resource
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field, replace
+from datetime import datetime
+
+import pandas as pd
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from config.db import get_engine
+from src.dialect import insert_method
+
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(__file__))
+PROFILES_DIR = os.path.join(PROJECT_ROOT, "profiles")
+
+
+@dataclass
+class StageMetrics:
+    """
+    What one stage did in one run; saved as a row of audit.pipeline_runs
+    """
+
+    run_id: str
+    stage: str
+    started_at: datetime
+    ended_at: datetime = None
+    status: str = "running"
+    duration_s: float = None
+    rows_in: int = 0
+    rows_out: int = 0
+    rows_rejected: int = 0
+    db_statements: int = 0
+    db_read_s: float = 0.0
+    db_write_s: float = 0.0
+    peak_rss_mb: float = None
+    error: str = None
+    # > 0 while a db_timer block times the DB work itself
+    _timed: int = field(default=0, repr=False)
+
+
+# Metrics of the stage running in the current thread, if any
+_current = ContextVar("stage_metrics", default=None)
+
+
+def peak_rss_mb():
+    """
+    Highest resident memory of this process so far, in MB
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def record(rows_in=0, rows_out=0, rows_rejected=0):
+    """
+    Adds row counts to the running stage; does nothing outside a stage
+    """
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.rows_in += rows_in
+        metrics.rows_out += rows_out
+        metrics.rows_rejected += rows_rejected
+
+
+@contextmanager
+def db_timer(kind):
+    """
+    Times DB work that does not go through SQLAlchemy cursor events (COPY on
+    a raw connection, fetches from a server-side cursor) as a "read" or a
+    "write". Statements executed inside the block are not counted twice.
+    """
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+
+    metrics._timed += 1
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics._timed -= 1
+        elapsed = time.perf_counter() - started
+        if kind == "read":
+            metrics.db_read_s += elapsed
+        else:
+            metrics.db_write_s += elapsed
+
+
+@contextmanager
+def collect_metrics():
+    """
+    Records what the enclosed block does into a fresh StageMetrics, e.g. in
+    a worker process, yielded so it can be passed back and added to the
+    stage with add_metrics()
+    """
+    metrics = StageMetrics(run_id=None, stage=None, started_at=datetime.now())
+    token = _current.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _current.reset(token)
+
+
+def add_metrics(other):
+    """
+    Adds the counters of metrics collected elsewhere to the running stage;
+    does nothing outside a stage
+    """
+    metrics = _current.get()
+    if metrics is None:
+        return
+
+    metrics.rows_in += other.rows_in
+    metrics.rows_out += other.rows_out
+    metrics.rows_rejected += other.rows_rejected
+    metrics.db_statements += other.db_statements
+    metrics.db_read_s += other.db_read_s
+    metrics.db_write_s += other.db_write_s
+
+
+def _is_read(statement):
+    keyword = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+    return keyword in ("SELECT", "WITH", "SHOW")
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("telemetry_started", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["telemetry_started"].pop()
+
+    metrics = _current.get()
+    if metrics is None:
+        return
+
+    metrics.db_statements += 1
+    if metrics._timed:
+        return
+
+    if _is_read(statement):
+        metrics.db_read_s += elapsed
+    else:
+        metrics.db_write_s += elapsed
+
+
+class RunRecorder:
+    """
+    Wraps the stages of one run so each records its StageMetrics, and
+    optionally a cProfile dump, then saves them to audit.pipeline_runs.
+    """
+
+    def __init__(self, run_id=None, profile_dir=None):
+        self.run_id = run_id or uuid.uuid4().hex
+        self.profile_dir = (
+            os.path.join(profile_dir, self.run_id) if profile_dir else None
+        )
+        self.stages = []
+        self._lock = threading.Lock()
+
+    def instrument(self, stages):
+        return [
+            replace(stage, func=self._wrap(stage.name, stage.func))
+            for stage in stages
+        ]
+
+    def _wrap(self, name, func):
+        def instrumented():
+            self._run(name, func)
+
+        return instrumented
+
+    def _run(self, name, func):
+        metrics = StageMetrics(self.run_id, name, started_at=datetime.now())
+        token = _current.set(metrics)
+
+        profiler = cProfile.Profile() if self.profile_dir else None
+        started = time.perf_counter()
+        try:
+            if profiler:
+                profiler.enable()
+            func()
+            metrics.status = "success"
+        except Exception as exc:
+            metrics.status = "failed"
+            metrics.error = f"{type(exc).__name__}: {exc}"[:2000]
+            raise
+        finally:
+            if profiler:
+                profiler.disable()
+                self._dump(profiler, name)
+
+            metrics.duration_s = time.perf_counter() - started
+            metrics.ended_at = datetime.now()
+            metrics.peak_rss_mb = peak_rss_mb()
+            _current.reset(token)
+
+            with self._lock:
+                self.stages.append(metrics)
+
+    def _dump(self, profiler, name):
+        os.makedirs(self.profile_dir, exist_ok=True)
+        profiler.dump_stats(os.path.join(self.profile_dir, f"{name}.prof"))
+
+    def to_frame(self):
+        rows = [
+            {k: v for k, v in vars(metrics).items() if not k.startswith("_")}
+            for metrics in self.stages
+        ]
+        return pd.DataFrame(rows)
+
+    def save(self, engine=None):
+        """
+        Appends one audit.pipeline_runs row per finished stage
+        """
+        if not self.stages:
+            return
+
+        engine = engine if engine is not None else get_engine()
+        with engine.begin() as conn:
+            self.to_frame().to_sql(
+                name="pipeline_runs",
+                schema="audit",
+                con=conn,
+                index=False,
+                if_exists="append",
+                method=insert_method(),
+            )